@@ -128,6 +128,19 @@ struct PostListView: View {
                     ForEach(viewModel.posts) { post in
                         UserPostCard(post: post)
                     }
+                    
+                    if viewModel.hasMore {
+                        Button {
+                            Task { await viewModel.loadMorePosts() }
+                        } label: {
+                            if viewModel.isLoading {
+                                ProgressView()
+                            } else {
+                                Text("もっと見る")
+                            }
+                        }
+                        .padding()
+                    }
                 }
                 .padding()
             }
@@ -14,37 +14,67 @@ import FirebaseAuth
 class PostViewModel: ObservableObject {
     @Published var posts: [Post] = []
     @Published var isLoading = false
+    @Published var hasMore = false
     
     private let db = Firestore.firestore()
+    // 1ページあたりの投稿数
+    private let pageSize = 20
+    // 続きを読み込むときの起点（最後に取得したドキュメント）
+    private var lastDocument: DocumentSnapshot?
     
+    // 新しい順に並べるクエリ（タイムスタンプが同じ投稿はドキュメントIDで並べる）
+    private var baseQuery: Query {
+        db.collection("posts")
+            .order(by: "timestamp", descending: true)
+            .order(by: FieldPath.documentID(), descending: true)
+            .limit(to: pageSize)
+    }
+    
+    /// 最初のページを取得し直す
     func fetchPosts() async {
         isLoading = true
         do {
-            let snapshot = try await db.collection("posts")
-                .order(by: "timestamp", descending: true)
-                .getDocuments()
-            
-            // バックグラウンドでデコード処理
-            let decodedPosts = await Task.detached(priority: .userInitiated) {
-                snapshot.documents.compactMap { doc -> Post? in
-                    guard var post = try? doc.data(as: Post.self) else { return nil }
-                    
-                    // Base64からUIImageへバックグラウンドで変換
-                    if let base64 = post.image_base64,
-                       let data = Data(base64Encoded: base64) {
-                        post.uiImage = UIImage(data: data)
-                    }
-                    return post
-                }
-            }.value
-            
-            self.posts = decodedPosts
+            let snapshot = try await baseQuery.getDocuments()
+            self.posts = await decodePosts(snapshot.documents)
+            lastDocument = snapshot.documents.last
+            hasMore = snapshot.documents.count == pageSize
         } catch {
             print("Error fetching posts: \(error)")
         }
         isLoading = false
     }
     
+    /// 次のページを取得して末尾に追加する
+    func loadMorePosts() async {
+        guard hasMore, !isLoading, let lastDocument = lastDocument else { return }
+        isLoading = true
+        do {
+            let snapshot = try await baseQuery.start(afterDocument: lastDocument).getDocuments()
+            self.posts.append(contentsOf: await decodePosts(snapshot.documents))
+            self.lastDocument = snapshot.documents.last ?? lastDocument
+            hasMore = snapshot.documents.count == pageSize
+        } catch {
+            print("Error fetching more posts: \(error)")
+        }
+        isLoading = false
+    }
+    
+    private func decodePosts(_ documents: [QueryDocumentSnapshot]) async -> [Post] {
+        // バックグラウンドでデコード処理
+        await Task.detached(priority: .userInitiated) {
+            documents.compactMap { doc -> Post? in
+                guard var post = try? doc.data(as: Post.self) else { return nil }
+                
+                // Base64からUIImageへバックグラウンドで変換
+                if let base64 = post.image_base64,
+                   let data = Data(base64Encoded: base64) {
+                    post.uiImage = UIImage(data: data)
+                }
+                return post
+            }
+        }.value
+    }
+    
     func createPost(title: String, description: String, image: UIImage?, user: User?) async -> Bool {
         guard let user = user else { return false }
         isLoading = true
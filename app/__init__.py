@@ -5,7 +5,7 @@ from datetime import datetime
 import firebase_admin
 from dotenv import load_dotenv
 from firebase_admin import credentials, firestore
-from flask import Flask
+from flask import Flask, jsonify
 
 
 def create_app():
@@ -50,6 +50,18 @@ def create_app():
         print(f"Failed to initialize Firestore client: {e}")
         app.db = None
 
+    # --- Storage backend ---
+    # 投稿とユーザーの保存先。Firestore が無ければローカルのストア (STORAGE_BACKEND で固定もできる)
+    from app.services.storage import create_storage
+
+    try:
+        app.storage = create_storage(app.db)
+        if app.storage is not None:
+            print(f"Storage backend: {app.storage.backend}")
+    except Exception as e:
+        print(f"Failed to initialize storage backend: {e}")
+        app.storage = None
+
     # --- Register Blueprints ---
     from app.routes.admin import admin_bp
     from app.routes.auth import auth_bp
@@ -61,4 +73,55 @@ def create_app():
     app.register_blueprint(posts_bp, url_prefix="/api/posts")
     app.register_blueprint(admin_bp, url_prefix="/admin")
 
+    # --- Request metrics (/admin/metrics) ---
+    from app.utils import metrics
+
+    metrics.init_app(app)
+
+    # --- Backpressure ---
+    # 混雑時は処理を溜め込まずに 503 と再試行までの秒数を返す
+    from app.utils.pool import Overloaded
+
+    @app.errorhandler(Overloaded)
+    def handle_overloaded(e):
+        print(f"[overload] Rejected {e.pool_name} work: {e}")
+        response = jsonify({"error": "Server is busy. Please retry later.", "retry_after": e.retry_after})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
+    # --- Warm up translation memory ---
+    # 再起動直後の検索でDeepLを叩き直さないよう、よく使う訳文をメモリに載せておく
+    from app.services.translation_memory import translation_memory
+
+    try:
+        translation_memory.warm_start()
+    except Exception as e:
+        print(f"Failed to warm up translation memory: {e}")
+
+    # --- Load local article index ---
+    from app.services.article_index import article_index
+
+    try:
+        article_index.load()
+    except Exception as e:
+        print(f"Failed to load article index: {e}")
+
+    # --- Materialized post feed ---
+    # 新しい投稿をメモリに持ち、/api/posts を保存先に問い合わせずに返す
+    if app.storage is not None and os.getenv("POST_FEED_ENABLED", "1") == "1":
+        from app.services.post_feed import post_feed
+
+        try:
+            post_feed.start(app.storage.posts)
+        except Exception as e:
+            print(f"Failed to start post feed: {e}")
+
+    # --- Start feed prefetch scheduler ---
+    # /api/update のデフォルトフィードを裏で定期取得し、メモリから即座に返せるようにする
+    if os.getenv("PREFETCH_ENABLED", "1") == "1":
+        from app.services.prefetch import start_scheduler
+
+        start_scheduler()
+
     return app
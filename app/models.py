@@ -1,9 +1,173 @@
 # Models are now handled via Firestore dictionaries.
 # This file is kept to avoid import errors during transition or for future data classes.
+from datetime import datetime, timezone
+
+from app.services.dedup import article_id
 
 # Mock objects to satisfy existing imports until refactored
 class User:
     pass
 
 class Post:
-    pass
\ No newline at end of file
+    pass
+
+
+# JSONに出すときの公開日時の形式 (ISO 8601, UTC)
+PUBLISHED_AT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def parse_published_at(value):
+    """プロバイダごとに形式の違う公開日時を UTC の datetime にする（読めなければ None）"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    # タイムゾーンのない日時 (NewsData.io) は UTC とみなす
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class Article:
+    """
+    プロバイダから取得したニュース記事
+    キャッシュに大量に載るので __slots__ でメモリを抑え、集約・翻訳の間はコピーせずに受け渡す
+    翻訳は translations に {言語: (タイトル, 説明)} として持ち、返すときに to_dict で従来のJSONの形にする
+    """
+
+    __slots__ = (
+        "title",
+        "description",
+        "url",
+        "image",
+        "published_at",
+        "source",
+        "language",
+        "translations",
+        "alternates",
+    )
+
+    def __init__(
+        self,
+        title="",
+        description="",
+        url="",
+        image="",
+        published_at=None,
+        source="",
+        language=None,
+        translations=None,
+        alternates=None,
+    ):
+        self.title = title
+        self.description = description
+        self.url = url
+        self.image = image
+        self.published_at = parse_published_at(published_at)
+        self.source = source
+        self.language = language
+        # 翻訳・別ソースは持たない記事が多いので、必要になるまで None のままにする
+        self.translations = translations
+        self.alternates = alternates
+
+    def __repr__(self):
+        return f"Article(url={self.url!r}, language={self.language!r})"
+
+    @property
+    def id(self):
+        """正規化URLから作る安定した記事ID"""
+        return article_id(self.url)
+
+    def copy(self):
+        """浅いコピーを返す（翻訳・別ソースのリストは共有しないよう、書き換えるときに差し替える）"""
+        clone = Article.__new__(Article)
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+    def text(self, lang):
+        """lang での (タイトル, 説明) を返す。原文が lang でなく、翻訳もなければ None"""
+        if lang == self.language:
+            return self.title, self.description
+        if self.translations:
+            return self.translations.get(lang)
+        return None
+
+    def is_translated(self, lang):
+        return self.text(lang) is not None
+
+    def set_translation(self, lang, title, description):
+        # コピーと辞書を共有している場合があるので、書き換えずに新しい辞書にする
+        self.translations = {**(self.translations or {}), lang: (title, description)}
+
+    def add_alternate(self, url, source):
+        """同じ記事の別ソースを記録する"""
+        self.alternates = [*(self.alternates or ()), (url, source)]
+
+    def published_at_str(self):
+        if self.published_at is None:
+            return ""
+        return self.published_at.strftime(PUBLISHED_AT_FORMAT)
+
+    def to_dict(self, lang):
+        """
+        クライアントに返す辞書（表示言語 lang 用）にする
+        未翻訳の場合、表示言語の欄には原文を入れて "translated": False を付ける
+        """
+        original = (self.title, self.description)
+        target = self.text(lang) or original
+        ja = target if lang == "ja" else self.text("ja") or ("", "")
+        en = target if lang == "en" else self.text("en") or ("", "")
+        return {
+            "id": self.id,
+            "title_en": en[0],
+            "title_ja": ja[0],
+            "description_en": en[1],
+            "description_ja": ja[1],
+            "url": self.url,
+            "urlToImage": self.image,
+            "publishedAt": self.published_at_str(),
+            "source": self.source,
+            "alternates": [{"url": url, "source": source} for url, source in self.alternates or ()],
+            "lang": lang,
+            "translated": self.is_translated(lang),
+        }
+
+    def to_record(self):
+        """保存用に、すべての項目（全言語の翻訳を含む）をJSONにできる辞書にする"""
+        return {
+            "title": self.title,
+            "description": self.description,
+            "url": self.url,
+            "image": self.image,
+            "published_at": self.published_at_str(),
+            "source": self.source,
+            "language": self.language,
+            "translations": {lang: list(text) for lang, text in (self.translations or {}).items()},
+            "alternates": [list(alt) for alt in self.alternates or ()],
+        }
+
+    @classmethod
+    def from_record(cls, data):
+        """to_record で保存した辞書から記事を復元する"""
+        return cls(
+            title=data["title"],
+            description=data.get("description", ""),
+            url=data["url"],
+            image=data.get("image", ""),
+            published_at=data.get("published_at"),
+            source=data.get("source", ""),
+            language=data.get("language"),
+            translations={lang: tuple(text) for lang, text in data.get("translations", {}).items()} or None,
+            alternates=[tuple(alt) for alt in data.get("alternates", [])] or None,
+        )
+
+
+def serialize_articles(articles, lang):
+    """記事のリストをクライアントに返すJSONの形にする"""
+    return [article.to_dict(lang) for article in articles]
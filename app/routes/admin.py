@@ -1,5 +1,12 @@
-from flask import Blueprint, render_template, session, current_app
+from flask import Blueprint, Response, render_template, session, current_app
+from app.services.post_feed import post_feed
+from app.services.prefetch import get_status as get_feed_status
+from app.services.users import get_user
+from app.utils import metrics
+from app.utils.circuit_breaker import all_breakers
 from app.utils.decorators import admin_required
+from app.utils.pool import all_pools
+from app.utils.rate_limit import all_limiters
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -13,14 +20,32 @@ def admin_dashboard():
     if not user_id:
         return "Unauthorized", 401
     
-    db = current_app.db
+    storage = current_app.storage
     user_data = {}
-    if db:
-        doc = db.collection('users').document(user_id).get()
-        if doc.exists:
-            user_data = doc.to_dict()
+    if storage:
+        user_data = get_user(storage.users, user_id) or {}
     
-    return render_template("admin/index.html", current_user=user_data)
+    return render_template(
+        "admin/index.html",
+        current_user=user_data,
+        feeds=get_feed_status(),
+        limiters=all_limiters(),
+        breakers=all_breakers(),
+        upstream=metrics.provider_summary(),
+        caches=metrics.cache_stats(),
+        translation=metrics.translation_summary(),
+        pools=all_pools(),
+        post_feed=post_feed.status(),
+    )
+
+
+@admin_bp.route("/metrics")
+@admin_required
+def admin_metrics():
+    """
+    Prometheus形式のメトリクス
+    """
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
 
 
 @admin_bp.route("/users")
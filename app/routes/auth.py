@@ -1,8 +1,9 @@
 import os
 from datetime import datetime
 from flask import Blueprint, request, jsonify, session, current_app
-from firebase_admin import auth, firestore
+from firebase_admin import auth
 from werkzeug.utils import secure_filename
+from app.services.users import cache_user, get_user, invalidate_user, remember_roles
 from app.utils.files import allowed_file
 
 auth_bp = Blueprint('auth', __name__)
@@ -22,27 +23,32 @@ def login():
         uid = decoded_token['uid']
         email = decoded_token.get('email')
 
-        # Firestoreからユーザー情報を取得、なければ作成
-        db = current_app.db
-        if db:
-            user_ref = db.collection('users').document(uid)
-            user_doc = user_ref.get()
-            
-            if not user_doc.exists:
+        # 保存先からユーザー情報を取得、なければ作成
+        storage = current_app.storage
+        if storage:
+            user_data = storage.users.get(uid)
+
+            if user_data is None:
                 # 新規ユーザーとして保存
                 user_data = {
                     'email': email,
-                    'created_at': firestore.SERVER_TIMESTAMP,
                     'icon': decoded_token.get('picture', "")
                 }
-                user_ref.set(user_data)
-                print(f"[login] Created new user in Firestore: {email} ({uid})")
+                storage.users.create(uid, user_data)
+                # created_at は保存先で決まる（Firestore ならサーバー側）ので、次に読むときに取り直す
+                invalidate_user(uid)
+                print(f"[login] Created new user in {storage.backend}: {email} ({uid})")
             else:
+                cache_user(uid, user_data)
                 print(f"[login] User logged in: {email} ({uid})")
+        else:
+            user_data = {}
 
         # セッションにログイン情報を保存
         session["user_id"] = uid
         session["user_email"] = email
+        # 権限もセッションに入れておき、管理画面のたびにユーザー情報を読まないようにする
+        remember_roles(user_data)
 
         return jsonify({
             "uid": uid,
@@ -74,14 +80,12 @@ def get_current_user():
     if not user_id:
         return jsonify({"logged_in": False}), 200
     
-    # Firestoreから最新情報を取得
-    db = current_app.db
+    # 保存先から最新情報を取得（短時間はキャッシュを使う）
+    storage = current_app.storage
     user_data = {}
-    if db:
+    if storage:
         try:
-            doc = db.collection('users').document(user_id).get()
-            if doc.exists:
-                user_data = doc.to_dict()
+            user_data = get_user(storage.users, user_id) or {}
         except Exception as e:
             print(f"Error fetching user data: {e}")
 
@@ -108,7 +112,7 @@ def register():
 @auth_bp.route("/profile", methods=["PUT"])
 def update_profile():
     """
-    ユーザープロフィール更新 (Firestore)
+    ユーザープロフィール更新
     注意: パスワードやメールアドレスの変更は本来Firebase Client SDKで行うべき。
     ここではFirestore上のユーザーメタデータ(アイコンなど)の更新を行う。
     """
@@ -116,13 +120,11 @@ def update_profile():
     if not user_id:
         return jsonify({"error": "Not authenticated"}), 401
 
-    db = current_app.db
-    if not db:
+    storage = current_app.storage
+    if not storage:
         return jsonify({"error": "Database error"}), 500
 
     try:
-        user_ref = db.collection('users').document(user_id)
-        
         # アイコン更新
         icon_url = None
         if "icon" in request.files:
@@ -145,7 +147,8 @@ def update_profile():
             updates['email'] = new_email
 
         if updates:
-            user_ref.set(updates, merge=True)
+            storage.users.update(user_id, updates)
+            invalidate_user(user_id)
             # セッション情報も更新
             if 'email' in updates:
                 session['user_email'] = updates['email']
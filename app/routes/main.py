@@ -1,10 +1,24 @@
-from flask import Blueprint, render_template, request, jsonify
-from app.services.aggregator import get_translated_articles
-from app.models import Post
+from flask import Blueprint, Response, render_template, request, jsonify, session
+from app.services.aggregator import translate_articles, translate_texts
+from app.services.result_cache import FRESH_SECONDS, get_articles_json, stream_articles
+from app.services.search import search_articles, stream_search_articles
+from app.models import Post, serialize_articles
+from app.utils.http_cache import json_response
+from app.utils.json_codec import dumps
+from app.utils.pool import Overloaded
+import json
 import os
 
 main_bp = Blueprint('main', __name__)
 
+# フィード・検索結果は結果キャッシュが新しいとみなす間だけブラウザ側でも再利用させ、
+# その後は ETag で再検証させる（変わっていなければ 304）
+ARTICLES_CACHE_CONTROL = f"public, max-age={int(FRESH_SECONDS)}, stale-while-revalidate=300"
+
+# /api/translate の1リクエストあたりの上限（任意のテキストの翻訳はDeepLの利用量に直結するため）
+TRANSLATE_MAX_ITEMS = int(os.getenv("TRANSLATE_MAX_ITEMS", "50"))
+TRANSLATE_MAX_CHARS = int(os.getenv("TRANSLATE_MAX_CHARS", "5000"))
+
 @main_bp.route("/")
 def index():
     """
@@ -45,11 +59,60 @@ def api_update():
     """
     API更新エンドポイント: ニュース記事を取得してJSONで返す
     クエリパラメータ: lang=en または lang=ja (デフォルト: ja)
+                      lazy=1 で翻訳を後回しにして原文のまま返す（/api/translate で翻訳する）
     """
     lang = request.args.get("lang", "ja")
+    lazy = _is_lazy()
     # デフォルトのクエリを"Apple"に設定
-    articles = get_translated_articles(query="Apple", page_size=10, lang=lang)
-    return jsonify(articles)
+    # キャッシュ済みの結果はエンコード済みのバイト列をそのまま返す
+    encoded = get_articles_json(query="Apple", page_size=10, lang=lang, lazy=lazy)
+    return json_response(encoded, cache_control=ARTICLES_CACHE_CONTROL)
+
+
+def _is_lazy():
+    """クエリパラメータ lazy=1 が指定されているか"""
+    return request.args.get("lazy") == "1"
+
+
+def _sse_response(batches, lang="ja"):
+    """
+    記事のまとまりを Server-Sent Events で順に送るレスポンスを作る (記事は表示言語 lang 用のJSONにする)
+    各まとまりは "articles" イベント、最後に "done" イベントを送る
+    """
+    def generate():
+        count = 0
+        try:
+            for batch in batches:
+                count += len(batch)
+                data = dumps(serialize_articles(batch, lang)).decode("utf-8")
+                yield f"event: articles\ndata: {data}\n\n"
+        except Overloaded as e:
+            # ヘッダーは送信済みなので 503 にはできない。再試行までの秒数をイベントで伝える
+            print(f"[stream] Overloaded: {e}")
+            data = json.dumps({"error": str(e), "retry_after": e.retry_after})
+            yield f"event: error\ndata: {data}\n\n"
+        except Exception as e:
+            print(f"[stream] Error: {type(e).__name__}: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'count': count})}\n\n"
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@main_bp.route("/api/update/stream")
+def api_update_stream():
+    """
+    /api/update のストリーミング版 (Server-Sent Events)
+    プロバイダから記事が返るたびに、翻訳済みの記事をすぐに送る
+    """
+    lang = request.args.get("lang", "ja")
+    return _sse_response(
+        stream_articles(query="Apple", page_size=10, lang=lang, lazy=_is_lazy()), lang
+    )
 
 
 @main_bp.route("/api/search", methods=["GET"])
@@ -68,16 +131,76 @@ def search():
         # Previously used SQLAlchemy: Post.query.filter(...)
         filtered_posts = []
 
-        # NewsAPI/NewsData.io/GNewsで記事を検索
-        print(f"[search] Searching external APIs for: {query}, lang={lang}")
-        articles = get_translated_articles(query=query, page_size=10, lang=lang)
+        # ローカルのインデックスを検索し、足りない分をNewsAPI/NewsData.io/GNewsで補う
+        print(f"[search] Searching for: {query}, lang={lang}")
+        articles = search_articles(query=query, page_size=10, lang=lang, lazy=_is_lazy())
 
         # Note: filtered_posts is currently a list of dicts or objects. 
         # Since it is empty, we don't need to call .to_dict() on items.
-        return jsonify(
-            {"posts": filtered_posts, "articles": articles}
-        ), 200
+        return json_response(
+            {"posts": filtered_posts, "articles": serialize_articles(articles, lang)},
+            cache_control=ARTICLES_CACHE_CONTROL,
+        )
 
+    except Overloaded:
+        # 503 + Retry-After はアプリ全体のエラーハンドラで返す
+        raise
     except Exception as e:
         print(f"[search] Error: {type(e).__name__}: {e}")
         return jsonify({"error": str(e)}), 500
+
+
+@main_bp.route("/api/search/stream", methods=["GET"])
+def search_stream():
+    """
+    記事検索のストリーミング版 (Server-Sent Events)
+    プロバイダから記事が返るたびに、翻訳済みの記事をすぐに送る
+    """
+    query = request.args.get("q", "").strip()
+    lang = request.args.get("lang", "ja")
+    if not query:
+        return _sse_response([])
+
+    print(f"[search_stream] Searching for: {query}, lang={lang}")
+    return _sse_response(
+        stream_search_articles(query=query, page_size=10, lang=lang, lazy=_is_lazy()), lang
+    )
+
+
+@main_bp.route("/api/translate", methods=["POST"])
+def api_translate():
+    """
+    遅延翻訳モードで返した記事・テキストを翻訳する
+    JSON: {"ids": [記事ID, ...], "lang": "ja"} または {"texts": [テキスト, ...], "lang": "ja"}
+    texts はログインしているユーザーだけが使え、件数と合計文字数に上限がある
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        lang = data.get("lang", "ja")
+        if lang not in ("ja", "en"):
+            return jsonify({"error": "lang must be 'ja' or 'en'"}), 400
+
+        ids = data.get("ids") or []
+        texts = data.get("texts") or []
+        if not isinstance(ids, list) or not isinstance(texts, list):
+            return jsonify({"error": "ids and texts must be lists"}), 400
+        if not ids and not texts:
+            return jsonify({"error": "ids or texts is required"}), 400
+        if texts and not session.get("user_id"):
+            return jsonify({"error": "Authentication required"}), 401
+        if len(ids) > TRANSLATE_MAX_ITEMS or len(texts) > TRANSLATE_MAX_ITEMS:
+            return jsonify({"error": f"At most {TRANSLATE_MAX_ITEMS} ids or texts per request"}), 413
+        if sum(len(str(t)) for t in texts) > TRANSLATE_MAX_CHARS:
+            return jsonify({"error": f"texts must be at most {TRANSLATE_MAX_CHARS} characters in total"}), 413
+
+        result = {}
+        if ids:
+            articles = translate_articles([str(i) for i in ids], lang)
+            result["articles"] = serialize_articles(articles, lang)
+        if texts:
+            result["translations"] = translate_texts([str(t) for t in texts], lang)
+        return jsonify(result), 200
+
+    except Exception as e:
+        print(f"[translate] Error: {type(e).__name__}: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -1,49 +1,60 @@
+import io
 import os
 from datetime import datetime
-from flask import Blueprint, request, jsonify, session, current_app
+from flask import Blueprint, Response, request, jsonify, session, current_app
 from werkzeug.utils import secure_filename
-from firebase_admin import firestore
+from app.services.post_feed import post_feed
+from app.services.post_import import import_posts
+from app.services.posts import list_posts, parse_limit
+from app.utils.decorators import admin_required
 from app.utils.files import allowed_file
+from app.utils.http_cache import json_response
+from app.utils.json_codec import dumps
 
 posts_bp = Blueprint('posts', __name__)
 
+# 投稿は新しいものがすぐ見えるよう毎回再検証させる（変わっていなければ ETag で 304）
+POSTS_CACHE_CONTROL = "no-cache"
+
 @posts_bp.route("", methods=["GET"])
 def get_posts():
     """
-    ユーザー投稿を取得 (Firestore)
+    ユーザー投稿を新しい順に1ページ分取得 (メモリ上のビュー、範囲外は保存先)
+    クエリパラメータ: limit=件数 (デフォルト20、最大100)
+                      cursor=前のレスポンスの next_cursor (続きを取得する)
+    レスポンス: {"posts": [...], "next_cursor": 次のページのカーソル (最後のページなら null)}
     """
     try:
-        db = current_app.db
-        if not db:
-            return jsonify([]), 200
-
-        posts_ref = db.collection('posts')
-        query = posts_ref.order_by('timestamp', direction=firestore.Query.DESCENDING)
-        docs = query.stream()
-
-        posts = []
-        for doc in docs:
-            post_data = doc.to_dict()
-            # タイムスタンプの変換 (Firestore Timestamp to ISO string)
-            if 'timestamp' in post_data and post_data['timestamp']:
-                # firestore.SERVER_TIMESTAMPの場合は取得時にdatetimeになることがある
-                ts = post_data['timestamp']
-                if hasattr(ts, 'isoformat'):
-                    post_data['timestamp'] = ts.isoformat()
-            
-            # クライアント互換性のためのフィールド追加
-            post_data['id'] = doc.id
-            post_data['type'] = 'user_post'
-            
-            # author情報を取得 (本来はjoinするか、投稿時に非正規化して埋め込むべき)
-            # ここでは簡易的に post_data に含まれていると仮定するか、
-            # user_email から引く実装にするが、パフォーマンスのため一旦埋め込み期待
-            if 'user_email' in post_data and 'author_email' not in post_data:
-                post_data['author_email'] = post_data['user_email']
-
-            posts.append(post_data)
-
-        return jsonify(posts)
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+
+    cursor = request.args.get("cursor")
+    try:
+        # 新しい投稿はメモリ上のビューから返す（先頭ページはエンコード済みのバイト列）
+        if not cursor:
+            encoded = post_feed.first_page_json(limit)
+            if encoded is not None:
+                return json_response(encoded, cache_control=POSTS_CACHE_CONTROL)
+        else:
+            result = post_feed.page(limit, cursor)
+            if result is not None:
+                posts, next_cursor = result
+                return json_response(
+                    {"posts": posts, "next_cursor": next_cursor}, cache_control=POSTS_CACHE_CONTROL
+                )
+
+        # ビューの準備ができていない・範囲外の古いページは保存先から取得する
+        storage = current_app.storage
+        if not storage:
+            return json_response({"posts": [], "next_cursor": None})
+
+        posts, next_cursor = list_posts(storage.posts, limit=limit, cursor=cursor)
+        return json_response(
+            {"posts": posts, "next_cursor": next_cursor}, cache_control=POSTS_CACHE_CONTROL
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"[get_posts] Error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -52,7 +63,7 @@ def get_posts():
 @posts_bp.route("", methods=["POST"])
 def create_post():
     """
-    新しい投稿を作成 (Firestore)
+    新しい投稿を作成
     """
     user_id = session.get("user_id")
     user_email = session.get("user_email")
@@ -87,9 +98,9 @@ def create_post():
                 # blob.make_public()
                 # image_url = blob.public_url
 
-        # Firestoreに保存
-        db = current_app.db
-        if not db:
+        # 保存先 (Firestore またはローカルのストア) に保存
+        storage = current_app.storage
+        if not storage:
             return jsonify({"error": "Database not connected"}), 500
 
         new_post_data = {
@@ -98,20 +109,51 @@ def create_post():
             'image': image_url,
             'user_id': user_id,
             'user_email': user_email,
-            'timestamp': firestore.SERVER_TIMESTAMP
         }
 
-        # postsコレクションに追加
-        update_time, post_ref = db.collection('posts').add(new_post_data)
-        
+        # postsコレクションに追加（タイムスタンプは保存先が付ける）
+        post_id, timestamp = storage.posts.add(new_post_data)
+
         # レスポンス用にIDを追加
-        new_post_data['id'] = post_ref.id
-        # datetimeオブジェクトはJSONシリアライズできないので変換
-        new_post_data['timestamp'] = datetime.now().isoformat()
+        new_post_data['id'] = post_id
+        # SERVER_TIMESTAMP の代わりに書き込み時刻を返す（エンコード時に ISO 8601 の文字列になる）
+        new_post_data['timestamp'] = timestamp
+        # 次の読み込みですぐ見えるよう、メモリ上のビューにも入れておく
+        post_feed.upsert(post_id, new_post_data)
 
-        print(f"[create_post] Created new post in Firestore: {title}")
-        return jsonify(new_post_data), 201
+        print(f"[create_post] Created new post in {storage.backend}: {title}")
+        return Response(dumps(new_post_data), status=201, mimetype="application/json")
 
     except Exception as e:
         print(f"[create_post] Error: {type(e).__name__}: {e}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@posts_bp.route("/import", methods=["POST"])
+@admin_required
+def import_posts_route():
+    """
+    投稿の一括取り込み (管理者のみ)
+    本文: NDJSON (1行1投稿) または投稿の JSON 配列。読みながら検証し、バッチ書き込みで保存する
+    クエリパラメータ: skip=読み飛ばす件数 (途中で失敗したときは前回の committed を渡して再開)
+    レスポンス: {"imported", "invalid", "batches", "committed", "errors": [...], "error"?}
+    """
+    storage = current_app.storage
+    if not storage:
+        return jsonify({"error": "Database not connected"}), 500
+
+    try:
+        skip = int(request.args.get("skip", 0))
+        if skip < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "skip must be a non-negative integer"}), 400
+
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8")
+    result = import_posts(storage.posts, stream, skip=skip)
+    print(
+        f"[import_posts] Imported {result['imported']} posts into {storage.backend} "
+        f"({result['invalid']} invalid, committed {result['committed']})"
+    )
+    # 途中で失敗した場合も、どこまで保存できたか (committed) を返す
+    return jsonify(result), (500 if "error" in result else 200)
@@ -1,161 +1,406 @@
+import asyncio
 import os
-from concurrent.futures import ThreadPoolExecutor
-from app.services.deepl import translate_to_en, translate_to_ja
-from app.services.gnews import fetch_full_articles_gnews
-from app.services.newsapi import fetch_full_articles
-from app.services.newsdata import fetch_full_articles_newsdata
 
-# 翻訳処理を並列実行するためのスレッドプール
-executor = ThreadPoolExecutor(max_workers=5)
+from app.services import gnews, newsapi, newsdata
+from app.services.article_index import article_index
+from app.services.dedup import ArticleClusterer
+from app.services.deepl import translate_many_async
+from app.services.gnews import fetch_full_articles_gnews_async
+from app.services.newsapi import fetch_full_articles_async
+from app.services.newsdata import fetch_full_articles_newsdata_async
+from app.services.runtime import provider_pool, run_sync, search_pool
+from app.services.translation_memory import translation_memory
+from app.utils.cache import LRUCache
+from app.utils.circuit_breaker import get_breaker
+from app.utils.metrics import register_cache, translation_texts, upstream_skipped
+from app.utils.pool import Overloaded
+from app.utils.rate_limit import get_limiter
+from app.utils.singleflight import SingleFlight
 
-# 翻訳キャッシュ
-translation_cache = {}
+# 翻訳キャッシュ（URL×言語ごとの (タイトル, 説明)。件数・推定サイズの上限とTTLつきのLRU）
+translation_cache = LRUCache(
+    max_entries=int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "5000")),
+    max_bytes=int(os.getenv("TRANSLATION_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("TRANSLATION_CACHE_TTL", str(24 * 60 * 60))),
+)
 
-def _translate_article(article_tuple):
-    """個々の記事を翻訳するヘルパー関数"""
-    article, target_lang = article_tuple
-    source_lang = article.get("language", "en") # デフォルトは英語とみなす
-    url = article.get("url")
+# 遅延翻訳モードで未翻訳のまま返した記事（記事ID -> Article）。/api/translate で使う
+lazy_articles = LRUCache(
+    max_entries=int(os.getenv("LAZY_ARTICLES_MAX_ENTRIES", "5000")),
+    ttl=float(os.getenv("LAZY_ARTICLES_TTL", str(24 * 60 * 60))),
+)
 
-    # キャッシュチェック
-    cache_key = f"{url}_{target_lang}"
-    if cache_key in translation_cache:
-        return translation_cache[cache_key]
+register_cache("translation", translation_cache)
+register_cache("lazy_articles", lazy_articles)
 
+# 1回の検索でプロバイダの応答を待つ上限（秒）。これを過ぎたら返ってきた分だけで結果を作る
+DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "5"))
+# この秒数たっても応答がないプロバイダには同じリクエストをもう1本送る（0で無効）
+HEDGE_AFTER_SECONDS = float(os.getenv("SEARCH_HEDGE_AFTER_SECONDS", "0"))
+
+# 実行中の同一プロバイダ呼び出し・同一テキストの翻訳を共有する
+# プロバイダ呼び出しは、締め切りで待つ検索がなくなったら止めて枠を空ける
+_provider_flight = SingleFlight(cancel_abandoned=True)
+_translation_flight = SingleFlight()
+
+
+async def _translate_and_store_async(texts, target_lang):
+    """DeepLで翻訳し、成功した訳文を永続翻訳メモリに保存する"""
+    translated = await translate_many_async(texts, target_lang)
+    new_translations = {t: tr for t, tr in zip(texts, translated) if tr}
+    await asyncio.to_thread(translation_memory.put_many, new_translations, target_lang)
+    return translated
+
+
+async def _translate_texts_async(texts, target_lang, use_deepl=True):
+    """
+    テキストをまとめて翻訳し、{原文: 訳文} を返す (Async)
+    永続翻訳メモリにあるものはそれを使い、残りだけをDeepLに投げる
+    use_deepl=False の場合は翻訳メモリにあるものだけを返す
+    """
+    unique_texts = list(dict.fromkeys(t for t in texts if t))
+    translations = {}
+    if not unique_texts:
+        return translations
     try:
-        # すでにターゲット言語の場合は翻訳不要
-        if source_lang == target_lang:
-            result = {
-                "title_en": article["title"] if target_lang == "en" else "",
-                "title_ja": article["title"] if target_lang == "ja" else "",
-                "description_en": article["description"] if target_lang == "en" else "",
-                "description_ja": article["description"] if target_lang == "ja" else "",
-                "url": article["url"],
-                "urlToImage": article["urlToImage"],
-                "publishedAt": article["publishedAt"],
-                "source": article["source"],
-                "lang": target_lang,
-            }
-            translation_cache[cache_key] = result
-            return result
-
-        if target_lang == "ja":
-            # 英語(または他)→日本語に翻訳
-            # 空文字やNoneのチェック
-            title = article.get("title") or ""
-            desc = article.get("description") or ""
-            
-            title_ja = translate_to_ja(title) if title else ""
-            description_ja = translate_to_ja(desc) if desc else ""
-            
-            result = {
-                "title_en": title,
-                "title_ja": title_ja or title,
-                "description_en": desc,
-                "description_ja": description_ja or desc,
-                "url": article["url"],
-                "urlToImage": article["urlToImage"],
-                "publishedAt": article["publishedAt"],
-                "source": article["source"],
-                "lang": "ja",
-            }
-        else:
-            # 日本語→英語に翻訳
-            title = article.get("title") or ""
-            desc = article.get("description") or ""
-
-            title_en = translate_to_en(title) if title else ""
-            description_en = translate_to_en(desc) if desc else ""
-            
-            result = {
-                "title_en": title_en or title,
-                "title_ja": title,
-                "description_en": description_en or desc,
-                "description_ja": desc,
-                "url": article["url"],
-                "urlToImage": article["urlToImage"],
-                "publishedAt": article["publishedAt"],
-                "source": article["source"],
-                "lang": "en",
-            }
-        
-        translation_cache[cache_key] = result
-        return result
+        translations = await asyncio.to_thread(
+            translation_memory.get_many, unique_texts, target_lang
+        )
+        translation_texts.inc(len(translations), source="memory")
+        missing = [t for t in unique_texts if t not in translations]
+        if missing and use_deepl:
+            # 他の検索がすでに翻訳中のテキストはその結果を待つ
+            translated = await _translation_flight.do_many(
+                [(t, target_lang) for t in missing],
+                lambda keys: _translate_and_store_async([t for t, _ in keys], target_lang),
+            )
+            new_translations = {t: tr for (t, _), tr in translated.items() if tr}
+            translation_texts.inc(len(new_translations), source="deepl")
+            translations.update(new_translations)
     except Exception as e:
-        print(f"[_translate_article] Error processing article: {e}")
-        return {
-            "title_en": article.get("title", ""),
-            "title_ja": article.get("title", ""),
-            "description_en": article.get("description", ""),
-            "description_ja": article.get("description", ""),
-            "url": article.get("url", ""),
-            "urlToImage": article.get("urlToImage", ""),
-            "publishedAt": article.get("publishedAt", ""),
-            "source": article.get("source", ""),
-            "lang": target_lang,
-        }
-
-
-def get_translated_articles(query="Apple", page_size=10, lang="ja"):
+        print(f"[_translate_articles] Error translating articles: {e}")
+    return translations
+
+
+async def _translate_articles_async(articles, target_lang, lazy=False):
     """
-    ニュース記事を取得し、言語に応じて翻訳する（複数API並列対応、英語・日本語両方の記事を取得）
+    記事リストをまとめて翻訳する (Async)
+    未翻訳のタイトル・説明を検索全体から集めて重複を除き、
+    DeepLへのリクエストをできるだけ少ない回数にまとめる
+    訳文は各 Article に直接持たせるので、記事そのものはコピーしない
+    lazy=True の場合はDeepLを呼ばず、翻訳メモリにない記事は未翻訳のまま返す
+    （クライアントが表示する分だけ /api/translate で翻訳する）
     """
-    print(f"[get_translated_articles] Received query: '{query}', target lang: {lang}")
+    pending = []
+    texts = []
 
-    keywords = query.split()
-    api_query = " AND ".join(f'"{k}"' for k in keywords)
+    for article in articles:
+        # すでにターゲット言語の記事、または翻訳済みの記事は翻訳不要
+        if article.is_translated(target_lang):
+            continue
+
+        # キャッシュチェック
+        cached = translation_cache.get(f"{article.url}_{target_lang}")
+        if cached is not None:
+            article.set_translation(target_lang, *cached)
+            continue
+
+        pending.append(article)
+        texts.extend((article.title, article.description))
+
+    if pending:
+        translations = await _translate_texts_async(texts, target_lang, use_deepl=not lazy)
+
+        for article in pending:
+            complete = all(t in translations for t in (article.title, article.description) if t)
+            if lazy and not complete:
+                # 未翻訳のまま返し、あとで翻訳できるよう記事を覚えておく
+                lazy_articles.set(article.id, article)
+                continue
+            # 翻訳に失敗したテキストは原文のまま
+            title = translations.get(article.title) or article.title
+            desc = translations.get(article.description) or article.description
+            article.set_translation(target_lang, title, desc)
+            if complete:
+                translation_cache.set(f"{article.url}_{target_lang}", (title, desc))
+
+    # 記事をローカル検索用のインデックスに取り込む（未翻訳の記事も記事IDで引けるように保存する）
+    await asyncio.to_thread(article_index.add_many, articles)
+    return articles
+
+
+def apply_cached_translations(articles, target_lang):
+    """未翻訳の記事のうち、その後に翻訳されたものに訳文を反映する"""
+    for article in articles:
+        if not article.is_translated(target_lang):
+            cached = translation_cache.get(f"{article.url}_{target_lang}")
+            if cached is not None:
+                article.set_translation(target_lang, *cached)
+    return articles
+
+
+async def translate_articles_async(ids, target_lang):
+    """
+    遅延翻訳モードで返した記事を、記事IDを指定して翻訳する (Async)
+    翻訳キャッシュ・翻訳メモリを通すので、すでに翻訳済みのものはDeepLに投げない
+    このプロセスが覚えていない記事（他のワーカーや再起動前に返したもの）はローカルの記事ストアから探す
+    原文が見つからないIDは結果に含めない
+    """
+    ids = list(dict.fromkeys(ids))
+    found = {}
+    for article_id in ids:
+        article = lazy_articles.get(article_id)
+        if article is not None:
+            found[article_id] = article
+    missing = [article_id for article_id in ids if article_id not in found]
+    if missing:
+        found.update(await asyncio.to_thread(article_index.get_many, missing))
+    articles = [found[article_id] for article_id in ids if article_id in found]
+    if not articles:
+        return []
+    return await _translate_articles_async(articles, target_lang)
+
+
+async def translate_texts_async(texts, target_lang):
+    """テキストのリストを翻訳し、同じ順序で訳文を返す（翻訳できなかったものは None）(Async)"""
+    translations = await _translate_texts_async(texts, target_lang)
+    return [translations.get(t) for t in texts]
+
+
+def _can_hedge(name):
+    """2本目を送っても断られないか（ブレーカーが閉じていて、予算とプロバイダ呼び出しの枠が残っている）"""
+    return (
+        get_breaker(name).is_closed()
+        and get_limiter(name, PROVIDER_API_KEYS[name]).has_budget()
+        and not provider_pool.is_saturated()
+    )
+
+
+async def _hedged(name, fn):
+    """
+    遅いプロバイダに対するヘッジ付き呼び出し
+    HEDGE_AFTER_SECONDS 以内に応答がなければ2本目を送り、先に記事を返した方を使う
+    片方が空の結果（断られた・失敗した）で先に返っても、もう片方を待つ
+    （締め切りは呼び出し側で打ち切る）
+    """
+    if HEDGE_AFTER_SECONDS <= 0:
+        return await fn()
+
+    first = asyncio.ensure_future(fn())
+    done, _ = await asyncio.wait({first}, timeout=HEDGE_AFTER_SECONDS)
+    if done or not _can_hedge(name):
+        return await first
+
+    second = asyncio.ensure_future(fn())
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result():
+                    return task.result()
+        # どちらも記事を返さなかった（失敗だけなら最初の呼び出しの例外を送出する）
+        for task in (first, second):
+            if task.exception() is None:
+                return task.result()
+        return first.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _pooled(name, fn):
+    """プロバイダ呼び出しの枠を確保して実行する（プールが一杯ならこの呼び出しは諦める）"""
+    try:
+        async with provider_pool.slot():
+            return await fn()
+    except Overloaded:
+        print(f"[get_translated_articles] Provider pool saturated. Skipping {name}.")
+        upstream_skipped.inc(provider=name, reason="overloaded")
+        return []
+
+
+# 1回の検索でのプロバイダごとの呼び出し回数（_provider_calls と合わせる）
+PROVIDER_CALLS_PER_SEARCH = {"newsapi": 1, "newsdata": 2, "gnews": 2}
+# プロバイダごとのAPIキー（レート制限はキーごと）
+PROVIDER_API_KEYS = {"newsapi": newsapi.API_KEY, "newsdata": newsdata.API_KEY, "gnews": gnews.API_KEY}
+
+
+def _provider_calls(api_query, page_size):
+    """
+    5つのプロバイダ呼び出しを (推定言語, コルーチン) のリストで返す
+    同じ呼び出しが実行中ならその結果を共有する
+    """
+    def call(name, fetch, **kwargs):
+        key = (name, api_query, page_size, kwargs.get("language"))
+        return _provider_flight.do(
+            key,
+            lambda: _hedged(
+                name, lambda: _pooled(name, lambda: fetch(query=api_query, page_size=page_size, **kwargs))
+            ),
+        )
 
-    # 各APIへのリクエストを並列実行
-    with ThreadPoolExecutor(max_workers=5) as api_executor:
-        futures = []
-        
+    # APIごとに言語を推定（本来はAPI側でセットすべきだが、ここで補完）
+    return [
         # 1. NewsAPI (英語記事のみ)
-        futures.append(api_executor.submit(fetch_full_articles, query=api_query, page_size=page_size))
-        
+        ("en", call("newsapi", fetch_full_articles_async)),
         # 2. NewsData.io (英語と日本語両方取得)
-        futures.append(api_executor.submit(fetch_full_articles_newsdata, query=api_query, page_size=page_size, language="en"))
-        futures.append(api_executor.submit(fetch_full_articles_newsdata, query=api_query, page_size=page_size, language="ja"))
-        
+        ("en", call("newsdata", fetch_full_articles_newsdata_async, language="en")),
+        ("ja", call("newsdata", fetch_full_articles_newsdata_async, language="ja")),
         # 3. GNews (英語と日本語両方取得)
-        futures.append(api_executor.submit(fetch_full_articles_gnews, query=api_query, page_size=page_size, language="en"))
-        futures.append(api_executor.submit(fetch_full_articles_gnews, query=api_query, page_size=page_size, language="ja"))
-
-        all_results = [future.result() for future in futures]
-
-    # 言語情報を付加しつつ結果を結合
-    # (注: 各APIモジュールが 'language' キーを返すと想定)
-    combined_articles = []
-    for i, result_list in enumerate(all_results):
-        # APIごとに言語を推定（本来はAPI側でセットすべきだが、ここで補完）
-        # 0: NewsAPI(en), 1: NewsData(en), 2: NewsData(ja), 3: GNews(en), 4: GNews(ja)
-        est_lang = "ja" if i in [2, 4] else "en"
-        for art in result_list:
-            if "language" not in art:
-                art["language"] = est_lang
-            combined_articles.append(art)
-
-    # 重複排除
-    all_articles = []
-    seen_urls = set()
-    for article in combined_articles:
-        url = article.get("url")
-        if url and url not in seen_urls:
-            all_articles.append(article)
-            seen_urls.add(url)
-
-    # 厳密なタイトル検索
-    filtered_articles = []
+        ("en", call("gnews", fetch_full_articles_gnews_async, language="en")),
+        ("ja", call("gnews", fetch_full_articles_gnews_async, language="ja")),
+    ]
+
+
+async def _iter_provider_results(calls):
+    """
+    プロバイダ呼び出しを並行実行し、返ってきた順に (推定言語, 記事リスト) を返す
+    DEADLINE_SECONDS を過ぎても返らない呼び出しは打ち切って捨てる
+    （他の検索が待っていなければ、上流への呼び出しそのものも止まる）
+    """
+    tasks = {asyncio.ensure_future(coro): est_lang for est_lang, coro in calls}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + DEADLINE_SECONDS
+    pending = set(tasks)
+    try:
+        while pending:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    yield tasks[task], task.result()
+    finally:
+        if pending:
+            print(f"[get_translated_articles] Deadline reached. Dropping {len(pending)} provider calls.")
+            for task in pending:
+                task.cancel()
+
+
+async def _gather_until_deadline(calls):
+    """
+    プロバイダ呼び出しを並行実行し、DEADLINE_SECONDS までに返ってきた結果だけを集める
+    間に合わなかった呼び出しの結果は捨てる（順序を保つため空リストで埋める）
+    """
+    tasks = [asyncio.ensure_future(coro) for _, coro in calls]
+    done, pending = await asyncio.wait(tasks, timeout=DEADLINE_SECONDS)
+    if pending:
+        print(f"[get_translated_articles] Deadline reached. Dropping {len(pending)} provider calls.")
+        for task in pending:
+            task.cancel()
+
+    results = []
+    for (est_lang, _), task in zip(calls, tasks):
+        if task in done and task.exception() is None:
+            results.append((est_lang, task.result()))
+        else:
+            results.append((est_lang, []))
+    return results
+
+
+def _dedupe(result_list, est_lang, clusterer):
+    """
+    言語情報を付加しつつ記事を clusterer に追加し、新しく代表になった記事だけを返す
+    URLの正規化とタイトルの類似度で、別プロバイダから届いた同じ記事を1件にまとめる
+    """
+    articles = []
+    for art in result_list:
+        if not art.language:
+            art.language = est_lang
+        if not art.url:
+            continue
+        representative = clusterer.add(art)
+        if representative is not None:
+            articles.append(representative)
+    return articles
+
+
+def _merge_results(all_results):
+    """各APIの結果 [(推定言語, 記事リスト), ...] を結合し、重複をまとめる"""
+    clusterer = ArticleClusterer()
+    for est_lang, result_list in all_results:
+        _dedupe(result_list, est_lang, clusterer)
+    return clusterer.articles
+
+
+def _filter_by_keywords(articles, keywords):
+    """厳密なタイトル検索: すべてのキーワードをタイトルに含む記事のみ残す"""
     lower_keywords = [k.lower() for k in keywords]
-    for article in all_articles:
-        title_lower = (article.get("title") or "").lower()
+    filtered_articles = []
+    for article in articles:
+        title_lower = (article.title or "").lower()
         if all(k in title_lower for k in lower_keywords):
             filtered_articles.append(article)
+    return filtered_articles
 
-    if not filtered_articles:
-        return []
 
-    # 翻訳処理を並列実行
-    tasks = [(article, lang) for article in filtered_articles]
-    result_articles = list(executor.map(_translate_article, tasks))
+def _parse_query(query):
+    """検索キーワードと、各APIに渡すクエリ文字列を返す"""
+    keywords = query.split()
+    return keywords, " AND ".join(f'"{k}"' for k in keywords)
+
+
+async def iter_translated_articles_async(query="Apple", page_size=10, lang="ja", lazy=False):
+    """
+    翻訳済み記事を、プロバイダから返ってきた順に少しずつ返す (Async generator)
+    各プロバイダの結果ごとに重複排除・絞り込み・翻訳をしてすぐに yield する
+    同時に実行できる検索の数を超えて待ち行列も一杯なら Overloaded を送出する
+    """
+    print(f"[iter_translated_articles] Received query: '{query}', target lang: {lang}")
+
+    keywords, api_query = _parse_query(query)
+    clusterer = ArticleClusterer()
+    async with search_pool.slot():
+        calls = _provider_calls(api_query, page_size)
+        async for est_lang, result_list in _iter_provider_results(calls):
+            filtered_articles = _filter_by_keywords(
+                _dedupe(result_list, est_lang, clusterer), keywords
+            )
+            if filtered_articles:
+                yield await _translate_articles_async(filtered_articles, lang, lazy=lazy)
+
+
+async def get_translated_articles_async(query="Apple", page_size=10, lang="ja", lazy=False):
+    """
+    ニュース記事を取得し、言語に応じて翻訳する (Async)
+    5つのAPI呼び出しをイベントループ上のコルーチンとして並行実行し、翻訳はまとめて行う
+    応答の遅いプロバイダは締め切り (DEADLINE_SECONDS) で打ち切り、返ってきた分だけで結果を作る
+    同時に実行できる検索の数を超えて待ち行列も一杯なら Overloaded を送出する
+    """
+    print(f"[get_translated_articles] Received query: '{query}', target lang: {lang}")
+
+    keywords, api_query = _parse_query(query)
+
+    async with search_pool.slot():
+        all_results = await _gather_until_deadline(_provider_calls(api_query, page_size))
+
+        filtered_articles = _filter_by_keywords(_merge_results(all_results), keywords)
+        if not filtered_articles:
+            return []
+
+        # 翻訳処理（検索全体でまとめてDeepLに投げる）
+        return await _translate_articles_async(filtered_articles, lang, lazy=lazy)
+
+
+def get_translated_articles(query="Apple", page_size=10, lang="ja", lazy=False):
+    """
+    ニュース記事を取得し、言語に応じて翻訳する（複数API並列対応、英語・日本語両方の記事を取得）
+    Flaskの同期ルートから呼ぶためのラッパーで、処理は常駐イベントループ上で行う
+    """
+    return run_sync(
+        get_translated_articles_async(query=query, page_size=page_size, lang=lang, lazy=lazy)
+    )
+
+
+def translate_articles(ids, target_lang):
+    """記事IDを指定して翻訳する（Flaskの同期ルート用）"""
+    return run_sync(translate_articles_async(ids, target_lang))
+
 
-    return result_articles
+def translate_texts(texts, target_lang):
+    """テキストのリストを翻訳する（Flaskの同期ルート用）"""
+    return run_sync(translate_texts_async(texts, target_lang))
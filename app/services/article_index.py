@@ -0,0 +1,259 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from app.models import Article
+from app.services.dedup import canonicalize_url
+from app.utils.text import tokenize
+
+# 環境変数の読み込み
+load_dotenv()
+
+DB_PATH = os.getenv("ARTICLE_DB_PATH", os.path.join("instance", "articles.sqlite3"))
+# メモリ上のインデックスに載せる記事数の上限（古いものから外す）
+MAX_DOCS = int(os.getenv("ARTICLE_INDEX_MAX_DOCS", "50000"))
+# SQLite に残す期間（日）。これより古い記事と、新しい順で MAX_DOCS 件を超えた記事は削除する
+RETENTION_DAYS = float(os.getenv("ARTICLE_INDEX_RETENTION_DAYS", "30"))
+# 削除を実行する最短の間隔（秒）。書き込みのたびには削除しない
+PRUNE_INTERVAL_SECONDS = 600
+# ローカル検索で「十分な件数がある」と判断するときに数える記事の新しさ（時間）
+FRESH_HOURS = float(os.getenv("ARTICLE_INDEX_FRESH_HOURS", "6"))
+
+# BM25のパラメータ
+K1 = 1.5
+B = 0.75
+# タイトルは説明文より重視する
+TITLE_WEIGHT = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    doc_id TEXT PRIMARY KEY,
+    lang TEXT NOT NULL,
+    data TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    article_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_added_at ON articles (added_at);
+"""
+
+
+def _texts(article):
+    """記事の原文と翻訳の (タイトル, 説明) のリスト"""
+    return [(article.title, article.description), *(article.translations or {}).values()]
+
+
+def _doc_terms(article):
+    """記事の検索対象テキスト（原文と翻訳のタイトル・説明）をトークンの出現回数にする"""
+    terms = Counter()
+    for title, description in _texts(article):
+        for token in tokenize(title):
+            terms[token] += TITLE_WEIGHT
+        terms.update(tokenize(description))
+    return terms
+
+
+class ArticleIndex:
+    """
+    取得したことのある翻訳済み記事のローカルストアと転置インデックス (BM25)
+    記事は正規化URLごとに1件（翻訳はすべての言語分をまとめて）SQLite に保存し、起動時にメモリ上へ読み込む
+    """
+
+    def __init__(self, path=DB_PATH, max_docs=MAX_DOCS):
+        self.path = path
+        self.max_docs = max_docs
+        self._docs = {}  # 正規化URL -> (Article, added_at)
+        self._doc_len = {}
+        self._postings = {}  # term -> {doc_id: tf}
+        self._total_len = 0
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._pruned_at = None
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            # article_id 列がない古いDBには列を足す（それ以前の行は記事IDでは引けない）
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(articles)")}
+            if "article_id" not in columns:
+                conn.execute("ALTER TABLE articles ADD COLUMN article_id TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_article_id ON articles (article_id)")
+            self._local.conn = conn
+        return conn
+
+    def _prune(self, conn):
+        """保存期間を過ぎた記事と、新しい順で max_docs 件を超えた記事を SQLite から削除する"""
+        self._pruned_at = time.monotonic()
+        cutoff = time.time() - RETENTION_DAYS * 24 * 60 * 60
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM articles WHERE added_at < ? OR doc_id IN ("
+                "SELECT doc_id FROM articles ORDER BY added_at DESC LIMIT -1 OFFSET ?)",
+                (cutoff, self.max_docs),
+            ).rowcount
+        if removed:
+            print(f"[ArticleIndex] Pruned {removed} articles.")
+        return removed
+
+    def load(self):
+        """保存済みの記事を新しい順に max_docs 件までインデックスへ読み込む"""
+        try:
+            conn = self._connect()
+            self._prune(conn)
+            rows = conn.execute(
+                "SELECT doc_id, data, added_at FROM articles ORDER BY added_at DESC LIMIT ?",
+                (self.max_docs,),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[ArticleIndex] Load failed: {e}")
+            return 0
+
+        with self._lock:
+            for doc_id, data, added_at in reversed(rows):
+                try:
+                    article = Article.from_record(json.loads(data))
+                except (ValueError, KeyError, TypeError):
+                    # 読めない行（古い形式など）は読み飛ばす
+                    continue
+                self._index(doc_id, article, added_at)
+        print(f"[ArticleIndex] Loaded {len(rows)} articles.")
+        return len(rows)
+
+    def _index(self, doc_id, article, added_at):
+        if doc_id in self._docs:
+            self._unindex(doc_id)
+
+        terms = _doc_terms(article)
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        length = sum(terms.values())
+        self._docs[doc_id] = (article, added_at)
+        self._doc_len[doc_id] = length
+        self._total_len += length
+
+        # 上限を超えたら最も古い記事から外す（dict は挿入順なので先頭が最も古い）
+        while len(self._docs) > self.max_docs:
+            self._unindex(next(iter(self._docs)))
+
+    def _unindex(self, doc_id):
+        article, _ = self._docs.pop(doc_id)
+        for term in _doc_terms(article):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    def add_many(self, articles):
+        """
+        記事をまとめて追加・更新する（インデックスとSQLiteの両方）
+        遅延翻訳モードで未翻訳のまま返した記事も入れておき、/api/translate で記事IDから引けるようにする
+        （検索では表示言語で読める記事しか返さない）
+        """
+        now = time.time()
+        rows = []
+        with self._lock:
+            for article in articles:
+                doc_id = canonicalize_url(article.url)
+                if not doc_id:
+                    continue
+                self._index(doc_id, article, now)
+                rows.append(
+                    (doc_id, article.language or "", json.dumps(article.to_record(), ensure_ascii=False), now, article.id)
+                )
+
+        if not rows:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO articles (doc_id, lang, data, added_at, article_id) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            if self._pruned_at is None or time.monotonic() - self._pruned_at >= PRUNE_INTERVAL_SECONDS:
+                self._prune(conn)
+        except sqlite3.Error as e:
+            print(f"[ArticleIndex] Write failed: {e}")
+
+    def get_many(self, ids):
+        """
+        記事IDで保存済みの記事を引き、{記事ID: Article} を返す
+        SQLite から読むので、他のワーカーや再起動前に保存した記事も見つかる
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        found = {}
+        try:
+            placeholders = ",".join("?" * len(ids))
+            rows = self._connect().execute(
+                f"SELECT article_id, data FROM articles WHERE article_id IN ({placeholders})", ids
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[ArticleIndex] Read failed: {e}")
+            return found
+        for article_id, data in rows:
+            try:
+                found[article_id] = Article.from_record(json.loads(data))
+            except (ValueError, KeyError, TypeError):
+                continue
+        return found
+
+    def search(self, query, lang="ja", limit=10, max_age_hours=None):
+        """
+        BM25で記事を検索する
+        lang で表示できる（原文が lang か、lang への翻訳がある）記事のうち、
+        クエリの単語をすべてタイトル（原文か翻訳）に含むものだけを返す
+        """
+        keywords = [k.lower() for k in query.split()]
+        terms = set(tokenize(query))
+        if not keywords or not terms:
+            return []
+        cutoff = time.time() - max_age_hours * 3600 if max_age_hours else None
+
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            scores = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = K1 * (1 - B + B * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+            results = []
+            for doc_id, _ in scores.most_common():
+                article, added_at = self._docs[doc_id]
+                if (cutoff and added_at < cutoff) or not article.is_translated(lang):
+                    continue
+                title = " ".join(t for t, _ in _texts(article)).lower()
+                if all(k in title for k in keywords):
+                    results.append(article)
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def __len__(self):
+        return len(self._docs)
+
+
+article_index = ArticleIndex()
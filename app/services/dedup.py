@@ -0,0 +1,144 @@
+import hashlib
+import os
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from app.utils.text import is_cjk, tokenize
+
+# SimHashのハミング距離がこれ以下なら同じ記事とみなす
+SIMHASH_MAX_DISTANCE = int(os.getenv("DEDUP_SIMHASH_MAX_DISTANCE", "3"))
+# 単語集合のJaccard係数がこれ以上なら同じ記事とみなす（短いタイトル向けの補助判定）
+JACCARD_THRESHOLD = float(os.getenv("DEDUP_JACCARD_THRESHOLD", "0.75"))
+# 日本語のタイトルは文字bigramで比べるので、短いと製品名1つの違いでも係数が高くなる。より厳しく判定する
+# （"アップル 新型iPhoneを発表" と "アップル 新型iPadを発表" は 0.75）
+CJK_JACCARD_THRESHOLD = float(os.getenv("DEDUP_CJK_JACCARD_THRESHOLD", "0.9"))
+
+# 転載・計測用のクエリパラメータ（URL正規化時に取り除く）
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "ocid", "cmpid", "ref", "ref_src",
+    "src", "source", "spm", "mc_cid", "mc_eid", "igshid", "outputtype", "amp",
+}
+_MOBILE_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+# "タイトル - Reuters" や "タイトル | BBC" のような末尾の媒体名
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+
+
+def canonicalize_url(url):
+    """
+    転載・モバイル版・AMP版などの違いを吸収したURLを返す
+    (スキーム・www/m/amp ホスト・計測用パラメータ・末尾スラッシュ・/amp を無視する)
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in _MOBILE_HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+
+    path = parts.path
+    if path.endswith("/amp") or path.endswith("/amp/"):
+        path = path[: path.rfind("/amp")]
+    path = path.rstrip("/")
+
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ]
+    return urlunsplit(("", host, path, urlencode(sorted(query)), ""))
+
+
+def article_id(url):
+    """正規化URLから記事の安定したIDを作る（同じ記事ならプロバイダや検索をまたいでも同じ）"""
+    return hashlib.sha1(canonicalize_url(url).encode("utf-8")).hexdigest()[:16]
+
+
+def title_tokens(title):
+    """
+    タイトルを比較用のトークン集合にする（英語は単語と連続する2語、日本語は文字bigram）
+    連続する2語も入れるので、"A sues B" と "B sues A" のように語順だけが違うタイトルはまとめない
+    """
+    tokens = tokenize(_SOURCE_SUFFIX_RE.sub("", title or ""))
+    words = [token for token in tokens if not is_cjk(token)]
+    return set(tokens) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def simhash(tokens, bits=64):
+    """トークン集合から SimHash の指紋を作る"""
+    weights = [0] * bits
+    for token in tokens:
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(bits):
+            weights[i] += 1 if (h >> i) & 1 else -1
+    fingerprint = 0
+    for i, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << i
+    return fingerprint
+
+
+def _is_near_duplicate(a, b):
+    """2つの (tokens, simhash) がほぼ同じタイトルかどうか"""
+    tokens_a, hash_a = a
+    tokens_b, hash_b = b
+    if not tokens_a or not tokens_b:
+        return False
+    if bin(hash_a ^ hash_b).count("1") <= SIMHASH_MAX_DISTANCE:
+        return True
+    threshold = JACCARD_THRESHOLD
+    if any(is_cjk(token) for token in tokens_a | tokens_b):
+        threshold = max(threshold, CJK_JACCARD_THRESHOLD)
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b) >= threshold
+
+
+class ArticleClusterer:
+    """
+    複数プロバイダから届いた同じ記事（URL違い・タイトルほぼ同じ）を1件にまとめる
+    最初に届いた記事を代表とし、後から届いた重複は代表の "alternates" に出典として付ける
+    """
+
+    def __init__(self):
+        self._by_url = {}
+        self._representatives = []
+        # 代表記事ごとの (tokens, simhash)
+        self._fingerprints = []
+
+    def add(self, article):
+        """記事を追加する。新しい代表記事になった場合はその記事を、重複なら None を返す"""
+        canonical = canonicalize_url(article.url)
+        if canonical and canonical in self._by_url:
+            self._attach(self._by_url[canonical], article)
+            return None
+
+        tokens = title_tokens(article.title)
+        fingerprint = (tokens, simhash(tokens))
+        for representative, other in zip(self._representatives, self._fingerprints):
+            if _is_near_duplicate(fingerprint, other):
+                self._attach(representative, article)
+                if canonical:
+                    self._by_url[canonical] = representative
+                return None
+
+        # プロバイダの結果は他の検索と共有されているので、代表記事は浅いコピーにして持つ
+        representative = article.copy()
+        representative.alternates = None
+        self._representatives.append(representative)
+        self._fingerprints.append(fingerprint)
+        if canonical:
+            self._by_url[canonical] = representative
+        return representative
+
+    def _attach(self, representative, article):
+        """重複記事を代表記事の別ソースとして記録し、欠けている項目を補う"""
+        if article.url != representative.url:
+            representative.add_alternate(article.url, article.source)
+        for field in ("description", "image", "published_at"):
+            if not getattr(representative, field) and getattr(article, field):
+                setattr(representative, field, getattr(article, field))
+
+    @property
+    def articles(self):
+        return list(self._representatives)
@@ -1,51 +1,183 @@
+import asyncio
 import os
+from urllib.parse import quote_plus
 
+import httpx
 import requests
 from dotenv import load_dotenv
 
+from app.services.runtime import translation_pool
+from app.services.transport import get_async_client, get_session, get_timeout
+from app.utils.circuit_breaker import get_breaker
+from app.utils.metrics import translation_chars, upstream_skipped
+from app.utils.pool import Overloaded
+from app.utils.rate_limit import get_limiter, retry_after_seconds
+
 # 環境変数の読み込み
 load_dotenv()
 
 AUTH_KEY = os.getenv("DEEPL_AUTH_KEY", "aea230ef-3ba0-446d-9996-cf72ab9c4065:fx")
-BASE_URL = "https://api-free.deepl.com/v2/translate"
+BASE_URL = os.getenv("DEEPL_BASE_URL", "https://api-free.deepl.com/v2/translate")
 
 
-def translate_to_ja(text):
-    """DeepLで受け取った英語テキストを日本語に翻訳"""
-    if not text:
-        return ""
+# DeepL APIの1リクエストあたりの上限
+# (textパラメータは50個まで、リクエスト全体は128KiBまで。余裕をもって小さめに区切る)
+MAX_TEXTS_PER_REQUEST = 50
+MAX_REQUEST_BYTES = 100 * 1024
+# auth_key と target_lang の分（フォームにエンコードした後の大きさ）
+_BASE_REQUEST_BYTES = len(f"auth_key={quote_plus(AUTH_KEY)}&target_lang=XX-XXXX")
+
+# 1回の翻訳で同時に送る分割リクエストの数（大きな検索1つがDeepLの枠を占有しないように）
+MAX_PARALLEL_CHUNKS = int(os.getenv("DEEPL_MAX_PARALLEL_CHUNKS", "2"))
+
+
+def _chunk_texts(texts):
+    """
+    DeepLのリクエストサイズ上限に収まるようにテキストを分割する
+    リクエストはフォーム形式で送るので、エンコード後の大きさで測る
+    (日本語は1文字が %XX%XX%XX の9バイトになる)
+    """
+    chunk = []
+    chunk_bytes = _BASE_REQUEST_BYTES
+    for text in texts:
+        size = len("&text=") + len(quote_plus(text))
+        if chunk and (
+            len(chunk) >= MAX_TEXTS_PER_REQUEST or chunk_bytes + size > MAX_REQUEST_BYTES
+        ):
+            yield chunk
+            chunk = []
+            chunk_bytes = _BASE_REQUEST_BYTES
+        chunk.append(text)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
 
-    payload = {"auth_key": AUTH_KEY, "text": text, "target_lang": "JA"}
+def _parse_translations(json_data, expected):
+    """DeepLのレスポンスから翻訳結果を取り出す（件数が合わない場合は空文字で埋める）"""
+    translations = [t.get("text", "") for t in json_data.get("translations", [])]
+    if len(translations) != expected:
+        return [""] * expected
+    return translations
+
+
+def _acquire_budget(chunk, target_lang):
+    """リクエスト数・文字数の予算を確保する（DeepLは文字数で課金される）"""
+    chars = sum(len(text) for text in chunk)
+    if get_limiter("deepl", AUTH_KEY).try_acquire(chars=chars):
+        translation_chars.inc(chars, target_lang=target_lang.lower())
+        return True
+    print("[translate_many] DeepL budget exhausted. Skipping translation.")
+    upstream_skipped.inc(provider="deepl", reason="budget_exhausted")
+    return False
+
+
+def translate_many(texts, target_lang):
+    """
+    複数のテキストをまとめてDeepLで翻訳し、入力と同じ順序のリストを返す
+    失敗したテキストには空文字を返す
+    """
+    breaker = get_breaker("deepl")
+    results = []
+    for chunk in _chunk_texts(texts):
+        if not breaker.allow():
+            print("[translate_many] DeepL circuit open. Skipping translation.")
+            upstream_skipped.inc(provider="deepl", reason="circuit_open")
+            results.extend([""] * len(chunk))
+            continue
+        if not _acquire_budget(chunk, target_lang):
+            results.extend([""] * len(chunk))
+            continue
+
+        payload = {"auth_key": AUTH_KEY, "text": chunk, "target_lang": target_lang.upper()}
+        try:
+            resp = get_session(BASE_URL, "deepl").post(BASE_URL, data=payload, timeout=get_timeout("deepl"))
+            resp.raise_for_status()
+            results.extend(_parse_translations(resp.json(), len(chunk)))
+            breaker.record_success()
+        except requests.exceptions.RequestException as exc:
+            print(f"[translate_many] DeepL request failed: {exc}")
+            if exc.response is not None and exc.response.status_code in (429, 456):
+                get_limiter("deepl", AUTH_KEY).block_for(retry_after_seconds(exc.response.headers))
+            breaker.record_failure()
+            results.extend([""] * len(chunk))
+    return results
+
+
+async def _translate_chunk_async(chunk, target_lang, limit):
     try:
-        resp = requests.post(BASE_URL, data=payload, timeout=10)
+        async with limit, translation_pool.slot():
+            return await _send_chunk_async(chunk, target_lang)
+    except Overloaded:
+        print("[translate_many] Translation pool saturated. Skipping translation.")
+        upstream_skipped.inc(provider="deepl", reason="overloaded")
+        return [""] * len(chunk)
+
+
+async def _send_chunk_async(chunk, target_lang):
+    breaker = get_breaker("deepl")
+    if not breaker.allow():
+        print("[translate_many] DeepL circuit open. Skipping translation.")
+        upstream_skipped.inc(provider="deepl", reason="circuit_open")
+        return [""] * len(chunk)
+    if not _acquire_budget(chunk, target_lang):
+        return [""] * len(chunk)
+
+    payload = {"auth_key": AUTH_KEY, "text": chunk, "target_lang": target_lang.upper()}
+    try:
+        resp = await get_async_client(BASE_URL, "deepl").post(
+            BASE_URL, data=payload, timeout=get_timeout("deepl")
+        )
         resp.raise_for_status()
-    except requests.exceptions.RequestException as exc:
-        print(f"[translate_to_ja] DeepL request failed: {exc}")
-        return ""
+        translations = _parse_translations(resp.json(), len(chunk))
+        breaker.record_success()
+        return translations
+    except httpx.HTTPError as exc:
+        print(f"[translate_many] DeepL request failed: {exc}")
+        if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in (429, 456):
+            get_limiter("deepl", AUTH_KEY).block_for(retry_after_seconds(exc.response.headers))
+        breaker.record_failure()
+        return [""] * len(chunk)
 
-    translations = resp.json().get("translations", [])
-    if not translations:
+
+async def translate_many_async(texts, target_lang):
+    """
+    複数のテキストをまとめてDeepLで翻訳し、入力と同じ順序のリストを返す (Async)
+    上限を超える場合は分割したリクエストを MAX_PARALLEL_CHUNKS 件ずつ並行して送る
+    """
+    limit = asyncio.Semaphore(max(1, MAX_PARALLEL_CHUNKS))
+    chunk_results = await asyncio.gather(
+        *(_translate_chunk_async(chunk, target_lang, limit) for chunk in _chunk_texts(texts))
+    )
+    return [text for chunk in chunk_results for text in chunk]
+
+
+def translate_to_ja(text):
+    """DeepLで受け取った英語テキストを日本語に翻訳"""
+    if not text:
         return ""
-    return translations[0].get("text", "")
+    return translate_many([text], "JA")[0]
 
 
 def translate_to_en(text):
     """DeepLで受け取った日本語テキストを英語に翻訳"""
     if not text:
         return ""
+    return translate_many([text], "EN")[0]
 
-    payload = {"auth_key": AUTH_KEY, "text": text, "target_lang": "EN"}
-    try:
-        resp = requests.post(BASE_URL, data=payload, timeout=10)
-        resp.raise_for_status()
-    except requests.exceptions.RequestException as exc:
-        print(f"[translate_to_en] DeepL request failed: {exc}")
+
+async def translate_to_ja_async(text):
+    """DeepLで受け取った英語テキストを日本語に翻訳 (Async)"""
+    if not text:
         return ""
+    return (await translate_many_async([text], "JA"))[0]
 
-    translations = resp.json().get("translations", [])
-    if not translations:
+
+async def translate_to_en_async(text):
+    """DeepLで受け取った日本語テキストを英語に翻訳 (Async)"""
+    if not text:
         return ""
-    return translations[0].get("text", "")
+    return (await translate_many_async([text], "EN"))[0]
 
 
 if __name__ == "__main__":
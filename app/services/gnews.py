@@ -1,14 +1,54 @@
 # gnews.py
 
 import os
+import httpx
 import requests
 from dotenv import load_dotenv
 
+from app.models import Article
+from app.services.transport import get_async_client, get_session, get_timeout
+from app.utils.circuit_breaker import get_breaker
+from app.utils.metrics import upstream_skipped
+from app.utils.rate_limit import get_limiter, retry_after_seconds
+
 # 環境変数の読み込み
 load_dotenv()
 
 API_KEY = os.getenv("GNEWS_API_KEY")
-BASE_URL = "https://gnews.io/api/v4/search"
+BASE_URL = os.getenv("GNEWS_BASE_URL", "https://gnews.io/api/v4/search")
+
+
+def _build_params(query, page_size, language):
+    """GNews APIのリクエストパラメータを組み立てる"""
+    # GNewsの言語コードに変換 (例: ja -> ja, en -> en)
+    lang_map = {"ja": "ja", "en": "en"}
+    gnews_lang = lang_map.get(language, "en")
+
+    return {
+        "apikey": API_KEY,
+        "q": query,
+        "lang": gnews_lang,
+        "max": page_size,
+        "in": "title",  # GNewsはタイトルでの検索をサポートしている
+    }
+
+
+def _normalize_articles(json_data):
+    """GNewsのレスポンスを共通形式の Article に正規化する"""
+    normalized_articles = []
+    for article in json_data.get("articles", []):
+        normalized_article = Article(
+            title=(article.get("title") or "").strip(),
+            description=(article.get("description") or "").strip(),
+            url=(article.get("url") or "").strip(),
+            image=(article.get("image") or "").strip(),
+            published_at=article.get("publishedAt"),
+            source=(article.get("source", {}).get("name") or "").strip(),
+        )
+        # タイトルとURLがある記事のみ追加
+        if normalized_article.title and normalized_article.url:
+            normalized_articles.append(normalized_article)
+    return normalized_articles
 
 
 def fetch_full_articles_gnews(
@@ -17,26 +57,15 @@ def fetch_full_articles_gnews(
     language: str = "en",
 ):
     """
-    GNews APIから記事を取得し、NewsAPIの形式に合わせた辞書のリストを返す
+    GNews APIから記事を取得し、共通形式の Article のリストを返す
     """
     if not API_KEY:
         print("[GNews] API key is not set. Skipping fetch.")
         return []
 
-    # GNewsの言語コードに変換 (例: ja -> ja, en -> en)
-    lang_map = {"ja": "ja", "en": "en"}
-    gnews_lang = lang_map.get(language, "en")
-
     try:
-        params = {
-            "apikey": API_KEY,
-            "q": query,
-            "lang": gnews_lang,
-            "max": page_size,
-            "in": "title",  # GNewsはタイトルでの検索をサポートしている
-        }
-
-        resp = requests.get(BASE_URL, params=params, timeout=15)
+        params = _build_params(query, page_size, language)
+        resp = get_session(BASE_URL, "gnews").get(BASE_URL, params=params, timeout=get_timeout("gnews"))
 
         if not resp.ok:
             try:
@@ -46,25 +75,7 @@ def fetch_full_articles_gnews(
             print(f"[GNews] Request failed ({resp.status_code}): {detail}. Returning empty list.")
             return []
 
-        json_data = resp.json()
-        articles = json_data.get("articles", [])
-        
-        # NewsAPIの形式に正規化する
-        normalized_articles = []
-        for article in articles:
-            normalized_article = {
-                "title": (article.get("title") or "").strip(),
-                "description": (article.get("description") or "").strip(),
-                "url": (article.get("url") or "").strip(),
-                "urlToImage": (article.get("image") or "").strip(),
-                "publishedAt": (article.get("publishedAt") or "").strip(),
-                "source": (article.get("source", {}).get("name") or "").strip(),
-            }
-            # タイトルとURLがある記事のみ追加
-            if normalized_article["title"] and normalized_article["url"]:
-                normalized_articles.append(normalized_article)
-        
-        return normalized_articles
+        return _normalize_articles(resp.json())
 
     except requests.exceptions.Timeout:
         print("[GNews] Request timeout. Returning empty list.")
@@ -76,6 +87,65 @@ def fetch_full_articles_gnews(
         print(f"[GNews] Unexpected error: {e}. Returning empty list.")
         return []
 
+
+async def fetch_full_articles_gnews_async(
+    query: str,
+    page_size: int = 5,
+    language: str = "en",
+):
+    """
+    GNews APIから記事を取得し、共通形式の Article のリストを返す (Async)
+    """
+    if not API_KEY:
+        print("[GNews] API key is not set. Skipping fetch.")
+        return []
+
+    breaker = get_breaker("gnews")
+    if not breaker.allow():
+        print("[GNews] Circuit open. Skipping fetch.")
+        upstream_skipped.inc(provider="gnews", reason="circuit_open")
+        return []
+
+    # 秒間・日次の予算が尽きていれば、リクエストを送らずにスキップする
+    if not get_limiter("gnews", API_KEY).try_acquire():
+        print("[GNews] Request budget exhausted. Skipping fetch.")
+        upstream_skipped.inc(provider="gnews", reason="budget_exhausted")
+        return []
+
+    try:
+        params = _build_params(query, page_size, language)
+        resp = await get_async_client(BASE_URL, "gnews").get(
+            BASE_URL, params=params, timeout=get_timeout("gnews")
+        )
+
+        if not resp.is_success:
+            try:
+                detail = resp.json().get("errors", resp.text)
+            except (ValueError, AttributeError):
+                detail = resp.text or f"HTTP {resp.status_code}"
+            print(f"[GNews] Request failed ({resp.status_code}): {detail}. Returning empty list.")
+            if resp.status_code == 429:
+                get_limiter("gnews", API_KEY).block_for(retry_after_seconds(resp.headers))
+            breaker.record_failure()
+            return []
+
+        articles = _normalize_articles(resp.json())
+        breaker.record_success()
+        return articles
+
+    except httpx.TimeoutException:
+        print("[GNews] Request timeout. Returning empty list.")
+        breaker.record_failure()
+        return []
+    except httpx.RequestError as e:
+        print(f"[GNews] Request exception: {e}. Returning empty list.")
+        breaker.record_failure()
+        return []
+    except Exception as e:
+        print(f"[GNews] Unexpected error: {e}. Returning empty list.")
+        breaker.record_failure()
+        return []
+
 if __name__ == "__main__":
     # テスト用
     test_query = "Tesla AND new AND model"
@@ -83,6 +153,6 @@ if __name__ == "__main__":
     fetched_articles = fetch_full_articles_gnews(query=test_query, page_size=5)
     if fetched_articles:
         for idx, article in enumerate(fetched_articles, 1):
-            print(f"{idx}. {article['title']} ({article['source']})")
+            print(f"{idx}. {article.title} ({article.source})")
     else:
         print("No articles found.")
@@ -0,0 +1,360 @@
+import bisect
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+    _FLOCK_AVAILABLE = True
+except ImportError:
+    # Windows ではロックを取らない
+    _FLOCK_AVAILABLE = False
+
+# 環境変数の読み込み
+load_dotenv()
+
+DATA_DIR = os.getenv("LOCAL_STORE_DIR", os.path.join("instance", "local_store"))
+# 旧形式の JSON (data/posts.json, data/users.json)。ストアが空のときだけ読み込む
+LEGACY_DIR = os.getenv("LOCAL_STORE_LEGACY_DIR", "data")
+# この件数だけログに追記したらスナップショットを書き出してログを空にする
+SNAPSHOT_EVERY = int(os.getenv("LOCAL_STORE_SNAPSHOT_EVERY", "1000"))
+# 書き込みのたびに fsync する（遅くなる代わりに電源断でも失われない）
+FSYNC = os.getenv("LOCAL_STORE_FSYNC", "0") == "1"
+
+LOG_FILE = "log.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+LOCK_FILE = "lock"
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value):
+    # タイムゾーンのない日時は UTC とみなす（旧形式の JSON など）
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _encode_value(obj):
+    # 日時は型を失わないよう {"$date": ISO 8601} として保存する
+    if isinstance(obj, datetime):
+        return {"$date": _as_utc(obj).isoformat()}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _decode_value(obj):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def _dumps(obj):
+    return json.dumps(obj, default=_encode_value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(text):
+    return json.loads(text, object_hook=_decode_value)
+
+
+def _parse_timestamp(value):
+    """旧形式の文字列のタイムスタンプを datetime にする（読めなければ None）"""
+    if isinstance(value, datetime):
+        return _as_utc(value)
+    try:
+        return _as_utc(datetime.fromisoformat(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class Record:
+    """Firestore の DocumentSnapshot と同じように使えるドキュメント"""
+
+    __slots__ = ("id", "update_time", "_data")
+
+    def __init__(self, doc_id, data, update_time):
+        self.id = doc_id
+        self.update_time = update_time
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field)
+
+
+class LocalStore:
+    """
+    1ノード用の組み込みストア
+    変更はすべて追記専用のログ (log.jsonl) に書き、メモリ上のデータに反映する
+    投稿はタイムスタンプ順のインデックスを持ち、新しい順のページを二分探索で切り出す
+    ログが SNAPSHOT_EVERY 件たまったらスナップショットを書き出してログを空にする
+    起動時はスナップショットを読んで、その後のログを再生する
+    1つのディレクトリを開けるのは1プロセスだけ（開いている間はディレクトリのロックを持つ）
+    """
+
+    def __init__(self, directory=DATA_DIR, legacy_dir=LEGACY_DIR, snapshot_every=SNAPSHOT_EVERY):
+        self.directory = directory
+        self.legacy_dir = legacy_dir
+        self.snapshot_every = snapshot_every
+        # コレクション -> {id: (データ, 更新時刻)}
+        self._collections = {"posts": {}, "users": {}}
+        # 投稿の (タイムスタンプ, id) を昇順に並べたインデックス
+        self._post_index = []
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._log = None
+        self._log_entries = 0
+        self._listeners = []
+        self._lock_file = None
+
+    # --- 起動 ---
+
+    def open(self):
+        """スナップショットとログからデータを復元する（初回は旧形式の JSON を取り込む）"""
+        with self._lock:
+            if self._log is not None:
+                return self
+            os.makedirs(self.directory, exist_ok=True)
+            self._acquire_lock()
+            snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+            log_path = os.path.join(self.directory, LOG_FILE)
+            fresh = not os.path.exists(snapshot_path) and not os.path.exists(log_path)
+
+            snapshot_seq = 0
+            if os.path.exists(snapshot_path):
+                with open(snapshot_path, encoding="utf-8") as f:
+                    snapshot = _loads(f.read())
+                snapshot_seq = self._seq = snapshot["seq"]
+                for collection, docs in snapshot["collections"].items():
+                    for doc_id, (data, update_time) in docs.items():
+                        self._apply(collection, doc_id, data, update_time)
+
+            replayed = 0
+            if os.path.exists(log_path):
+                with open(log_path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = _loads(line)
+                        except ValueError:
+                            # 書き込み途中で止まった最後の行は捨てる
+                            print(f"[LocalStore] Skipping a broken log line in {log_path}.")
+                            continue
+                        # スナップショットに含まれている分は飛ばす
+                        if entry["seq"] <= snapshot_seq:
+                            continue
+                        self._seq = entry["seq"]
+                        self._apply(entry["col"], entry["id"], entry["data"], entry["at"])
+                        replayed += 1
+
+            self._log = open(log_path, "a", encoding="utf-8")
+            self._log_entries = replayed
+            if fresh:
+                self._import_legacy()
+            print(
+                f"[LocalStore] Loaded {len(self._collections['posts'])} posts and "
+                f"{len(self._collections['users'])} users from {self.directory}."
+            )
+            return self
+
+    def _acquire_lock(self):
+        """ディレクトリの排他ロックを取る。他のプロセスが開いていれば RuntimeError"""
+        if not _FLOCK_AVAILABLE:
+            return
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Local store {self.directory} is already open in another process. "
+                "The local backend supports only a single process."
+            )
+        self._lock_file = lock_file
+
+    def _release_lock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _import_legacy(self):
+        """旧形式の data/posts.json と data/users.json を取り込む"""
+        imported_posts = imported_users = 0
+        posts = self._read_legacy("posts.json")
+        for post in posts:
+            data = dict(post)
+            doc_id = str(data.pop("id", "") or uuid.uuid4().hex[:20])
+            timestamp = _parse_timestamp(data.get("timestamp"))
+            if timestamp is None:
+                continue
+            data["timestamp"] = timestamp
+            self._write("posts", doc_id, data)
+            imported_posts += 1
+
+        users = self._read_legacy("users.json")
+        if isinstance(users, dict):
+            users = [dict(data, id=uid) for uid, data in users.items()]
+        for user in users:
+            data = dict(user)
+            uid = str(data.pop("id", "") or data.pop("uid", ""))
+            if uid:
+                self._write("users", uid, data)
+                imported_users += 1
+
+        if posts or users:
+            print(
+                f"[LocalStore] Imported {imported_posts} of {len(posts)} posts and "
+                f"{imported_users} of {len(users)} users from {self.legacy_dir}."
+            )
+
+    def _read_legacy(self, name):
+        path = os.path.join(self.legacy_dir, name)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f) or []
+        except (OSError, ValueError) as e:
+            print(f"[LocalStore] Failed to read {path}: {e}")
+            return []
+
+    # --- 書き込み ---
+
+    def _apply(self, collection, doc_id, data, update_time):
+        """メモリ上のデータとインデックスに反映する (data が None なら削除)"""
+        docs = self._collections.setdefault(collection, {})
+        previous = docs.get(doc_id)
+        if collection == "posts" and previous is not None:
+            key = (previous[0].get("timestamp"), doc_id)
+            i = bisect.bisect_left(self._post_index, key)
+            if i < len(self._post_index) and self._post_index[i] == key:
+                del self._post_index[i]
+
+        if data is None:
+            docs.pop(doc_id, None)
+            return
+        docs[doc_id] = (data, update_time)
+        if collection == "posts" and isinstance(data.get("timestamp"), datetime):
+            bisect.insort(self._post_index, (data["timestamp"], doc_id))
+
+    def _write(self, collection, doc_id, data):
+        """ログに追記してからメモリに反映する"""
+        return self._write_many(collection, [(doc_id, data)])
+
+    def _write_many(self, collection, items):
+        """複数件をまとめてログに追記し（flush は1回）、メモリに反映する"""
+        with self._lock:
+            update_time = _utcnow()
+            for doc_id, data in items:
+                self._seq += 1
+                entry = {"seq": self._seq, "col": collection, "id": doc_id, "data": data, "at": update_time}
+                self._log.write(_dumps(entry) + "\n")
+            self._log.flush()
+            if FSYNC:
+                os.fsync(self._log.fileno())
+            for doc_id, data in items:
+                self._apply(collection, doc_id, data, update_time)
+            self._log_entries += len(items)
+            if self._log_entries >= self.snapshot_every:
+                self.snapshot()
+        if collection == "posts":
+            self._notify()
+        return update_time
+
+    def snapshot(self):
+        """全データをスナップショットに書き出し、ログを空にする"""
+        with self._lock:
+            path = os.path.join(self.directory, SNAPSHOT_FILE)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(_dumps({"seq": self._seq, "collections": self._collections}))
+                f.flush()
+                os.fsync(f.fileno())
+            # 書き終わってから置き換えるので、途中で止まっても前のスナップショットが残る
+            os.replace(tmp_path, path)
+            self._log.close()
+            self._log = open(os.path.join(self.directory, LOG_FILE), "w", encoding="utf-8")
+            self._log_entries = 0
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self.snapshot()
+                self._log.close()
+                self._log = None
+                self._release_lock()
+
+    # --- 読み出し ---
+
+    def get(self, collection, doc_id):
+        with self._lock:
+            entry = self._collections.get(collection, {}).get(doc_id)
+        if entry is None:
+            return Record(doc_id, None, None)
+        return Record(doc_id, entry[0], entry[1])
+
+    def put(self, collection, doc_id, data):
+        return self._write(collection, doc_id, dict(data))
+
+    def put_many(self, collection, items):
+        """(id, データ) のリストをまとめて書き込む"""
+        return self._write_many(collection, [(doc_id, dict(data)) for doc_id, data in items])
+
+    def merge(self, collection, doc_id, updates):
+        with self._lock:
+            current = self._collections.get(collection, {}).get(doc_id)
+            data = dict(current[0]) if current else {}
+            data.update(updates)
+            return self._write(collection, doc_id, data)
+
+    def count(self, collection):
+        with self._lock:
+            return len(self._collections.get(collection, {}))
+
+    def newest_posts(self, limit, after=None, before=None):
+        """
+        投稿を新しい順に最大 limit 件返す
+        after: (タイムスタンプ, id) より古いものだけ / before: タイムスタンプより新しいものだけ
+        """
+        with self._lock:
+            index = self._post_index
+            end = len(index)
+            if after is not None:
+                end = bisect.bisect_left(index, (_as_utc(after[0]), after[1]))
+            start = max(0, end - limit)
+            if before is not None:
+                # 同じタイムスタンプの投稿は含めない
+                start = max(start, bisect.bisect_right(index, (_as_utc(before), "￿")))
+            docs = self._collections["posts"]
+            return [
+                Record(doc_id, docs[doc_id][0], docs[doc_id][1])
+                for _, doc_id in reversed(index[start:end])
+            ]
+
+    # --- 変更の通知 ---
+
+    def add_listener(self, callback):
+        """投稿が変わるたびに呼ばれる関数を登録し、登録を外す関数を返す"""
+        with self._lock:
+            self._listeners.append(callback)
+
+        def remove():
+            with self._lock:
+                if callback in self._listeners:
+                    self._listeners.remove(callback)
+        return remove
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"[LocalStore] Listener failed: {e}")
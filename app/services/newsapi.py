@@ -1,14 +1,21 @@
 import os
 from datetime import datetime, timedelta, timezone
 
+import httpx
 import requests
 from dotenv import load_dotenv
 
+from app.models import Article
+from app.services.transport import get_async_client, get_session, get_timeout
+from app.utils.circuit_breaker import get_breaker
+from app.utils.metrics import upstream_skipped
+from app.utils.rate_limit import get_limiter, retry_after_seconds
+
 # 環境変数の読み込み
 load_dotenv()
 
 API_KEY = os.getenv("NEWSAPI_KEY")
-BASE_URL = "https://newsapi.org/v2/everything"
+BASE_URL = os.getenv("NEWSAPI_BASE_URL", "https://newsapi.org/v2/everything")
 
 
 def _default_time_range(days_back: int = 7) -> tuple[str, str]:
@@ -19,6 +26,28 @@ def _default_time_range(days_back: int = 7) -> tuple[str, str]:
     return from_dt.strftime(fmt), to_dt.strftime(fmt)
 
 
+def _normalize_article(article):
+    """NewsAPIのレスポンス1件を共通形式の Article に変換"""
+    return Article(
+        title=(article.get("title") or "").strip(),
+        description=(article.get("description") or "").strip(),
+        url=(article.get("url") or "").strip(),
+        image=(article.get("urlToImage") or "").strip(),
+        published_at=article.get("publishedAt"),
+        source=(article.get("source", {}).get("name") or "").strip(),
+    )
+
+
+def _normalize_articles(json_data):
+    """レスポンス全体から、タイトルまたは説明がある記事のみを抽出して正規化"""
+    result = []
+    for article in json_data.get("articles", []):
+        article_data = _normalize_article(article)
+        if article_data.title or article_data.description:
+            result.append(article_data)
+    return result
+
+
 def fetch_articles(
     query="(Apple)",
     from_ts: str | None = None,
@@ -45,7 +74,7 @@ def fetch_articles(
             "apiKey": API_KEY,
         }
         
-        resp = requests.get(BASE_URL, params=params, timeout=10)
+        resp = get_session(BASE_URL, "newsapi").get(BASE_URL, params=params, timeout=get_timeout("newsapi"))
         
         # すべてのHTTPエラーをraise_for_status()の前にチェックして空リストを返す
         if not resp.ok:
@@ -115,7 +144,7 @@ def fetch_full_articles(
         if to_ts:
             params["to"] = to_ts
         
-        resp = requests.get(BASE_URL, params=params, timeout=10)
+        resp = get_session(BASE_URL, "newsapi").get(BASE_URL, params=params, timeout=get_timeout("newsapi"))
         
         # すべてのHTTPエラーをraise_for_status()の前にチェックして空リストを返す
         if not resp.ok:
@@ -139,21 +168,8 @@ def fetch_full_articles(
             print(f"[NewsAPI] Failed to parse JSON response: {e}. Returning empty list.")
             return []
         
-        articles = json_data.get("articles", [])
-        result = []
-        for article in articles:
-            article_data = {
-                "title": (article.get("title") or "").strip(),
-                "description": (article.get("description") or "").strip(),
-                "url": (article.get("url") or "").strip(),
-                "urlToImage": (article.get("urlToImage") or "").strip(),
-                "publishedAt": (article.get("publishedAt") or "").strip(),
-                "source": (article.get("source", {}).get("name") or "").strip(),
-            }
-            # タイトルまたは説明がある記事のみ追加
-            if article_data["title"] or article_data["description"]:
-                result.append(article_data)
-        return result
+        # タイトルまたは説明がある記事のみ追加
+        return _normalize_articles(json_data)
         
     except requests.exceptions.Timeout:
         print(f"[NewsAPI] Request timeout. Returning empty list.")
@@ -177,7 +193,20 @@ async def fetch_full_articles_async(
 ):
     """
     ニュース記事を取得し、記事全体（タイトル、説明、URLなど）のリストを返す (Async)
+    エラー時は空リストを返す
     """
+    breaker = get_breaker("newsapi")
+    if not breaker.allow():
+        print("[NewsAPI] Circuit open. Skipping fetch.")
+        upstream_skipped.inc(provider="newsapi", reason="circuit_open")
+        return []
+
+    # 秒間・日次の予算が尽きていれば、リクエストを送らずにスキップする
+    if not get_limiter("newsapi", API_KEY).try_acquire():
+        print("[NewsAPI] Request budget exhausted. Skipping fetch.")
+        upstream_skipped.inc(provider="newsapi", reason="budget_exhausted")
+        return []
+
     try:
         params = {
             "q": query,
@@ -185,47 +214,53 @@ async def fetch_full_articles_async(
             "pageSize": page_size,
             "apiKey": API_KEY,
         }
-        
+
         if from_ts:
             params["from"] = from_ts
         if to_ts:
             params["to"] = to_ts
-            
-        async with httpx.AsyncClient() as client:
+
+        client = get_async_client(BASE_URL, "newsapi")
+        try:
+            resp = await client.get(BASE_URL, params=params, timeout=get_timeout("newsapi"))
+        except httpx.TimeoutException:
+            print("[NewsAPI] Request timeout. Returning empty list.")
+            breaker.record_failure()
+            return []
+        except httpx.RequestError as e:
+            print(f"[NewsAPI] Async request error: {e}. Returning empty list.")
+            breaker.record_failure()
+            return []
+
+        if not resp.is_success:
             try:
-                resp = await client.get(BASE_URL, params=params, timeout=10)
-                
-                if resp.status_code != 200:
-                    detail = resp.text
-                    print(f"[NewsAPI] Request failed ({resp.status_code}): {detail}. Returning empty list.")
-                    return []
-                    
-                json_data = resp.json()
-                
-            except httpx.RequestError as e:
-                print(f"[NewsAPI] Async request error: {e}. Returning empty list.")
-                return []
-            except ValueError as e:
-                print(f"[NewsAPI] Failed to parse JSON response: {e}. Returning empty list.")
-                return []
-        
-        articles = json_data.get("articles", [])
-        result = []
-        for article in articles:
-            article_data = {
-                "title": (article.get("title") or "").strip(),
-                "description": (article.get("description") or "").strip(),
-                "url": (article.get("url") or "").strip(),
-                "urlToImage": (article.get("urlToImage") or "").strip(),
-                "publishedAt": (article.get("publishedAt") or "").strip(),
-                "source": (article.get("source", {}).get("name") or "").strip(),
-            }
-            if article_data["title"] or article_data["description"]:
-                result.append(article_data)
-        return result
-        
+                detail = resp.json().get("message", resp.text)
+            except (ValueError, AttributeError):
+                detail = resp.text or f"HTTP {resp.status_code}"
+
+            if resp.status_code == 429:
+                print(f"[NewsAPI] Rate limit exceeded (429): {detail}. Returning empty list.")
+                get_limiter("newsapi", API_KEY).block_for(retry_after_seconds(resp.headers))
+            elif resp.status_code >= 500:
+                print(f"[NewsAPI] Server error ({resp.status_code}): {detail}. Returning empty list.")
+            else:
+                print(f"[NewsAPI] Request failed ({resp.status_code}): {detail}. Returning empty list.")
+            breaker.record_failure()
+            return []
+
+        try:
+            json_data = resp.json()
+        except ValueError as e:
+            print(f"[NewsAPI] Failed to parse JSON response: {e}. Returning empty list.")
+            breaker.record_failure()
+            return []
+
+        breaker.record_success()
+        return _normalize_articles(json_data)
+
     except Exception as e:
         print(f"[NewsAPI] Unexpected error in async fetch: {e}. Returning empty list.")
+        breaker.record_failure()
         return []
 
 
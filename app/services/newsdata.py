@@ -1,14 +1,49 @@
 # newsdata_io.py
 
 import os
+import httpx
 import requests
 from dotenv import load_dotenv
 
+from app.models import Article
+from app.services.transport import get_async_client, get_session, get_timeout
+from app.utils.circuit_breaker import get_breaker
+from app.utils.metrics import upstream_skipped
+from app.utils.rate_limit import get_limiter, retry_after_seconds
+
 # 環境変数の読み込み
 load_dotenv()
 
 API_KEY = os.getenv("NEWSDATA_IO_API_KEY")
-BASE_URL = "https://newsdata.io/api/1/news"
+BASE_URL = os.getenv("NEWSDATA_BASE_URL", "https://newsdata.io/api/1/news")
+
+
+def _build_params(query, page_size, language):
+    """NewsData.io APIのリクエストパラメータを組み立てる"""
+    return {
+        "apikey": API_KEY,
+        "q": query,
+        "language": language,
+        "size": page_size,
+    }
+
+
+def _normalize_articles(json_data):
+    """NewsData.ioのレスポンスを共通形式の Article に正規化する"""
+    normalized_articles = []
+    for article in json_data.get("results", []):
+        normalized_article = Article(
+            title=(article.get("title") or "").strip(),
+            description=(article.get("description") or "").strip(),
+            url=(article.get("link") or "").strip(),
+            image=(article.get("image_url") or "").strip(),
+            published_at=article.get("pubDate"),
+            source=(article.get("source_id") or "").strip(),
+        )
+        # タイトルとURLがある記事のみ追加
+        if normalized_article.title and normalized_article.url:
+            normalized_articles.append(normalized_article)
+    return normalized_articles
 
 
 def fetch_full_articles_newsdata(
@@ -17,21 +52,15 @@ def fetch_full_articles_newsdata(
     language: str = "en",
 ):
     """
-    NewsData.io APIから記事を取得し、NewsAPIの形式に合わせた辞書のリストを返す
+    NewsData.io APIから記事を取得し、共通形式の Article のリストを返す
     """
     if not API_KEY:
         print("[NewsData.io] API key is not set. Skipping fetch.")
         return []
 
     try:
-        params = {
-            "apikey": API_KEY,
-            "q": query,
-            "language": language,
-            "size": page_size,
-        }
-
-        resp = requests.get(BASE_URL, params=params, timeout=15)
+        params = _build_params(query, page_size, language)
+        resp = get_session(BASE_URL, "newsdata").get(BASE_URL, params=params, timeout=get_timeout("newsdata"))
 
         if not resp.ok:
             try:
@@ -41,25 +70,7 @@ def fetch_full_articles_newsdata(
             print(f"[NewsData.io] Request failed ({resp.status_code}): {detail}. Returning empty list.")
             return []
 
-        json_data = resp.json()
-        articles = json_data.get("results", [])
-        
-        # NewsAPIの形式に正規化する
-        normalized_articles = []
-        for article in articles:
-            normalized_article = {
-                "title": (article.get("title") or "").strip(),
-                "description": (article.get("description") or "").strip(),
-                "url": (article.get("link") or "").strip(),
-                "urlToImage": (article.get("image_url") or "").strip(),
-                "publishedAt": (article.get("pubDate") or "").strip(),
-                "source": (article.get("source_id") or "").strip(),
-            }
-            # タイトルとURLがある記事のみ追加
-            if normalized_article["title"] and normalized_article["url"]:
-                normalized_articles.append(normalized_article)
-        
-        return normalized_articles
+        return _normalize_articles(resp.json())
 
     except requests.exceptions.Timeout:
         print("[NewsData.io] Request timeout. Returning empty list.")
@@ -71,6 +82,65 @@ def fetch_full_articles_newsdata(
         print(f"[NewsData.io] Unexpected error: {e}. Returning empty list.")
         return []
 
+
+async def fetch_full_articles_newsdata_async(
+    query: str,
+    page_size: int = 5,
+    language: str = "en",
+):
+    """
+    NewsData.io APIから記事を取得し、共通形式の Article のリストを返す (Async)
+    """
+    if not API_KEY:
+        print("[NewsData.io] API key is not set. Skipping fetch.")
+        return []
+
+    breaker = get_breaker("newsdata")
+    if not breaker.allow():
+        print("[NewsData.io] Circuit open. Skipping fetch.")
+        upstream_skipped.inc(provider="newsdata", reason="circuit_open")
+        return []
+
+    # 秒間・日次の予算が尽きていれば、リクエストを送らずにスキップする
+    if not get_limiter("newsdata", API_KEY).try_acquire():
+        print("[NewsData.io] Request budget exhausted. Skipping fetch.")
+        upstream_skipped.inc(provider="newsdata", reason="budget_exhausted")
+        return []
+
+    try:
+        params = _build_params(query, page_size, language)
+        resp = await get_async_client(BASE_URL, "newsdata").get(
+            BASE_URL, params=params, timeout=get_timeout("newsdata")
+        )
+
+        if not resp.is_success:
+            try:
+                detail = resp.json().get("results", {}).get("message", resp.text)
+            except (ValueError, AttributeError):
+                detail = resp.text or f"HTTP {resp.status_code}"
+            print(f"[NewsData.io] Request failed ({resp.status_code}): {detail}. Returning empty list.")
+            if resp.status_code == 429:
+                get_limiter("newsdata", API_KEY).block_for(retry_after_seconds(resp.headers))
+            breaker.record_failure()
+            return []
+
+        articles = _normalize_articles(resp.json())
+        breaker.record_success()
+        return articles
+
+    except httpx.TimeoutException:
+        print("[NewsData.io] Request timeout. Returning empty list.")
+        breaker.record_failure()
+        return []
+    except httpx.RequestError as e:
+        print(f"[NewsData.io] Request exception: {e}. Returning empty list.")
+        breaker.record_failure()
+        return []
+    except Exception as e:
+        print(f"[NewsData.io] Unexpected error: {e}. Returning empty list.")
+        breaker.record_failure()
+        return []
+
 if __name__ == "__main__":
     # テスト用
     test_query = "Tesla AND new AND model"
@@ -78,6 +148,6 @@ if __name__ == "__main__":
     fetched_articles = fetch_full_articles_newsdata(query=test_query, page_size=5)
     if fetched_articles:
         for idx, article in enumerate(fetched_articles, 1):
-            print(f"{idx}. {article['title']} ({article['source']})")
+            print(f"{idx}. {article.title} ({article.source})")
     else:
         print("No articles found.")
@@ -0,0 +1,216 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.services.posts import CARD_FIELDS, decode_cursor, encode_cursor, to_card
+from app.services.runtime import get_loop
+from app.utils.json_codec import encode
+
+# メモリに持っておく新しい投稿の件数
+FEED_SIZE = int(os.getenv("POST_FEED_SIZE", "200"))
+# "listen": 保存先の変更通知（Firestore ならスナップショットリスナー）で更新する（使えなければポーリングに切り替える）
+# "poll": 一定間隔で新しい投稿を取得する
+MODE = os.getenv("POST_FEED_MODE", "listen")
+POLL_SECONDS = float(os.getenv("POST_FEED_POLL_SECONDS", "15"))
+# ポーリングでは新着しか拾えないので、編集・削除を反映するためにときどき全体を取り直す
+FULL_REFRESH_SECONDS = float(os.getenv("POST_FEED_FULL_REFRESH_SECONDS", "600"))
+
+
+def _sort_key(timestamp, doc_id):
+    # naive な datetime は UTC とみなす（カーソルから戻した値と比べられるように）
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp, doc_id
+
+
+class PostFeed:
+    """
+    新しい投稿 FEED_SIZE 件をクライアント向けの形でメモリに持つビュー
+    起動時に読み込み、その後はスナップショットリスナー（またはポーリング）で差分だけ更新する
+    /api/posts はここから返し、範囲外のページだけ保存先に取りに行く
+    """
+
+    def __init__(self, size=FEED_SIZE):
+        self.size = size
+        # 新しい順の (並び替えキー, カード)
+        self._entries = []
+        # id -> (更新時刻, カード)。変わっていない投稿は変換し直さない
+        self._cards = {}
+        # 先頭ページのエンコード済みJSON (limit -> EncodedJSON)
+        self._encoded = {}
+        self._lock = threading.Lock()
+        self._ready = False
+        self._complete = False
+        self._watch = None
+        self._task = None
+        self.mode = None
+        self.last_update = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    # --- 読み出し ---
+
+    def page(self, limit, cursor=None):
+        """
+        メモリから1ページ分を (投稿のリスト, 次のカーソル) で返す
+        まだ読み込んでいない、またはページが保持している範囲を超える場合は None
+        """
+        with self._lock:
+            if not self._ready:
+                return None
+            entries = self._entries
+            complete = self._complete
+
+        start = 0
+        if cursor:
+            after = _sort_key(*decode_cursor(cursor))
+            # 降順に並んでいるので、カーソルより小さい最初の位置から
+            start = next((i for i, (key, _) in enumerate(entries) if key < after), len(entries))
+
+        end = start + limit
+        if end > len(entries) and not complete:
+            # メモリに無い古い投稿が必要
+            return None
+        page = entries[start:end]
+        next_cursor = None
+        if page and (end < len(entries) or not complete):
+            next_cursor = encode_cursor(*page[-1][0])
+        return [card for _, card in page], next_cursor
+
+    def first_page_json(self, limit):
+        """先頭ページをエンコード済みのJSONで返す（内容が変わるまで同じバイト列を使う）"""
+        # 先に取っておく（エンコード中に更新されたら、古い内容は捨てられる側の辞書に入る）
+        encoded_pages = self._encoded
+        encoded = encoded_pages.get(limit)
+        if encoded is None:
+            result = self.page(limit)
+            if result is None:
+                return None
+            posts, next_cursor = result
+            encoded = encode({"posts": posts, "next_cursor": next_cursor})
+            encoded_pages[limit] = encoded
+        return encoded
+
+    def status(self):
+        """管理画面用の状態"""
+        return {
+            "mode": self.mode,
+            "ready": self._ready,
+            "posts": len(self._entries),
+            "last_update": datetime.fromtimestamp(self.last_update) if self.last_update else None,
+        }
+
+    # --- 更新 ---
+
+    def _card(self, snapshot):
+        update_time = getattr(snapshot, "update_time", None)
+        cached = self._cards.get(snapshot.id)
+        if cached is not None and update_time is not None and cached[0] == update_time:
+            return cached[1]
+        data = snapshot.to_dict() or {}
+        card = to_card(snapshot.id, {k: v for k, v in data.items() if k in CARD_FIELDS})
+        self._cards[snapshot.id] = (update_time, card)
+        return card
+
+    def _replace(self, snapshots, complete):
+        """保存先から得た新しい順のドキュメントで全体を置き換える"""
+        with self._lock:
+            entries = []
+            for snapshot in snapshots:
+                card = self._card(snapshot)
+                if card.get("timestamp") is None:
+                    continue
+                entries.append((_sort_key(card["timestamp"], snapshot.id), card))
+            keep = {card["id"] for _, card in entries}
+            self._cards = {k: v for k, v in self._cards.items() if k in keep}
+            self._commit(entries, complete)
+
+    def upsert(self, doc_id, post_data):
+        """投稿を1件追加・更新する（作成直後にすぐ見えるようにするため）"""
+        if post_data.get("timestamp") is None:
+            return
+        card = to_card(doc_id, {k: v for k, v in post_data.items() if k in CARD_FIELDS})
+        with self._lock:
+            if not self._ready:
+                return
+            entries = [e for e in self._entries if e[1]["id"] != doc_id]
+            entries.append((_sort_key(card["timestamp"], doc_id), card))
+            entries.sort(key=lambda e: e[0], reverse=True)
+            self._cards[doc_id] = (None, card)
+            self._commit(entries[: self.size], self._complete and len(entries) <= self.size)
+
+    def _commit(self, entries, complete):
+        # 読み出し側はロックの外でリストを使うので、常に新しいリストに差し替える
+        self._entries = entries
+        self._complete = complete
+        self._encoded = {}
+        self._ready = True
+        self.last_update = time.time()
+
+    def _on_snapshot(self, docs, changes, read_time):
+        # docs はクエリ結果の全件（新しい順）。変更のあった投稿だけ変換し直す
+        self._replace(docs, complete=len(docs) < self.size)
+        if changes:
+            print(f"[post_feed] Applied {len(changes)} changes ({len(docs)} posts).")
+
+    # --- 開始 ---
+
+    def start(self, posts):
+        """読み込みと更新の監視を開始する（posts は保存先の投稿。2回目以降の呼び出しは無視）"""
+        if self.mode is not None or posts is None:
+            return
+        if MODE == "listen":
+            try:
+                self._watch = posts.watch_newest(self.size, self._on_snapshot)
+                self.mode = "listen"
+                print(f"[post_feed] Listening for the newest {self.size} posts.")
+                return
+            except Exception as e:
+                print(f"[post_feed] Snapshot listener unavailable, falling back to polling: {e}")
+        self.mode = "poll"
+        self._task = asyncio.run_coroutine_threadsafe(self._poll(posts), get_loop())
+        print(f"[post_feed] Polling for new posts every {POLL_SECONDS}s.")
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch()
+            self._watch = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.mode = None
+
+    def _load_all(self, posts):
+        docs = posts.newest(self.size)
+        self._replace(docs, complete=len(docs) < self.size)
+
+    def _load_new(self, posts):
+        """保持している最新の投稿より新しいものだけを取得して足す"""
+        with self._lock:
+            newest = self._entries[0][1]["timestamp"] if self._entries else None
+        if newest is None:
+            snapshots = posts.newest(self.size)
+        else:
+            snapshots = posts.newer_than(newest, self.size)
+        for snapshot in snapshots:
+            self.upsert(snapshot.id, snapshot.to_dict() or {})
+
+    async def _poll(self, posts):
+        last_full = 0.0
+        while True:
+            try:
+                if time.monotonic() - last_full >= FULL_REFRESH_SECONDS:
+                    await asyncio.to_thread(self._load_all, posts)
+                    last_full = time.monotonic()
+                else:
+                    await asyncio.to_thread(self._load_new, posts)
+            except Exception as e:
+                print(f"[post_feed] Poll failed: {e}")
+            await asyncio.sleep(POLL_SECONDS)
+
+
+post_feed = PostFeed()
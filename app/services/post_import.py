@@ -0,0 +1,324 @@
+"""
+投稿の一括取り込み
+
+NDJSON（1行1投稿）または JSON 配列を先頭から順に読みながら検証し、
+保存先のバッチ書き込み（Firestore なら1回500件まで）で並行して保存する
+途中で止まっても、返した committed 件数を skip に渡せば続きから再開できる
+（id のない投稿は内容から id を決めるので、やり直しても重複しない）
+
+    python -m app.services.post_import data/posts.json --checkpoint instance/import.json
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from app.services.posts import CARD_FIELDS
+from app.services.storage import MAX_BATCH_WRITES
+
+# 1回のバッチ書き込みの件数（Firestore の上限 500 件を超えない）
+BATCH_SIZE = min(int(os.getenv("POST_IMPORT_BATCH_SIZE", str(MAX_BATCH_WRITES))), MAX_BATCH_WRITES)
+# 同時に実行するバッチ書き込みの数
+PARALLEL_COMMITS = int(os.getenv("POST_IMPORT_PARALLEL_COMMITS", "4"))
+# 結果に含める不正な投稿の数（それ以上は件数だけ数える）
+MAX_REPORTED_ERRORS = 100
+
+_READ_CHUNK = 64 * 1024
+_TEXT_FIELDS = [field for field in CARD_FIELDS if field != "timestamp"]
+
+
+# --- 読み込み ---
+
+
+def _iter_json_array(fp, buffer):
+    """JSON 配列の要素を1つずつ返す（全体をメモリに載せない）"""
+    decoder = json.JSONDecoder()
+    pos = buffer.index("[") + 1
+    eof = False
+    expect_value = True
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n":
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("unexpected end of JSON array")
+            chunk = fp.read(_READ_CHUNK)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        if buffer[pos] == "]":
+            return
+        if not expect_value:
+            if buffer[pos] != ",":
+                raise ValueError(f"expected ',' in JSON array, got {buffer[pos]!r}")
+            pos += 1
+            expect_value = True
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            value, end = None, None
+        # 要素がチャンクの境目で切れている（かもしれない）ので続きを読む
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise ValueError("invalid JSON in array")
+            chunk = fp.read(_READ_CHUNK)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield value
+        pos = end
+        expect_value = False
+        # 読み終わった部分は捨てる
+        if pos > _READ_CHUNK:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def iter_records(fp):
+    """
+    テキストのファイルオブジェクトから投稿を1件ずつ返す
+    先頭が '[' なら JSON 配列、それ以外は NDJSON として読む
+    NDJSON の壊れた行は ValueError のインスタンスとして返す（取り込みは続ける）
+    """
+    head = fp.read(_READ_CHUNK)
+    if head.lstrip().startswith("["):
+        yield from _iter_json_array(fp, head)
+        return
+
+    if not head:
+        return
+    # 先頭のチャンクは行の途中で切れているので、その行の残りを足してから分ける
+    for line in io.StringIO(head + fp.readline()):
+        yield from _parse_line(line)
+    for line in fp:
+        yield from _parse_line(line)
+
+
+def _parse_line(line):
+    if not line.strip():
+        return
+    try:
+        yield json.loads(line)
+    except ValueError as e:
+        yield ValueError(f"invalid JSON: {e}")
+
+
+# --- 検証 ---
+
+
+def _doc_id(raw, post):
+    """
+    投稿の id。指定がなければ内容から決める（やり直しても同じ id になる）
+    timestamp がない投稿は取り込んだ時刻が入るので、時刻ではなく元の値 (None) を使う
+    """
+    doc_id = raw.get("id")
+    if doc_id is None:
+        key = json.dumps(
+            [post["title"], post.get("user_id"), post["description"], raw.get("timestamp")], ensure_ascii=False
+        )
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+    if not isinstance(doc_id, (str, int)) or isinstance(doc_id, bool):
+        raise ValueError("id must be a string")
+    doc_id = str(doc_id)
+    # Firestore のドキュメントIDとして使えないもの
+    if not doc_id or "/" in doc_id or doc_id in (".", "..") or doc_id.startswith("__") or len(doc_id) > 1500:
+        raise ValueError(f"invalid id: {doc_id!r}")
+    return doc_id
+
+
+def _timestamp(value):
+    if value is None:
+        return datetime.now(timezone.utc)
+    if not isinstance(value, str):
+        raise ValueError("timestamp must be an ISO 8601 string")
+    try:
+        timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"invalid timestamp: {value!r}") from None
+    # タイムゾーンのない日時は UTC とみなす（旧形式の data/posts.json など）
+    return timestamp.replace(tzinfo=timezone.utc) if timestamp.tzinfo is None else timestamp
+
+
+def validate_post(raw):
+    """取り込む投稿を (id, 保存するデータ) にする。不正なら ValueError"""
+    if not isinstance(raw, dict):
+        raise ValueError("post must be a JSON object")
+    title = raw.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("title is required")
+
+    post = {}
+    for field in _TEXT_FIELDS:
+        value = raw.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f"{field} must be a string")
+        post[field] = value
+    post.setdefault("description", "")
+    post.setdefault("image", "")
+    post["timestamp"] = _timestamp(raw.get("timestamp"))
+    return _doc_id(raw, post), post
+
+
+# --- 取り込み ---
+
+
+def import_posts(posts, fp, skip=0, batch_size=BATCH_SIZE, parallel=PARALLEL_COMMITS, on_progress=None):
+    """
+    fp から読んだ投稿を posts（保存先の投稿）にバッチで書き込み、結果を返す
+    skip: 先頭から読み飛ばす件数（前回の committed）
+    on_progress(committed): 先頭から途切れなく保存し終えた件数が増えるたびに呼ばれる
+    結果の committed は、次に再開するときの skip
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_WRITES))
+    result = {"imported": 0, "invalid": 0, "batches": 0, "committed": skip, "errors": []}
+    # 投入した順の (読み終えた件数, 件数, future)
+    pending = deque()
+    failure = None
+
+    def advance():
+        # 先頭から続けて終わったバッチの分だけ committed を進める
+        nonlocal failure
+        advanced = False
+        while pending and pending[0][2].done():
+            end, count, future = pending.popleft()
+            error = future.exception()
+            if error is not None:
+                failure = failure or error
+                pending.clear()
+                break
+            result["imported"] += count
+            result["batches"] += 1
+            result["committed"] = end
+            advanced = True
+        if advanced and on_progress is not None:
+            on_progress(result["committed"])
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="post-import") as executor:
+        batch = []
+        seen = skip
+        try:
+            for seen, raw in enumerate(_records_after(fp, skip), start=skip + 1):
+                try:
+                    if isinstance(raw, ValueError):
+                        raise raw
+                    batch.append(validate_post(raw))
+                except ValueError as e:
+                    result["invalid"] += 1
+                    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                        result["errors"].append({"record": seen, "error": str(e)})
+
+                if len(batch) >= batch_size:
+                    # 書き込み中のバッチが多すぎれば、一番古いものが終わるまで待つ（読み込みも止まる）
+                    while len(pending) >= parallel and failure is None:
+                        wait([pending[0][2]])
+                        advance()
+                    if failure is not None:
+                        break
+                    pending.append((seen, len(batch), executor.submit(posts.put_many, batch)))
+                    batch = []
+        except ValueError as e:
+            # JSON 配列が壊れていると、その先は読めない
+            failure = e
+
+        if failure is None and batch:
+            pending.append((seen, len(batch), executor.submit(posts.put_many, batch)))
+        wait([p[2] for p in pending])
+        advance()
+        # 最後のバッチの後ろが不正な投稿だけでも、読み終えた所まで進める
+        if failure is None and result["committed"] < seen:
+            result["committed"] = seen
+            if on_progress is not None:
+                on_progress(seen)
+
+    if failure is not None:
+        result["error"] = f"{type(failure).__name__}: {failure}"
+    return result
+
+
+def _records_after(fp, skip):
+    for i, record in enumerate(iter_records(fp)):
+        if i >= skip:
+            yield record
+
+
+# --- コマンドライン ---
+
+
+def _read_checkpoint(path, source):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != source:
+        print(f"[post_import] Ignoring checkpoint for another file: {checkpoint.get('source')}", file=sys.stderr)
+        return 0
+    return int(checkpoint.get("committed", 0))
+
+
+def _write_checkpoint(path, source, committed):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "committed": committed}, f)
+    os.replace(tmp_path, path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import posts from NDJSON or a JSON array")
+    parser.add_argument("source", help="NDJSON or JSON array file ('-' for stdin)")
+    parser.add_argument("--checkpoint", help="record progress here and resume from it")
+    parser.add_argument("--skip", type=int, default=None, help="skip this many records (overrides the checkpoint)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--parallel", type=int, default=PARALLEL_COMMITS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # 取り込みだけなので、記事の先読みや投稿のビューは動かさない
+    os.environ.setdefault("PREFETCH_ENABLED", "0")
+    os.environ.setdefault("POST_FEED_ENABLED", "0")
+    from app import create_app
+
+    app = create_app()
+    if app.storage is None:
+        print("[post_import] No storage backend is available.", file=sys.stderr)
+        return 1
+
+    source = os.path.abspath(args.source) if args.source != "-" else "-"
+    skip = args.skip if args.skip is not None else _read_checkpoint(args.checkpoint, source)
+    on_progress = None
+    if args.checkpoint:
+        def on_progress(committed):
+            _write_checkpoint(args.checkpoint, source, committed)
+
+    fp = sys.stdin if args.source == "-" else open(args.source, encoding="utf-8")
+    try:
+        result = import_posts(
+            app.storage.posts, fp, skip=skip, batch_size=args.batch_size,
+            parallel=args.parallel, on_progress=on_progress,
+        )
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(
+        f"[post_import] Imported {result['imported']} posts into {app.storage.backend} "
+        f"({result['invalid']} invalid, resume with --skip {result['committed']}).",
+        file=sys.stderr,
+    )
+    return 1 if "error" in result else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import base64
+import json
+import os
+from datetime import datetime
+
+# 1ページあたりの投稿数（limit を省略した場合と、指定できる上限）
+PAGE_SIZE = int(os.getenv("POSTS_PAGE_SIZE", "20"))
+MAX_PAGE_SIZE = int(os.getenv("POSTS_MAX_PAGE_SIZE", "100"))
+
+# カードの表示に使うフィールドだけを取得する
+CARD_FIELDS = [
+    "title",
+    "description",
+    "image",
+    "image_base64",
+    "user_id",
+    "user_email",
+    "author_email",
+    "timestamp",
+]
+
+
+def encode_cursor(timestamp, doc_id):
+    """最後に返した投稿のタイムスタンプとIDから、次のページ用のカーソル文字列を作る"""
+    raw = json.dumps({"t": timestamp.isoformat(), "id": doc_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """カーソル文字列を (タイムスタンプ, ID) に戻す。不正な値なら ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), str(data["id"])
+    except (ValueError, TypeError, KeyError, UnicodeEncodeError) as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+def parse_limit(value):
+    """limit パラメータを 1〜MAX_PAGE_SIZE の整数にする。不正な値なら ValueError"""
+    if value in (None, ""):
+        return PAGE_SIZE
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def to_card(doc_id, post_data):
+    """
+    Firestore の投稿データにクライアント互換用のフィールドを足す
+    （タイムスタンプはレスポンスのエンコード時に ISO 8601 の文字列になる）
+    """
+    post_data["id"] = doc_id
+    post_data["type"] = "user_post"
+    # author情報を取得 (本来はjoinするか、投稿時に非正規化して埋め込むべき)
+    # ここでは簡易的に post_data に含まれていると仮定するか、
+    # user_email から引く実装にするが、パフォーマンスのため一旦埋め込み期待
+    if "user_email" in post_data and "author_email" not in post_data:
+        post_data["author_email"] = post_data["user_email"]
+    return post_data
+
+
+def list_posts(posts, limit=PAGE_SIZE, cursor=None):
+    """
+    新しい順に投稿を1ページ分取得し、(投稿のリスト, 次のページのカーソル) を返す
+    最後のページなら次のカーソルは None
+    タイムスタンプが同じ投稿があっても抜けや重複が出ないよう、IDでも並べる
+    """
+    after = decode_cursor(cursor) if cursor else None
+    # 1件多く取って、次のページがあるかを判定する
+    docs = posts.newest(limit + 1, after=after, fields=CARD_FIELDS)
+    page = docs[:limit]
+    cards = [to_card(doc.id, doc.to_dict()) for doc in page]
+
+    next_cursor = None
+    if len(docs) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last.get("timestamp"), last.id)
+    return cards, next_cursor
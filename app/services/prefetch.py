@@ -0,0 +1,153 @@
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from app.services.aggregator import PROVIDER_API_KEYS, PROVIDER_CALLS_PER_SEARCH
+from app.services.result_cache import make_key, refresh_async, set_fresh_seconds
+from app.services.runtime import get_loop
+from app.utils.rate_limit import get_limiter
+
+# 環境変数の読み込み
+load_dotenv()
+
+# 定期的に取得しておくフィード ("クエリ:言語" をカンマ区切りで指定)
+FEEDS_SPEC = os.getenv("PREFETCH_FEEDS", "Apple:ja,Apple:en")
+PAGE_SIZE = int(os.getenv("PREFETCH_PAGE_SIZE", "10"))
+# Web画面は lazy=1（翻訳を後回し）で取得するので、既定ではそのキャッシュを温めておく
+LAZY = os.getenv("PREFETCH_LAZY", "1") == "1"
+# 取得間隔。未設定なら各プロバイダの1日の上限から決める (interval_seconds を参照)
+INTERVAL_SECONDS = float(os.getenv("PREFETCH_INTERVAL_SECONDS", "0"))
+MIN_INTERVAL_SECONDS = 300
+JITTER_SECONDS = float(os.getenv("PREFETCH_JITTER_SECONDS", "30"))
+# 1日の上限のうちユーザーの検索のために残しておく割合。残りがこれを下回ったら先読みしない
+RESERVE_FRACTION = float(os.getenv("PREFETCH_RESERVE_FRACTION", "0.5"))
+
+# (query, lang) -> 最終更新の状態
+feed_status = {}
+
+_tasks = []
+
+
+def parse_feeds(spec):
+    """"Apple:ja,Apple:en" 形式の文字列を [(query, lang), ...] に変換する"""
+    feeds = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        query, _, lang = item.rpartition(":")
+        if not query:
+            query, lang = lang, "ja"
+        feeds.append((query.strip(), lang.strip() or "ja"))
+    return feeds
+
+
+def interval_seconds(queries):
+    """
+    取得間隔を返す。PREFETCH_INTERVAL_SECONDS が未設定なら、先読みが1日の上限のうち
+    ユーザー用に残す分 (RESERVE_FRACTION) を超えて使わない間隔にする
+    """
+    if INTERVAL_SECONDS > 0:
+        return INTERVAL_SECONDS
+    interval = MIN_INTERVAL_SECONDS
+    for name, calls in PROVIDER_CALLS_PER_SEARCH.items():
+        daily = get_limiter(name, PROVIDER_API_KEYS[name]).daily_requests
+        budget = daily * (1 - RESERVE_FRACTION)
+        if daily and budget > 0:
+            interval = max(interval, 24 * 60 * 60 * calls * queries / budget)
+    return interval
+
+
+def _budget_reserved():
+    """どれかのプロバイダの残りがユーザー用に残す分を下回っていれば、そのプロバイダ名を返す"""
+    for name, calls in PROVIDER_CALLS_PER_SEARCH.items():
+        status = get_limiter(name, PROVIDER_API_KEYS[name]).status()
+        remaining = status["requests_remaining"]
+        if remaining is None:
+            continue
+        daily = status["requests_today"] + remaining
+        if remaining - calls < daily * RESERVE_FRACTION:
+            return name
+    return None
+
+
+def _new_status(query, lang):
+    return {
+        "query": query,
+        "lang": lang,
+        "last_refresh": None,
+        "duration": None,
+        "articles": 0,
+        "error": None,
+    }
+
+
+async def refresh_feed(query, lang):
+    """フィードを取得し直して検索結果キャッシュに入れ、状態を記録する"""
+    status = feed_status.get((query, lang))
+    if status is None:
+        status = feed_status[(query, lang)] = _new_status(query, lang)
+    started = time.perf_counter()
+    try:
+        articles = await refresh_async(query=query, page_size=PAGE_SIZE, lang=lang, lazy=LAZY)
+        status["articles"] = len(articles)
+        status["error"] = None
+    except Exception as e:
+        print(f"[prefetch] Refresh failed for {query} ({lang}): {e}")
+        status["error"] = str(e)
+    status["duration"] = time.perf_counter() - started
+    status["last_refresh"] = datetime.now()
+
+
+async def refresh_query(query, langs):
+    """
+    1つのクエリを各言語で取り直す
+    同時に実行するので、プロバイダ呼び出しは言語間で共有され1回で済む（lazy=0 のときは翻訳だけが言語ごと）
+    """
+    reserved = _budget_reserved()
+    if reserved is not None:
+        print(f"[prefetch] Skipping {query}: {reserved} budget is reserved for user searches.")
+        for lang in langs:
+            feed_status[(query, lang)]["error"] = f"skipped ({reserved} budget reserved)"
+        return
+    await asyncio.gather(*(refresh_feed(query, lang) for lang in langs))
+
+
+async def _run_query(query, langs, interval):
+    """起動直後に1回取得し、その後は間隔にゆらぎを足しながら繰り返す"""
+    while True:
+        await refresh_query(query, langs)
+        await asyncio.sleep(interval + random.uniform(0, JITTER_SECONDS))
+
+
+async def _start(feeds):
+    queries = {}
+    for query, lang in feeds:
+        feed_status.setdefault((query, lang), _new_status(query, lang))
+        queries.setdefault(query, []).append(lang)
+    interval = interval_seconds(len(queries))
+    for query, lang in feeds:
+        # 先読みする検索は次の取得まで新しいとみなし、利用者の読み込みで上流を呼ばない
+        # （先読みが止まったり予算のために飛ばしたりしたら、それ以降は通常どおり裏で更新する）
+        set_fresh_seconds(make_key(query, PAGE_SIZE, lang, LAZY), interval + JITTER_SECONDS)
+    for query, langs in queries.items():
+        _tasks.append(asyncio.get_running_loop().create_task(_run_query(query, langs, interval)))
+    return interval
+
+
+def start_scheduler(feeds=None):
+    """常駐イベントループ上でフィードの定期取得を開始する（2回目以降の呼び出しは無視）"""
+    if _tasks:
+        return
+    feeds = parse_feeds(FEEDS_SPEC) if feeds is None else feeds
+    interval = asyncio.run_coroutine_threadsafe(_start(feeds), get_loop()).result()
+    print(f"[prefetch] Scheduler started for {len(feeds)} feeds (every {interval:.0f}s).")
+
+
+def get_status():
+    """管理画面用に、各フィードの最終更新状態を返す"""
+    return [dict(status) for status in feed_status.values()]
@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+
+from app.services.aggregator import (
+    apply_cached_translations,
+    get_translated_articles_async,
+    iter_translated_articles_async,
+)
+from app.models import serialize_articles
+from app.services.runtime import iter_sync, run_sync
+from app.utils.cache import LRUCache
+from app.utils.json_codec import encode
+from app.utils.metrics import register_cache
+from app.utils.singleflight import SingleFlight
+
+# この秒数以内の結果はそのまま返す
+FRESH_SECONDS = float(os.getenv("RESULT_CACHE_FRESH_SECONDS", "60"))
+# この秒数を過ぎた結果は破棄する（それまでは古くても返しつつ裏で更新する）
+MAX_AGE_SECONDS = float(os.getenv("RESULT_CACHE_MAX_AGE_SECONDS", str(24 * 60 * 60)))
+
+# 検索結果キャッシュ (正規化クエリ, page_size, lang, lazy) -> {"articles", "fetched_at", "encoded"}
+result_cache = LRUCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "500")),
+    ttl=MAX_AGE_SECONDS,
+)
+
+register_cache("result", result_cache)
+
+# 先読みが定期的に取り直す検索の新しさの上限（キー -> 秒）。利用者の読み込みで上流を呼ばないように
+# FRESH_SECONDS の代わりに先読みの間隔を使う
+_owned_fresh_seconds = {}
+
+# 同じ検索の取得処理が実行中なら、それを共有する
+_search_flight = SingleFlight()
+
+# 裏で実行中の更新タスク（GCで消されないよう保持する）
+_background_tasks = set()
+
+
+def normalize_query(query):
+    """大文字小文字と空白の違いを吸収したクエリを返す"""
+    return " ".join(query.lower().split())
+
+
+def make_key(query, page_size, lang, lazy=False):
+    return (normalize_query(query), page_size, lang, lazy)
+
+
+def set_fresh_seconds(key, seconds):
+    """key の結果を seconds のあいだ新しいとみなす（先読みが持つフィード用）"""
+    _owned_fresh_seconds[key] = seconds
+
+
+def _store(key, articles):
+    """
+    結果をキャッシュに保存し、そのエントリを返す
+    全プロバイダから1件も返らなかった場合は、直前の正常な結果を残してそれを返す
+    """
+    previous = result_cache.get(key)
+    if not articles and previous and previous["articles"]:
+        print(f"[result_cache] No articles for {key}; keeping last good result.")
+        return previous
+
+    # encoded: エンコード済みのJSON（返すときに一度だけ作る）
+    entry = {"articles": articles, "fetched_at": time.time(), "encoded": {}}
+    result_cache.set(key, entry)
+    return entry
+
+
+async def _refresh(key, query, page_size, lang, lazy=False):
+    """記事を取得し直してキャッシュを更新する"""
+    articles = await get_translated_articles_async(
+        query=query, page_size=page_size, lang=lang, lazy=lazy
+    )
+    return _store(key, articles)
+
+
+def _fetch(key, query, page_size, lang, lazy=False):
+    """同時に来た同じ検索は1回の取得結果を共有する"""
+    return _search_flight.do(key, lambda: _refresh(key, query, page_size, lang, lazy))
+
+
+def _cached_articles(entry, lang, lazy):
+    """キャッシュ済みの結果を返す（遅延翻訳モードでは、その後に翻訳された記事を反映する）"""
+    if lazy:
+        return apply_cached_translations(entry["articles"], lang)
+    return entry["articles"]
+
+
+def _encoded_articles(entry, lang, lazy):
+    """キャッシュ済みの結果を表示言語用のJSONにエンコードして返す（同じ内容なら前回のバイト列を使う）"""
+    articles = _cached_articles(entry, lang, lazy)
+    # 遅延翻訳モードでは翻訳が進むと内容が変わるので、翻訳済みの記事の組み合わせを目印にする
+    version = tuple(article.is_translated(lang) for article in articles) if lazy else None
+    encoded = entry["encoded"].get(version)
+    if encoded is None:
+        encoded = encode(serialize_articles(articles, lang))
+        entry["encoded"] = {version: encoded}
+    return encoded
+
+
+def _cached_entry(key, query, page_size, lang, lazy=False):
+    """キャッシュのエントリを返す。古ければ返しつつ裏で更新する (stale-while-revalidate)"""
+    entry = result_cache.get(key)
+    fresh_seconds = _owned_fresh_seconds.get(key, FRESH_SECONDS)
+    if entry is not None and time.time() - entry["fetched_at"] >= fresh_seconds:
+        _refresh_in_background(key, query, page_size, lang, lazy)
+    return entry
+
+
+def _refresh_in_background(key, query, page_size, lang, lazy=False):
+    """古い結果を返したあとに、裏でキャッシュを更新する（同じキーの更新は1本だけ）"""
+    if key in _search_flight:
+        return
+
+    async def run():
+        try:
+            await _fetch(key, query, page_size, lang, lazy)
+        except Exception as e:
+            print(f"[result_cache] Background refresh failed for {key}: {e}")
+
+    task = asyncio.get_running_loop().create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def get_articles_async(query="Apple", page_size=10, lang="ja", lazy=False):
+    """
+    検索結果キャッシュを通して翻訳済み記事を返す (Async)
+    - 新しい結果: そのまま返す
+    - 古い結果: そのまま返しつつ裏で更新する (stale-while-revalidate)
+    - 結果なし: その場で取得する（同じ検索が実行中ならその結果を待つ）
+    """
+    key = make_key(query, page_size, lang, lazy)
+    entry = _cached_entry(key, query, page_size, lang, lazy)
+    if entry is None:
+        entry = await _fetch(key, query, page_size, lang, lazy)
+    return _cached_articles(entry, lang, lazy)
+
+
+async def get_articles_json_async(query="Apple", page_size=10, lang="ja", lazy=False):
+    """
+    get_articles_async と同じ結果を、表示言語用にエンコード済みのJSON (EncodedJSON) で返す (Async)
+    キャッシュ済みの結果は一度だけエンコードし、以降はそのバイト列を返す
+    """
+    key = make_key(query, page_size, lang, lazy)
+    entry = _cached_entry(key, query, page_size, lang, lazy)
+    if entry is None:
+        entry = await _fetch(key, query, page_size, lang, lazy)
+    return _encoded_articles(entry, lang, lazy)
+
+
+async def refresh_async(query="Apple", page_size=10, lang="ja", lazy=False):
+    """
+    キャッシュの有無にかかわらず取得し直して、キャッシュを更新する (Async)
+    次のリクエストですぐ返せるよう、エンコードも済ませておく
+    """
+    key = make_key(query, page_size, lang, lazy)
+    entry = await _fetch(key, query, page_size, lang, lazy)
+    _encoded_articles(entry, lang, lazy)
+    return entry["articles"]
+
+
+async def stream_articles_async(query="Apple", page_size=10, lang="ja", lazy=False):
+    """
+    翻訳済み記事を、準備できた分から少しずつ返す (Async generator)
+    キャッシュがあればそれを一度に返し、なければプロバイダごとに返しながら最後にキャッシュする
+    """
+    key = make_key(query, page_size, lang, lazy)
+    entry = _cached_entry(key, query, page_size, lang, lazy)
+    if entry is not None:
+        yield _cached_articles(entry, lang, lazy)
+        return
+
+    articles = []
+    async for batch in iter_translated_articles_async(
+        query=query, page_size=page_size, lang=lang, lazy=lazy
+    ):
+        articles.extend(batch)
+        yield batch
+    _store(key, articles)
+
+
+def stream_articles(query="Apple", page_size=10, lang="ja", lazy=False):
+    """翻訳済み記事を準備できた分から返す同期ジェネレータ（Flaskのストリーミング用）"""
+    return iter_sync(
+        stream_articles_async(query=query, page_size=page_size, lang=lang, lazy=lazy)
+    )
+
+
+def get_articles(query="Apple", page_size=10, lang="ja", lazy=False):
+    """検索結果キャッシュを通して翻訳済み記事を返す（Flaskの同期ルート用）"""
+    return run_sync(get_articles_async(query=query, page_size=page_size, lang=lang, lazy=lazy))
+
+
+def get_articles_json(query="Apple", page_size=10, lang="ja", lazy=False):
+    """検索結果キャッシュを通してエンコード済みのJSONを返す（Flaskの同期ルート用）"""
+    return run_sync(
+        get_articles_json_async(query=query, page_size=page_size, lang=lang, lazy=lazy)
+    )
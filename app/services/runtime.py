@@ -0,0 +1,86 @@
+import asyncio
+import os
+import threading
+
+from app.utils.metrics import inflight
+from app.utils.pool import create_pool
+
+# 非同期処理用の常駐イベントループ
+# Flaskのルートは同期関数なので、専用スレッドで動くループにコルーチンを投げて結果を待つ
+_loop = None
+_loop_lock = threading.Lock()
+
+# 同期コードから投げられて、まだ終わっていない処理の数（監視用）
+_inflight = 0
+_inflight_lock = threading.Lock()
+
+# 負荷が高いときに処理を溜め込まず断るためのプール
+# 上限を超えた分は待ち行列に並び、待ち行列も一杯なら 503 (Retry-After) で返す
+RETRY_AFTER_SECONDS = int(os.getenv("OVERLOAD_RETRY_AFTER", "5"))
+
+# 検索1回（プロバイダ呼び出し〜翻訳）をまとめて数える。キャッシュから返せる分は数えない
+search_pool = create_pool(
+    "search",
+    concurrency=int(os.getenv("SEARCH_CONCURRENCY", "16")),
+    max_queue=int(os.getenv("SEARCH_QUEUE_LIMIT", "32")),
+    retry_after=RETRY_AFTER_SECONDS,
+)
+# ニュースAPIへのHTTP呼び出し
+provider_pool = create_pool(
+    "provider",
+    concurrency=int(os.getenv("PROVIDER_CONCURRENCY", "32")),
+    max_queue=int(os.getenv("PROVIDER_QUEUE_LIMIT", "128")),
+    retry_after=RETRY_AFTER_SECONDS,
+)
+# DeepLへのHTTP呼び出し（遅い翻訳がプロバイダ呼び出しの枠を食わないよう分けておく）
+translation_pool = create_pool(
+    "translation",
+    concurrency=int(os.getenv("TRANSLATION_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("TRANSLATION_QUEUE_LIMIT", "64")),
+    retry_after=RETRY_AFTER_SECONDS,
+)
+
+
+def get_loop():
+    """バックグラウンドで常駐するイベントループを返す（未起動なら起動する）"""
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="aggregator-loop", daemon=True
+            )
+            thread.start()
+            _loop = loop
+    return _loop
+
+
+def _track_inflight(delta):
+    global _inflight
+    with _inflight_lock:
+        _inflight += delta
+        inflight.set(_inflight)
+
+
+def run_sync(coro, timeout=None):
+    """同期コードからコルーチンを常駐ループ上で実行し、結果を返す"""
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    _track_inflight(1)
+    future.add_done_callback(lambda _: _track_inflight(-1))
+    return future.result(timeout)
+
+
+def iter_sync(agen, timeout=None):
+    """
+    非同期ジェネレータを同期ジェネレータとして回す（Flaskのストリーミングレスポンス用）
+    要素ごとに常駐ループ上で __anext__ を実行する
+    """
+    try:
+        while True:
+            try:
+                yield run_sync(agen.__anext__(), timeout)
+            except StopAsyncIteration:
+                return
+    finally:
+        # クライアントが途中で切断した場合もジェネレータを閉じる
+        run_sync(agen.aclose(), timeout)
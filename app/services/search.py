@@ -0,0 +1,65 @@
+from app.services.article_index import FRESH_HOURS, article_index
+from app.services.dedup import canonicalize_url
+from app.services.result_cache import get_articles, stream_articles
+from app.utils.pool import Overloaded
+
+
+def _local_results(query, page_size, lang):
+    """ローカルのインデックスから最近取得した記事を検索する"""
+    return article_index.search(query, lang=lang, limit=page_size, max_age_hours=FRESH_HOURS)
+
+
+def _new_articles(articles, seen):
+    """まだ返していない記事だけを返し、seen を更新する"""
+    result = []
+    for article in articles:
+        canonical = canonicalize_url(article.url)
+        if canonical not in seen:
+            seen.add(canonical)
+            result.append(article)
+    return result
+
+
+def search_articles(query, page_size=10, lang="ja", lazy=False):
+    """
+    記事を検索する
+    まずローカルのインデックスを引き、件数が足りない場合だけ外部APIで補う
+    混雑していて外部APIを呼べないときは、ローカルの結果があればそれだけを返す
+    """
+    local = _local_results(query, page_size, lang)
+    if len(local) >= page_size:
+        print(f"[search] Served {len(local)} articles from local index for: {query}")
+        return local
+
+    seen = {canonicalize_url(a.url) for a in local}
+    try:
+        remote = get_articles(query=query, page_size=page_size, lang=lang, lazy=lazy)
+    except Overloaded:
+        if not local:
+            raise
+        print(f"[search] Overloaded. Served {len(local)} articles from local index for: {query}")
+        return local
+    # ローカルと外部APIの結果を合わせても1ページ分まで
+    return (local + _new_articles(remote, seen))[:page_size]
+
+
+def stream_search_articles(query, page_size=10, lang="ja", lazy=False):
+    """
+    記事検索のストリーミング版
+    ローカルのインデックスの結果を最初に返し、足りない分を外部APIから届いた順に返す
+    """
+    local = _local_results(query, page_size, lang)
+    if local:
+        yield local
+    if len(local) >= page_size:
+        return
+
+    seen = {canonicalize_url(a.url) for a in local}
+    remaining = page_size - len(local)
+    for batch in stream_articles(query=query, page_size=page_size, lang=lang, lazy=lazy):
+        batch = _new_articles(batch, seen)[:remaining]
+        if batch:
+            yield batch
+            remaining -= len(batch)
+        if remaining <= 0:
+            return
@@ -0,0 +1,166 @@
+import atexit
+import os
+import uuid
+from datetime import datetime, timezone
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.services.local_store import LocalStore
+
+# "auto": Firestore が使えればそれを、使えなければローカルのストアを使う
+# "firestore" / "local": どちらかに固定する
+BACKEND = os.getenv("STORAGE_BACKEND", "auto")
+
+# Firestore のバッチ書き込み1回あたりの上限
+MAX_BATCH_WRITES = 500
+
+
+# --- Firestore ---
+
+
+class FirestorePosts:
+    """posts コレクション (Firestore)"""
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db.collection("posts")
+
+    def _newest_query(self, fields=None):
+        query = self.collection.select(fields) if fields else self.collection
+        return (
+            query.order_by("timestamp", direction=firestore.Query.DESCENDING)
+            .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING)
+        )
+
+    def newest(self, limit, after=None, fields=None):
+        """新しい順に最大 limit 件。after=(タイムスタンプ, id) ならそれより古いものだけ"""
+        query = self._newest_query(fields)
+        if after is not None:
+            timestamp, doc_id = after
+            query = query.start_after({"timestamp": timestamp, "__name__": self.collection.document(doc_id)})
+        return list(query.limit(limit).stream())
+
+    def newer_than(self, timestamp, limit):
+        """timestamp より新しい投稿を新しい順に最大 limit 件"""
+        query = self._newest_query().where(filter=firestore.FieldFilter("timestamp", ">", timestamp))
+        return list(query.limit(limit).stream())
+
+    def watch_newest(self, limit, callback):
+        """
+        新しい投稿 limit 件が変わるたびに callback(docs, changes, read_time) を呼ぶ
+        監視をやめる関数を返す
+        """
+        watch = self._newest_query().limit(limit).on_snapshot(callback)
+        return watch.unsubscribe
+
+    def add(self, data):
+        """投稿を追加して (id, タイムスタンプ) を返す。タイムスタンプはサーバーの書き込み時刻"""
+        data["timestamp"] = firestore.SERVER_TIMESTAMP
+        update_time, ref = self.collection.add(data)
+        return ref.id, update_time
+
+    def put_many(self, items):
+        """
+        (id, データ) のリストを1回のバッチ書き込みで保存する（同じ id は上書き）
+        Firestore のバッチは1回 MAX_BATCH_WRITES 件まで
+        """
+        batch = self.db.batch()
+        for doc_id, data in items:
+            batch.set(self.collection.document(doc_id), data)
+        batch.commit()
+
+
+class FirestoreUsers:
+    """users コレクション (Firestore)"""
+
+    def __init__(self, db):
+        self.collection = db.collection("users")
+
+    def get(self, uid):
+        """ユーザー情報を返す（存在しなければ None）"""
+        doc = self.collection.document(uid).get()
+        return doc.to_dict() if doc.exists else None
+
+    def create(self, uid, data):
+        data["created_at"] = firestore.SERVER_TIMESTAMP
+        self.collection.document(uid).set(data)
+
+    def update(self, uid, updates):
+        self.collection.document(uid).set(updates, merge=True)
+
+
+# --- ローカル ---
+
+
+class LocalPosts:
+    """posts コレクション (ローカルのストア)"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def newest(self, limit, after=None, fields=None):
+        # メモリ上にあるので、フィールドの絞り込みはしない
+        return self.store.newest_posts(limit, after=after)
+
+    def newer_than(self, timestamp, limit):
+        return self.store.newest_posts(limit, before=timestamp)
+
+    def watch_newest(self, limit, callback):
+        # Firestore のリスナーと同じく、登録した時点の内容でも1回呼ぶ
+        def notify():
+            callback(self.store.newest_posts(limit), [], None)
+
+        remove = self.store.add_listener(notify)
+        notify()
+        return remove
+
+    def add(self, data):
+        doc_id = uuid.uuid4().hex[:20]
+        data["timestamp"] = datetime.now(timezone.utc)
+        self.store.put("posts", doc_id, data)
+        return doc_id, data["timestamp"]
+
+    def put_many(self, items):
+        self.store.put_many("posts", items)
+
+
+class LocalUsers:
+    """users コレクション (ローカルのストア)"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, uid):
+        return self.store.get("users", uid).to_dict()
+
+    def create(self, uid, data):
+        data["created_at"] = datetime.now(timezone.utc)
+        self.store.put("users", uid, data)
+
+    def update(self, uid, updates):
+        self.store.merge("users", uid, updates)
+
+
+class Storage:
+    """投稿とユーザーの保存先。ルートは backend を気にせず posts / users を使う"""
+
+    def __init__(self, backend, posts, users, store=None):
+        self.backend = backend
+        self.posts = posts
+        self.users = users
+        self.store = store
+
+
+def create_storage(db, backend=BACKEND):
+    """設定に合わせて保存先を作る（使えるものがなければ None）"""
+    if backend == "firestore" or (backend == "auto" and db is not None):
+        if db is None:
+            print("[storage] STORAGE_BACKEND=firestore but the Firestore client is unavailable.")
+            return None
+        return Storage("firestore", FirestorePosts(db), FirestoreUsers(db))
+
+    store = LocalStore().open()
+    # 終了時にスナップショットを書いておき、次の起動でログを再生しなくて済むようにする
+    atexit.register(store.close)
+    return Storage("local", LocalPosts(store), LocalUsers(store), store=store)
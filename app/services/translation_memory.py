@@ -0,0 +1,249 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from app.utils.cache import LRUCache
+
+# 環境変数の読み込み
+load_dotenv()
+
+DB_PATH = os.getenv(
+    "TRANSLATION_DB_PATH", os.path.join("instance", "translation_memory.sqlite3")
+)
+WARM_START_ENTRIES = int(os.getenv("TRANSLATION_DB_WARM_ENTRIES", "2000"))
+# 読み込み時の使用記録 (last_used, hits) はメモリにためて、この間隔でまとめて書き込む
+# （検索のたびに書き込みトランザクションを開いて、他のワーカーを待たせないように）
+USAGE_FLUSH_SECONDS = float(os.getenv("TRANSLATION_DB_USAGE_FLUSH_SECONDS", "60"))
+
+# SQLiteの1文あたりのプレースホルダ数の上限に余裕をもたせた値
+_SQL_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    target_lang TEXT NOT NULL,
+    translated TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used);
+"""
+
+
+def normalize_text(text):
+    """キー計算用に空白を正規化する"""
+    return " ".join(text.split())
+
+
+def make_key(text, target_lang):
+    """正規化した原文とターゲット言語からキー（SHA-256）を作る"""
+    raw = f"{target_lang.lower()}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _batches(items, size=_SQL_BATCH):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class TranslationMemory:
+    """
+    再起動後も残る翻訳メモリ（SQLite）
+    WALモードで開くため、同じホスト上の複数ワーカープロセスから安全に共有できる。
+    よく使う訳文はプロセス内のLRUCacheにも載せておく
+    """
+
+    def __init__(self, path=DB_PATH, memory_entries=WARM_START_ENTRIES):
+        self.path = path
+        self.memory = LRUCache(max_entries=memory_entries)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        # key -> (最後に使った時刻, まだ書き込んでいない使用回数)
+        self._usage = {}
+        self._usage_lock = threading.Lock()
+        self._usage_flushed_at = time.monotonic()
+
+    def _connect(self):
+        """スレッドごとのコネクションを返す（初回はスキーマを作成）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript(_SCHEMA)
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    def get_many(self, texts, target_lang):
+        """
+        複数テキストの訳文をまとめて引く
+        見つかったものだけを {原文: 訳文} の辞書で返す
+        """
+        found = {}
+        missing = {}
+        for text in texts:
+            key = make_key(text, target_lang)
+            translated = self.memory.get(key)
+            if translated is not None:
+                found[text] = translated
+            else:
+                missing.setdefault(key, []).append(text)
+
+        if not missing:
+            return found
+
+        try:
+            conn = self._connect()
+            hit_keys = []
+            for batch in _batches(list(missing)):
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, translated FROM translations WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, translated in rows:
+                    self.memory.set(key, translated)
+                    for text in missing[key]:
+                        found[text] = translated
+                    hit_keys.append(key)
+        except sqlite3.Error as e:
+            print(f"[TranslationMemory] Read failed: {e}")
+            return found
+
+        if hit_keys:
+            self._record_usage(hit_keys)
+        return found
+
+    def _record_usage(self, keys):
+        """使用記録をメモリにためる（USAGE_FLUSH_SECONDS ごとにまとめて書き込む）"""
+        now = time.time()
+        with self._usage_lock:
+            for key in keys:
+                _, hits = self._usage.get(key, (now, 0))
+                self._usage[key] = (now, hits + 1)
+            due = time.monotonic() - self._usage_flushed_at >= USAGE_FLUSH_SECONDS
+        if due:
+            self.flush_usage()
+
+    def flush_usage(self):
+        """ためておいた使用記録 (last_used, hits) をDBに書き込む"""
+        with self._usage_lock:
+            usage, self._usage = self._usage, {}
+            self._usage_flushed_at = time.monotonic()
+        if not usage:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "UPDATE translations SET last_used = MAX(last_used, ?), hits = hits + ? WHERE key = ?",
+                    [(last_used, hits, key) for key, (last_used, hits) in usage.items()],
+                )
+        except sqlite3.Error as e:
+            print(f"[TranslationMemory] Usage flush failed: {e}")
+
+    def put_many(self, translations, target_lang):
+        """{原文: 訳文} の辞書をまとめて保存する（空の訳文は保存しない）"""
+        now = time.time()
+        rows = []
+        for text, translated in translations.items():
+            if not translated:
+                continue
+            key = make_key(text, target_lang)
+            self.memory.set(key, translated)
+            rows.append((key, target_lang.lower(), translated, now, now))
+
+        if not rows:
+            return
+
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO translations (key, target_lang, translated, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET translated = excluded.translated, "
+                    "last_used = excluded.last_used",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            print(f"[TranslationMemory] Write failed: {e}")
+
+    def warm_start(self, limit=None):
+        """起動時に、よく使われる訳文をメモリに読み込んでおく"""
+        limit = limit or self.memory.max_entries
+        try:
+            rows = self._connect().execute(
+                "SELECT key, translated FROM translations "
+                "ORDER BY hits DESC, last_used DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"[TranslationMemory] Warm start failed: {e}")
+            return 0
+
+        # 最もよく使われるものが LRU の末尾（最新）に来るように逆順で入れる
+        for key, translated in reversed(rows):
+            self.memory.set(key, translated)
+        print(f"[TranslationMemory] Warm start loaded {len(rows)} entries.")
+        return len(rows)
+
+    def compact(self, max_age_days=90, max_entries=None):
+        """
+        長く使われていない訳文を削除し、DBファイルを詰め直す
+        max_entries を指定した場合は、使用頻度の低いものから上限まで削る
+        """
+        # 最近使った訳文を消さないよう、ためておいた使用記録を先に書き込む
+        self.flush_usage()
+        conn = self._connect()
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM translations WHERE last_used < ?", (cutoff,)
+            ).rowcount
+            if max_entries is not None:
+                removed += conn.execute(
+                    "DELETE FROM translations WHERE key NOT IN ("
+                    "SELECT key FROM translations ORDER BY hits DESC, last_used DESC LIMIT ?)",
+                    (max_entries,),
+                ).rowcount
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        self.memory.clear()
+        print(f"[TranslationMemory] Compacted: removed {removed} entries.")
+        return removed
+
+    def count(self):
+        """保存されている訳文の件数を返す"""
+        return self._connect().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+
+translation_memory = TranslationMemory()
+# 終了時にまだ書き込んでいない使用記録を残す
+atexit.register(translation_memory.flush_usage)
+
+
+if __name__ == "__main__":
+    # 使い方: python -m app.services.translation_memory [compact [max_age_days]]
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "compact":
+        days = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+        translation_memory.compact(max_age_days=days)
+    print(f"Entries: {translation_memory.count()} ({translation_memory.path})")
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from app.utils.metrics import observe_upstream, outcome_for_status, upstream_latency, upstream_requests
+
+# 環境変数の読み込み
+load_dotenv()
+
+# 上流ホストごとのコネクションプール設定
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1"
+
+# プロバイダごとのタイムアウト（秒）。環境変数 <PROVIDER>_TIMEOUT で上書き可能
+DEFAULT_TIMEOUTS = {
+    "newsapi": 10,
+    "gnews": 15,
+    "newsdata": 15,
+    "deepl": 10,
+}
+
+try:
+    import h2  # noqa: F401  httpx の HTTP/2 対応には h2 パッケージが必要
+
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# ホストごとの requests.Session（同期呼び出し用）
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# (イベントループ, ホスト) ごとの httpx.AsyncClient（非同期呼び出し用）
+_async_clients = {}
+
+
+def _host_key(url):
+    """URLからプールのキー (scheme://host[:port]) を取り出す"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """リクエストごとのレイテンシと結果を /admin/metrics 用に記録するトランスポート"""
+
+    def __init__(self, transport, provider):
+        self._transport = transport
+        self._provider = provider
+
+    async def handle_async_request(self, request):
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            observe_upstream(self._provider, "timeout", started)
+            raise
+        except Exception:
+            observe_upstream(self._provider, "error", started)
+            raise
+        observe_upstream(self._provider, outcome_for_status(response.status_code), started)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _session_hook(provider):
+    """requests.Session のレスポンスをメトリクスに記録するフック"""
+    def hook(response, *args, **kwargs):
+        upstream_latency.observe(response.elapsed.total_seconds(), provider=provider)
+        upstream_requests.inc(provider=provider, outcome=outcome_for_status(response.status_code))
+    return hook
+
+
+def get_timeout(provider):
+    """プロバイダ名に対応するタイムアウト秒数を返す"""
+    env_value = os.getenv(f"{provider.upper()}_TIMEOUT")
+    if env_value:
+        return float(env_value)
+    return DEFAULT_TIMEOUTS.get(provider, 10)
+
+
+def get_session(url, provider=None):
+    """
+    URLのホストに対応する共有 requests.Session を返す
+    Keep-Alive で接続を使い回すため、毎回の TCP+TLS ハンドシェイクが不要になる
+    provider はメトリクスのラベル（省略時はホスト名）
+    """
+    key = _host_key(url)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount(key, adapter)
+            session.hooks["response"].append(_session_hook(provider or urlsplit(url).netloc))
+            _sessions[key] = session
+    return session
+
+
+def get_async_client(url, provider=None):
+    """
+    現在のイベントループ・URLのホストに対応する共有 httpx.AsyncClient を返す
+    AsyncClient は生成したループ上でしか使えないため、ループ単位で保持する
+    provider はメトリクスのラベル（省略時はホスト名）
+    """
+    loop = asyncio.get_running_loop()
+    key = (loop, _host_key(url))
+    client = _async_clients.get(key)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(
+            max_connections=POOL_SIZE,
+            max_keepalive_connections=POOL_SIZE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        transport = httpx.AsyncHTTPTransport(
+            limits=limits, http2=HTTP2_ENABLED and _HTTP2_AVAILABLE
+        )
+        client = httpx.AsyncClient(
+            transport=_InstrumentedTransport(transport, provider or urlsplit(url).netloc)
+        )
+        _async_clients[key] = client
+    return client
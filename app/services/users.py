@@ -0,0 +1,65 @@
+import os
+import time
+
+from flask import session
+
+from app.utils.cache import LRUCache
+from app.utils.metrics import register_cache
+
+# ユーザー情報 (users/<uid>) のキャッシュ
+# プロフィール更新時は明示的に消すので、TTLは他のプロセスでの更新を拾うための短めの値
+user_cache = LRUCache(
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+)
+register_cache("users", user_cache)
+
+# セッションに保存した権限 (is_superuser) を信用する秒数
+# 過ぎたらユーザー情報を見直す（権限の取り消しがログアウトしなくても反映されるように）
+ROLE_MAX_AGE_SECONDS = float(os.getenv("SESSION_ROLE_MAX_AGE", "600"))
+
+# 存在しないユーザーもキャッシュするための目印
+_NOT_FOUND = object()
+
+
+def get_user(users, uid):
+    """ユーザー情報を返す（存在しなければ None）。キャッシュになければ保存先 (users) から読む"""
+    cached = user_cache.get(uid)
+    if cached is not None:
+        return None if cached is _NOT_FOUND else cached
+
+    user_data = users.get(uid)
+    user_cache.set(uid, _NOT_FOUND if user_data is None else user_data)
+    return user_data
+
+
+def cache_user(uid, user_data):
+    """読み込み済み・作成したばかりのユーザー情報をキャッシュに入れる"""
+    user_cache.set(uid, user_data)
+
+
+def invalidate_user(uid):
+    """ユーザー情報を更新したときにキャッシュを消す"""
+    user_cache.delete(uid)
+
+
+def remember_roles(user_data):
+    """ユーザーの権限を署名付きセッションに保存する（ログイン時など）"""
+    session["is_superuser"] = bool((user_data or {}).get("is_superuser", False))
+    session["roles_checked_at"] = time.time()
+
+
+def session_is_superuser(users, uid):
+    """
+    ログイン中のユーザーが管理者かを返す（ユーザーが存在しなければ None）
+    セッションに保存した権限が新しければユーザー情報を読まずに判定する
+    """
+    checked_at = session.get("roles_checked_at")
+    if checked_at is not None and time.time() - checked_at < ROLE_MAX_AGE_SECONDS:
+        return session.get("is_superuser", False)
+
+    user_data = get_user(users, uid)
+    if user_data is None:
+        return None
+    remember_roles(user_data)
+    return session["is_superuser"]
@@ -0,0 +1,123 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def estimate_size(value):
+    """キャッシュに入れる値のおおよそのメモリ使用量（バイト）を見積もる"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k) + estimate_size(v)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item)
+    elif hasattr(type(value), "__slots__") and not isinstance(value, (str, bytes)):
+        # __slots__ を使うデータ型 (Article など) は各属性の値を足す
+        for name in type(value).__slots__:
+            size += estimate_size(getattr(value, name, None))
+    return size
+
+
+class LRUCache:
+    """
+    スレッドセーフなLRUキャッシュ
+    エントリ数・推定バイト数の上限とTTLを持ち、ヒット/ミス/追い出しの回数を記録する
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=None, ttl=None, sizeof=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        # key -> (value, expires_at, size)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """キーに対応する値を返す。期限切れや未登録なら default を返す"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """値を登録する。ttl を省略した場合はキャッシュ全体のTTLを使う"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        size = self._sizeof(value) if self.max_bytes else 0
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key):
+        """キーを削除する"""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        """すべてのエントリを削除する（統計はそのまま）"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """監視用の統計情報を返す"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        """上限を超えている間、最も古く使われたエントリから追い出す"""
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, (_, _, size) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    外部APIごとのサーキットブレーカー
+    直近の呼び出しの失敗率がしきい値を超えたら一定時間呼び出しを止め (open)、
+    その後1回だけ試して (half_open) 成功すれば元に戻す (closed)
+    """
+
+    def __init__(self, name, failure_rate=0.5, window=20, min_calls=5, open_seconds=30):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = None
+        self._outcomes = deque(maxlen=window)
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """呼び出してよいかを返す（open中は False）"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._trial_started = None
+            # half_open: 試しの呼び出しは1本だけ通す
+            # (結果が記録されないまま open_seconds が過ぎたら、もう1本通す)
+            now = time.monotonic()
+            if self._trial_started is not None and now - self._trial_started < self.open_seconds:
+                return False
+            self._trial_started = now
+            return True
+
+    def is_closed(self):
+        """通常どおり呼び出せる状態か（allow と違い、試しの呼び出しの枠は使わない）"""
+        with self._lock:
+            return self.state == CLOSED
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                print(f"[CircuitBreaker] {self.name} recovered. Closing circuit.")
+                self.state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            if len(self._outcomes) >= self.min_calls and self.error_rate() >= self.failure_rate:
+                self._open()
+
+    def error_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _open(self):
+        print(f"[CircuitBreaker] {self.name} is failing. Opening circuit for {self.open_seconds}s.")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._trial_started = None
+
+    def status(self):
+        """監視用の状態を返す"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "error_rate": self.error_rate(),
+                "calls": len(self._outcomes),
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """名前ごとに共有されるサーキットブレーカーを返す"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    failure_rate=float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+                    window=int(os.getenv("CIRCUIT_WINDOW", "20")),
+                    min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "5")),
+                    open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def all_breakers():
+    """登録済みのすべてのサーキットブレーカーの状態を返す"""
+    return [breaker.status() for breaker in list(_breakers.values())]
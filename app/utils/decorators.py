@@ -1,5 +1,6 @@
 from functools import wraps
 from flask import session, jsonify, current_app
+from app.services.users import session_is_superuser
 
 def admin_required(f):
     @wraps(f)
@@ -8,17 +9,17 @@ def admin_required(f):
         if not user_id:
             return jsonify({"error": "Authentication required"}), 401
 
-        db = current_app.db
-        if not db:
+        storage = current_app.storage
+        if not storage:
              return jsonify({"error": "Database error"}), 500
 
         try:
-            user_doc = db.collection('users').document(user_id).get()
-            if not user_doc.exists:
+            # ログイン時にセッションへ保存した権限で判定する（古ければユーザー情報を見直す）
+            is_superuser = session_is_superuser(storage.users, user_id)
+            if is_superuser is None:
                 return jsonify({"error": "User not found"}), 403
-            
-            user_data = user_doc.to_dict()
-            if not user_data.get('is_superuser', False):
+
+            if not is_superuser:
                 return jsonify({"error": "Admin access required"}), 403
 
         except Exception as e:
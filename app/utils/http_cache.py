@@ -0,0 +1,82 @@
+import gzip
+import os
+
+from flask import Response, request
+
+from app.utils.cache import LRUCache
+from app.utils.json_codec import EncodedJSON, encode
+from app.utils.metrics import register_cache
+
+try:
+    import brotli
+
+    _BROTLI_AVAILABLE = True
+except ImportError:
+    _BROTLI_AVAILABLE = False
+
+# これより小さいレスポンスは圧縮しても得が少ないのでそのまま返す
+MIN_COMPRESS_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+# 圧縮済みのボディ ((ETag, エンコーディング) -> bytes)
+# 同じ内容のレスポンスは同じ ETag になるので、キャッシュ済みの結果を返すたびに圧縮し直さずに済む
+compressed_bodies = LRUCache(
+    max_entries=int(os.getenv("COMPRESSED_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("COMPRESSED_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    sizeof=len,
+)
+register_cache("compressed", compressed_bodies)
+
+
+def _choose_encoding(size):
+    """Accept-Encoding から使う圧縮方式を選ぶ（圧縮しない場合は None）"""
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    accepted = request.accept_encodings
+    if _BROTLI_AVAILABLE and accepted.quality("br") > 0:
+        return "br"
+    if accepted.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def _compress(body, etag, encoding):
+    key = (etag, encoding)
+    data = compressed_bodies.get(key)
+    if data is None:
+        if encoding == "br":
+            data = brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            # mtime を固定して、同じ内容なら同じバイト列になるようにする
+            data = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        compressed_bodies.set(key, data)
+    return data
+
+
+def json_response(payload, cache_control=None):
+    """
+    条件付きGETと圧縮に対応したJSONレスポンスを作る
+    payload はエンコード済みの EncodedJSON でもよい（キャッシュ済みの結果はそのバイト列をそのまま返す）
+    内容のハッシュを ETag にして、If-None-Match が一致すればボディなしの 304 を返す
+    クライアントが対応していれば brotli / gzip で圧縮する
+    """
+    encoded = payload if isinstance(payload, EncodedJSON) else encode(payload)
+    body, etag = encoded.body, encoded.etag
+
+    # 圧縮するとバイト列が変わるので弱い ETag にする
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        encoding = _choose_encoding(len(body))
+        if encoding:
+            response = Response(_compress(body, etag, encoding), mimetype="application/json")
+            response.headers["Content-Encoding"] = encoding
+        else:
+            response = Response(body, mimetype="application/json")
+
+    response.set_etag(etag, weak=True)
+    response.vary.add("Accept-Encoding")
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    return response
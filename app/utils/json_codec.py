@@ -0,0 +1,51 @@
+import hashlib
+import json
+from datetime import date, datetime, timezone
+
+try:
+    import orjson
+
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
+
+
+def _default(obj):
+    """標準ではJSONにできない値を変換する"""
+    # Firestore のタイムスタンプ (DatetimeWithNanoseconds) は datetime のサブクラス
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    # 書き込み結果の時刻などで返る protobuf の Timestamp
+    if hasattr(obj, "ToDatetime"):
+        return obj.ToDatetime().replace(tzinfo=timezone.utc).isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """
+    JSONのバイト列にエンコードする
+    orjson があればそれを使い、なければ標準の json を使う（どちらもキーは並べ替える）
+    """
+    if _ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class EncodedJSON:
+    """エンコード済みのJSON。ボディと ETag 用のハッシュを一度だけ計算して使い回す"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+
+    def __len__(self):
+        return len(self.body)
+
+
+def encode(obj):
+    """値をエンコードして EncodedJSON を返す"""
+    return EncodedJSON(dumps(obj))
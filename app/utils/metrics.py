@@ -0,0 +1,388 @@
+import bisect
+import threading
+import time
+
+from flask import g, request
+
+from app.utils.pool import all_pools
+
+# レイテンシのヒストグラムの区切り（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, help_text, labelnames=(), function=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        # function は出力のたびに {ラベル値のタプル: 値} を返す（他所で数えている値を出すとき）
+        self._function = function
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _collect(self):
+        if self._function is None:
+            return self._values
+        try:
+            return self._function()
+        except Exception as e:
+            print(f"[metrics] Failed to collect {self.name}: {e}")
+            return {}
+
+    def _render_samples(self):
+        for key, value in sorted(self._collect().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    """増えるだけの値（リクエスト数など）。inc で数えるか、出力のたびに関数で値を取る"""
+
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def values(self):
+        """{ラベル値のタプル: 値} を返す"""
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(_Metric):
+    """増減する値。set で設定するか、出力のたびに関数で値を取る"""
+
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """値の分布（レイテンシなど）。区切りごとの件数と合計を持つ"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [区切りごとの件数 (最後は +Inf), 合計, 件数]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """with ブロックの所要時間を記録するコンテキストマネージャ"""
+        return _Timer(self, labels)
+
+    def snapshot(self, **labels):
+        """(件数, 合計, 区切りごとの件数) を返す"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return 0, 0.0, [0] * (len(self.buckets) + 1)
+            return state[2], state[1], list(state[0])
+
+    def quantile(self, q, **labels):
+        """区切りの中で線形補間したおおよその分位点（記録がなければ None）"""
+        count, _, counts = self.snapshot(**labels)
+        if not count:
+            return None
+        target = q * count
+        cumulative = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if cumulative + bucket_count >= target and bucket_count:
+                return lower + (upper - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+    def _render_samples(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+        return False
+
+
+class Registry:
+    """メトリクスの登録先。render で Prometheus のテキスト形式にする"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labelnames=(), function=None):
+        return self._register(Counter, name, help_text, labelnames, function=function)
+
+    def gauge(self, name, help_text, labelnames=(), function=None):
+        return self._register(Gauge, name, help_text, labelnames, function=function)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- アプリ全体で使うメトリクス ---
+
+# 上流API（ニュースAPI・DeepL）への1回ごとのHTTPリクエスト
+upstream_latency = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Latency of upstream API requests until response headers.",
+    ("provider",),
+)
+upstream_requests = registry.counter(
+    "upstream_requests_total",
+    "Upstream API requests by outcome.",
+    ("provider", "outcome"),
+)
+# サーキットブレーカー・レート制限で送らなかった呼び出し
+upstream_skipped = registry.counter(
+    "upstream_skipped_total",
+    "Upstream calls skipped before sending.",
+    ("provider", "reason"),
+)
+
+# Flaskのルート
+route_latency = registry.histogram(
+    "http_request_duration_seconds",
+    "Latency of Flask routes (until the response is returned; streams exclude the body).",
+    ("endpoint", "method"),
+)
+route_requests = registry.counter(
+    "http_requests_total",
+    "Flask route responses by status code.",
+    ("endpoint", "method", "status"),
+)
+
+# 翻訳
+translation_chars = registry.counter(
+    "deepl_characters_total",
+    "Characters sent to DeepL for translation.",
+    ("target_lang",),
+)
+translation_texts = registry.counter(
+    "translation_texts_total",
+    "Texts translated, by where the translation came from.",
+    ("source",),
+)
+
+# 常駐イベントループで実行中の処理（同期ルートから投げられて結果待ちのもの）
+inflight = registry.gauge(
+    "aggregator_inflight",
+    "Coroutines submitted to the aggregator event loop and not yet finished.",
+)
+
+
+def init_app(app):
+    """Flaskアプリの各ルートのレイテンシとステータスコードを記録する"""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_route(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unmatched"
+            route_latency.observe(
+                time.perf_counter() - started, endpoint=endpoint, method=request.method
+            )
+            route_requests.inc(
+                endpoint=endpoint, method=request.method, status=response.status_code
+            )
+        return response
+
+
+def outcome_for_status(status_code):
+    """HTTPステータスコードを結果の分類にする"""
+    if status_code < 400:
+        return "success"
+    if status_code in (429, 456):
+        return "rate_limited"
+    if status_code < 500:
+        return "client_error"
+    return "server_error"
+
+
+def observe_upstream(provider, outcome, started):
+    """上流APIへのリクエスト1回分のレイテンシと結果を記録する"""
+    upstream_latency.observe(time.perf_counter() - started, provider=provider)
+    upstream_requests.inc(provider=provider, outcome=outcome)
+
+
+_caches = {}
+
+
+def register_cache(name, cache):
+    """キャッシュのヒット率などを /admin/metrics に出すよう登録する"""
+    _caches[name] = cache
+
+
+def cache_stats():
+    """登録済みキャッシュの統計を {名前: stats} で返す"""
+    return {name: cache.stats() for name, cache in list(_caches.items())}
+
+
+def _cache_values(field):
+    def collect():
+        return {(name,): stats[field] for name, stats in cache_stats().items()}
+    return collect
+
+
+# 起動からの累計は counter（_total）、現在の値は gauge として出す
+for _field, _help in (
+    ("hits", "Cache hits."),
+    ("misses", "Cache misses."),
+    ("evictions", "Entries evicted by size limits."),
+):
+    registry.counter(f"cache_{_field}_total", _help, ("cache",), function=_cache_values(_field))
+
+for _field, _help in (
+    ("entries", "Entries currently cached."),
+    ("bytes", "Estimated bytes currently cached."),
+    ("hit_rate", "Cache hit ratio since start."),
+):
+    registry.gauge(f"cache_{_field}", _help, ("cache",), function=_cache_values(_field))
+
+
+def _pool_values(field):
+    def collect():
+        return {(status["name"],): status[field] for status in all_pools()}
+    return collect
+
+
+# 同時実行数を制限するプール（app/utils/pool.py）
+for _field, _help in (
+    ("active", "Work items currently running in the pool."),
+    ("queued", "Work items waiting for a pool slot."),
+):
+    registry.gauge(f"pool_{_field}", _help, ("pool",), function=_pool_values(_field))
+registry.counter(
+    "pool_rejected_total",
+    "Work items rejected because the pool queue was full.",
+    ("pool",),
+    function=_pool_values("rejected"),
+)
+
+
+def provider_summary():
+    """管理画面用に、上流APIごとのリクエスト数・エラー率・おおよそのp50/p99を返す"""
+    outcomes = {}
+    for (provider, outcome), value in upstream_requests.values().items():
+        outcomes.setdefault(provider, {})[outcome] = value
+    skipped = {}
+    for (provider, _), value in upstream_skipped.values().items():
+        skipped[provider] = skipped.get(provider, 0) + value
+
+    summary = []
+    for provider in sorted(set(outcomes) | set(skipped)):
+        counts = outcomes.get(provider, {})
+        total = sum(counts.values())
+        p50 = upstream_latency.quantile(0.5, provider=provider)
+        p99 = upstream_latency.quantile(0.99, provider=provider)
+        summary.append({
+            "provider": provider,
+            "requests": total,
+            "errors": total - counts.get("success", 0),
+            "error_rate": (total - counts.get("success", 0)) / total if total else 0.0,
+            "skipped": skipped.get(provider, 0),
+            "p50_ms": p50 * 1000 if p50 is not None else None,
+            "p99_ms": p99 * 1000 if p99 is not None else None,
+        })
+    return summary
+
+
+def translation_summary():
+    """管理画面用に、翻訳の文字数・訳文の取得元の内訳・実行中の処理数を返す"""
+    texts = {source: value for (source,), value in translation_texts.values().items()}
+    return {
+        "deepl_chars": sum(translation_chars.values().values()),
+        "memory_texts": texts.get("memory", 0),
+        "deepl_texts": texts.get("deepl", 0),
+        "inflight": inflight.value(),
+    }
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    """プールが埋まっていて待ち行列も一杯のときに、待たずにすぐ断るための例外"""
+
+    def __init__(self, pool_name, retry_after):
+        super().__init__(f"{pool_name} pool is saturated")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+
+class BoundedPool:
+    """
+    常駐イベントループ上で同時実行数と待ち行列の長さを制限するプール
+    同時実行数の上限に達したら待ち行列に並び、待ち行列も一杯なら Overloaded ですぐに断る
+    （イベントループのスレッドからだけ使う）
+    """
+
+    def __init__(self, name, concurrency, max_queue, retry_after=5):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._active = 0
+        self._waiters = deque()
+        self.rejected = 0
+
+    def is_saturated(self):
+        """いま acquire したら断られる状態か（他スレッドから見る目安）"""
+        return self._active >= self.concurrency and len(self._waiters) >= self.max_queue
+
+    async def acquire(self):
+        if self._active < self.concurrency and not self._waiters:
+            self._active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release から枠を譲り受けるまで待つ
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 枠を譲り受けた直後にキャンセルされた場合は次に回す
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # 枠をそのまま待っている処理に渡す（_active は変えない）
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def status(self):
+        """監視用の状態を返す"""
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def create_pool(name, concurrency, max_queue, retry_after=5):
+    """名前つきのプールを作って登録する（同じ名前ならそれを返す）"""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = BoundedPool(name, concurrency, max_queue, retry_after)
+        return pool
+
+
+def all_pools():
+    """登録済みのすべてのプールの状態を返す"""
+    return [pool.status() for pool in list(_pools.values())]
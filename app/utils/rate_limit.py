@@ -0,0 +1,161 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# プロバイダごとの既定値（無料プランの上限に合わせている。0 は無制限）
+# 環境変数 <PROVIDER>_RATE_PER_SEC / _BURST / _DAILY_REQUESTS / _DAILY_CHARS で上書き可能
+DEFAULT_LIMITS = {
+    "newsapi": {"rate_per_sec": 5, "burst": 10, "daily_requests": 100, "daily_chars": 0},
+    "gnews": {"rate_per_sec": 1, "burst": 2, "daily_requests": 100, "daily_chars": 0},
+    "newsdata": {"rate_per_sec": 5, "burst": 10, "daily_requests": 200, "daily_chars": 0},
+    "deepl": {"rate_per_sec": 10, "burst": 20, "daily_requests": 0, "daily_chars": 0},
+}
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+class ProviderLimiter:
+    """
+    プロバイダ・APIキーごとのクライアント側レート制限
+    トークンバケットで秒間のリクエスト数を、日次カウンタでリクエスト数と文字数を制限する。
+    予算が尽きている場合は送信前に断る
+    """
+
+    def __init__(self, name, key_id="", rate_per_sec=0, burst=0, daily_requests=0, daily_chars=0):
+        self.name = name
+        self.key_id = key_id
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst or max(1, rate_per_sec)
+        self.daily_requests = daily_requests
+        self.daily_chars = daily_chars
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._day = _today()
+        self._requests_today = 0
+        self._chars_today = 0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if self.rate_per_sec:
+            elapsed = now - self._refilled_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_sec)
+        self._refilled_at = now
+
+    def _roll_day(self):
+        today = _today()
+        if today != self._day:
+            self._day = today
+            self._requests_today = 0
+            self._chars_today = 0
+
+    def try_acquire(self, chars=0):
+        """1リクエスト分（と文字数分）の予算を確保できれば True を返す"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return False
+
+            self._roll_day()
+            if self.daily_requests and self._requests_today >= self.daily_requests:
+                return False
+            if self.daily_chars and self._chars_today + chars > self.daily_chars:
+                return False
+
+            self._refill(now)
+            if self.rate_per_sec:
+                if self._tokens < 1:
+                    return False
+                self._tokens -= 1
+
+            self._requests_today += 1
+            self._chars_today += chars
+            return True
+
+    def has_budget(self):
+        """いま try_acquire したら通るか（予算は消費しない）"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return False
+            self._roll_day()
+            if self.daily_requests and self._requests_today >= self.daily_requests:
+                return False
+            self._refill(now)
+            return not self.rate_per_sec or self._tokens >= 1
+
+    def block_for(self, seconds):
+        """上流から429などを受けた場合に、一定時間リクエストを止める"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def status(self):
+        """監視用に残りの予算を返す"""
+        with self._lock:
+            now = time.monotonic()
+            self._roll_day()
+            self._refill(now)
+            return {
+                "name": self.name,
+                "key_id": self.key_id,
+                "tokens": round(self._tokens, 2) if self.rate_per_sec else None,
+                "requests_today": self._requests_today,
+                "requests_remaining": (
+                    max(0, self.daily_requests - self._requests_today)
+                    if self.daily_requests else None
+                ),
+                "chars_today": self._chars_today,
+                "chars_remaining": (
+                    max(0, self.daily_chars - self._chars_today) if self.daily_chars else None
+                ),
+                "blocked_for": max(0.0, round(self._blocked_until - now, 1)),
+            }
+
+
+def _limit_setting(name, field):
+    env_value = os.getenv(f"{name.upper()}_{field.upper()}")
+    if env_value:
+        return float(env_value)
+    return DEFAULT_LIMITS.get(name, {}).get(field, 0)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, api_key=None):
+    """プロバイダ名とAPIキーの組ごとに共有されるリミッターを返す"""
+    # APIキーそのものは監視画面に出さないよう、ハッシュの先頭だけを識別子にする
+    key_id = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:8]
+    limiter = _limiters.get((name, key_id))
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get((name, key_id))
+            if limiter is None:
+                limiter = ProviderLimiter(
+                    name,
+                    key_id=key_id,
+                    rate_per_sec=_limit_setting(name, "rate_per_sec"),
+                    burst=_limit_setting(name, "burst"),
+                    daily_requests=int(_limit_setting(name, "daily_requests")),
+                    daily_chars=int(_limit_setting(name, "daily_chars")),
+                )
+                _limiters[(name, key_id)] = limiter
+    return limiter
+
+
+def all_limiters():
+    """登録済みのすべてのリミッターの状態を返す"""
+    return [limiter.status() for limiter in list(_limiters.values())]
+
+
+def retry_after_seconds(headers, default=60):
+    """Retry-After ヘッダ（秒数）を読み取る。なければ default を返す"""
+    try:
+        return float(headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,69 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    同じキーの処理が実行中なら、新たに実行せずその結果を待つ (asyncio用)
+    待っている側がキャンセルされても、共有している処理は止めない
+    cancel_abandoned=True の場合は、do で待っている側が1つもいなくなった処理を止める
+    （締め切りで打ち切った呼び出しが、プロバイダ呼び出しの枠を持ったまま残らないように）
+    """
+
+    def __init__(self, cancel_abandoned=False):
+        self.cancel_abandoned = cancel_abandoned
+        self._calls = {}
+        # 処理 -> do で結果を待っている数
+        self._waiting = {}
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    def __len__(self):
+        return len(self._calls)
+
+    def _register(self, key, fut):
+        self._calls[key] = fut
+
+        def forget(_):
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+
+        fut.add_done_callback(forget)
+
+    async def do(self, key, fn):
+        """key の処理が実行中ならその結果を待ち、なければ fn() を実行する"""
+        fut = self._calls.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._register(key, fut)
+        self._waiting[fut] = self._waiting.get(fut, 0) + 1
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            self._waiting[fut] -= 1
+            if not self._waiting[fut]:
+                del self._waiting[fut]
+                if self.cancel_abandoned and not fut.done():
+                    fut.cancel()
+
+    async def do_many(self, keys, fn):
+        """
+        複数キーをまとめて処理する
+        実行中でないキーだけを fn(keys) に一括で渡し（戻り値は keys と同じ順序のリスト）、
+        実行中のキーはその結果を待つ。{key: 結果} の辞書を返す
+        """
+        keys = list(dict.fromkeys(keys))
+        own = [key for key in keys if key not in self._calls]
+
+        if own:
+            batch = asyncio.ensure_future(fn(own))
+
+            async def pick(index):
+                return (await batch)[index]
+
+            for i, key in enumerate(own):
+                self._register(key, asyncio.ensure_future(pick(i)))
+
+        futures = [self._calls[key] for key in keys]
+        results = await asyncio.shield(asyncio.gather(*futures))
+        return dict(zip(keys, results))
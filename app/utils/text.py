@@ -0,0 +1,25 @@
+import re
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# ひらがな・カタカナ・漢字・半角カナ
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f]+")
+
+
+def is_cjk(token):
+    """日本語（ひらがな・カタカナ・漢字）のトークンかどうか"""
+    return bool(_CJK_RE.match(token))
+
+
+def tokenize(text):
+    """
+    英語と日本語が混ざったテキストをトークンのリストにする
+    英語は小文字化した単語、日本語は文字bigram（1文字だけの場合はその文字）
+    """
+    text = (text or "").lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
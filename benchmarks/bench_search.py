@@ -0,0 +1,208 @@
+"""
+get_translated_articles のオフラインベンチマーク
+
+ローカルのスタブサーバーに向けて検索を実行し、ページサイズ・同時実行数ごとに
+レイテンシのパーセンタイル、1検索あたりの上流呼び出し回数、メモリ使用量を JSON で出力する
+
+    python -m benchmarks.bench_search --page-sizes 10,50 --concurrency 1,8 --output report.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.stub_servers import start_stubs, stub_environ
+
+REPORT_VERSION = 1
+
+
+def _parse_ints(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for get_translated_articles")
+    parser.add_argument("--page-sizes", type=_parse_ints, default=[10, 50])
+    parser.add_argument("--concurrency", type=_parse_ints, default=[1, 4, 16])
+    parser.add_argument("--searches", type=int, default=40, help="searches per scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="news stub latency (s)")
+    parser.add_argument("--deepl-latency", type=float, default=0.03, help="DeepL stub latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra random latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--articles", type=int, default=None, help="articles per response")
+    parser.add_argument("--description-chars", type=int, default=200)
+    parser.add_argument("--overlap", type=float, default=0.3)
+    parser.add_argument("--warm", action="store_true", help="repeat the same query (cache hits)")
+    parser.add_argument("--tracemalloc", action="store_true", help="trace Python allocations")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report to this path (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def _configure_environment(stubs, workdir):
+    """アプリのモジュールを読み込む前に、スタブとベンチマーク用の設定を環境変数に入れる"""
+    os.environ.update(stub_environ(stubs))
+    os.environ.update({
+        "NEWSAPI_KEY": "bench",
+        "GNEWS_API_KEY": "bench",
+        "NEWSDATA_IO_API_KEY": "bench",
+        "DEEPL_AUTH_KEY": "bench",
+        "TRANSLATION_DB_PATH": os.path.join(workdir, "translation_memory.sqlite3"),
+        "ARTICLE_DB_PATH": os.path.join(workdir, "articles.sqlite3"),
+        "PREFETCH_ENABLED": "0",
+    })
+    # クライアント側のレート制限は測定の邪魔になるので外す（0 は無制限）
+    for provider in ("NEWSAPI", "GNEWS", "NEWSDATA", "DEEPL"):
+        for field in ("RATE_PER_SEC", "DAILY_REQUESTS", "DAILY_CHARS"):
+            os.environ[f"{provider}_{field}"] = "0"
+
+
+def percentile(values, pct):
+    """最近傍順位法によるパーセンタイル"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _latency_summary(latencies):
+    ms = [v * 1000 for v in latencies]
+    return {
+        "p50": percentile(ms, 50),
+        "p90": percentile(ms, 90),
+        "p99": percentile(ms, 99),
+        "max": max(ms) if ms else None,
+        "mean": sum(ms) / len(ms) if ms else None,
+    }
+
+
+def _max_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS はバイト、Linux はKB単位
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(stubs, page_size, concurrency, args, scenario_no):
+    """1つの (page_size, concurrency) の組み合わせで検索を繰り返して計測する"""
+    from app.services.aggregator import get_translated_articles, translation_cache
+
+    for stub in stubs.values():
+        stub.reset()
+    if not args.warm:
+        translation_cache.clear()
+    if args.tracemalloc:
+        tracemalloc.reset_peak()
+
+    def search(i):
+        query = "Apple" if args.warm else f"Apple s{scenario_no}q{i}"
+        started = time.perf_counter()
+        try:
+            articles = get_translated_articles(query=query, page_size=page_size, lang="ja")
+            return time.perf_counter() - started, len(articles), None
+        except Exception as e:
+            return time.perf_counter() - started, 0, f"{type(e).__name__}: {e}"
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(search, range(args.searches)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [r[0] for r in results]
+    failures = [r[2] for r in results if r[2]]
+    upstream = {name: stub.stats() for name, stub in stubs.items()}
+    memory = {"max_rss_kb": _max_rss_kb(), "translation_cache": translation_cache.stats()}
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        memory.update({"traced_current_bytes": current, "traced_peak_bytes": peak})
+
+    return {
+        "page_size": page_size,
+        "concurrency": concurrency,
+        "searches": args.searches,
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": args.searches / elapsed if elapsed else None,
+        "latency_ms": _latency_summary(latencies),
+        "articles_per_search": sum(r[1] for r in results) / len(results),
+        "failures": len(failures),
+        "failure_samples": failures[:3],
+        "upstream_calls_per_search": {
+            name: stats["calls"] / args.searches for name, stats in upstream.items()
+        },
+        "upstream": upstream,
+        "memory": memory,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stubs = start_stubs(
+        latency=args.latency,
+        deepl_latency=args.deepl_latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        articles=args.articles,
+        description_chars=args.description_chars,
+        overlap=args.overlap,
+        seed=args.seed,
+    )
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    _configure_environment(stubs, workdir)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    scenarios = []
+    try:
+        # アプリのログはレポートと混ざらないよう標準エラーに出す
+        with contextlib.redirect_stdout(sys.stderr):
+            for page_size in args.page_sizes:
+                for concurrency in args.concurrency:
+                    print(f"[bench] page_size={page_size} concurrency={concurrency}")
+                    scenarios.append(
+                        run_scenario(stubs, page_size, concurrency, args, len(scenarios))
+                    )
+    finally:
+        for stub in stubs.values():
+            stub.stop()
+
+    report = {
+        "version": REPORT_VERSION,
+        "meta": {
+            "git_revision": _git_revision(),
+            "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "scenarios": scenarios,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[bench] Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+2つのベンチマークレポートを比較し、シナリオごとのレイテンシの変化を表示する
+
+    python -m benchmarks.compare old.json new.json
+"""
+import json
+import sys
+
+
+def _scenarios(report):
+    return {(s["page_size"], s["concurrency"]): s for s in report["scenarios"]}
+
+
+def compare(old, new):
+    """(page_size, concurrency, 指標, 旧, 新, 変化率%) のリストを返す"""
+    rows = []
+    old_scenarios = _scenarios(old)
+    for key, scenario in _scenarios(new).items():
+        before = old_scenarios.get(key)
+        if before is None:
+            continue
+        for metric in ("p50", "p90", "p99"):
+            a = before["latency_ms"][metric]
+            b = scenario["latency_ms"][metric]
+            change = (b - a) / a * 100 if a else None
+            rows.append((*key, metric, a, b, change))
+    return rows
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("usage: python -m benchmarks.compare OLD.json NEW.json", file=sys.stderr)
+        return 2
+    with open(argv[0], encoding="utf-8") as f:
+        old = json.load(f)
+    with open(argv[1], encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{'page_size':>9} {'conc':>4} {'metric':>6} {'old ms':>10} {'new ms':>10} {'change':>8}")
+    for page_size, concurrency, metric, a, b, change in compare(old, new):
+        change_str = f"{change:+.1f}%" if change is not None else "n/a"
+        print(f"{page_size:>9} {concurrency:>4} {metric:>6} {a:>10.1f} {b:>10.1f} {change_str:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
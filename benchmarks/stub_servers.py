@@ -0,0 +1,238 @@
+"""
+NewsAPI / GNews / NewsData.io / DeepL の代わりになるローカルのスタブサーバー
+応答の遅延・エラー率・記事数・説明文の長さを設定でき、呼び出し回数を数える
+"""
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# スタブごとのパス（本物のAPIと同じパスにしておく）
+PATHS = {
+    "newsapi": "/v2/everything",
+    "gnews": "/api/v4/search",
+    "newsdata": "/api/1/news",
+    "deepl": "/v2/translate",
+}
+
+# 各サービスモジュールの BASE_URL を上書きする環境変数
+BASE_URL_ENV = {
+    "newsapi": "NEWSAPI_BASE_URL",
+    "gnews": "GNEWS_BASE_URL",
+    "newsdata": "NEWSDATA_BASE_URL",
+    "deepl": "DEEPL_BASE_URL",
+}
+
+_QUOTED_RE = re.compile(r'"([^"]+)"')
+
+
+def _query_words(query):
+    """'"Apple" AND "iPhone"' 形式のクエリから単語を取り出す"""
+    words = _QUOTED_RE.findall(query or "")
+    return words or (query or "").split()
+
+
+class StubServer:
+    """1つの上流APIの代わりをするHTTPサーバー（別スレッドで動く）"""
+
+    def __init__(
+        self,
+        name,
+        latency=0.05,
+        jitter=0.0,
+        error_rate=0.0,
+        articles=None,
+        description_chars=200,
+        overlap=0.3,
+        seed=None,
+    ):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # 1レスポンスの記事数（None ならリクエストされた件数）
+        self.articles = articles
+        self.description_chars = description_chars
+        # 他のプロバイダと同じURLを返す記事の割合（重複排除の負荷を再現する）
+        self.overlap = overlap
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.bytes_sent = 0
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "bytes_sent": self.bytes_sent}
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{PATHS[self.name]}"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub._handle(self, parse_qs(urlsplit(self.path).query))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8")
+                stub._handle(self, parse_qs(body))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name=f"stub-{self.name}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _handle(self, handler, params):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(delay)
+
+        if failed:
+            status, payload = 500, {"status": "error", "message": "stub error"}
+        else:
+            status, payload = 200, self._payload(params)
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self.bytes_sent += len(body)
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _payload(self, params):
+        def param(*names, default=""):
+            for name in names:
+                if name in params:
+                    return params[name][0]
+            return default
+
+        if self.name == "deepl":
+            target = param("target_lang", default="JA")
+            return {
+                "translations": [
+                    {"detected_source_language": "EN", "text": f"[{target}] {text}"}
+                    for text in params.get("text", [])
+                ]
+            }
+
+        words = _query_words(param("q"))
+        lang = param("lang", "language", default="en")
+        page_size = int(param("pageSize", "max", "size", default="10"))
+        count = page_size if self.articles is None else min(self.articles, page_size)
+        return self._articles_payload(words, lang, count)
+
+    def _articles_payload(self, words, lang, count):
+        title_base = " ".join(words) or "News"
+        slug = "-".join(w.lower() for w in words) or "news"
+        published = datetime.now(timezone.utc) - timedelta(minutes=5)
+        items = []
+        for i in range(count):
+            shared = i < count * self.overlap
+            host = "news.example.com" if shared else f"{self.name}.example.com"
+            items.append({
+                "title": f"{title_base} story {i} ({lang})",
+                "description": ("Lorem ipsum dolor sit amet. " * 16)[: self.description_chars],
+                "url": f"https://{host}/{lang}/{slug}/{i}",
+                "image": f"https://{host}/img/{i}.jpg",
+                "published": (published - timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            })
+
+        if self.name == "newsapi":
+            return {
+                "status": "ok",
+                "totalResults": len(items),
+                "articles": [
+                    {
+                        "title": a["title"],
+                        "description": a["description"],
+                        "url": a["url"],
+                        "urlToImage": a["image"],
+                        "publishedAt": a["published"],
+                        "source": {"id": None, "name": "Stub NewsAPI"},
+                    }
+                    for a in items
+                ],
+            }
+        if self.name == "gnews":
+            return {
+                "totalArticles": len(items),
+                "articles": [
+                    {
+                        "title": a["title"],
+                        "description": a["description"],
+                        "url": a["url"],
+                        "image": a["image"],
+                        "publishedAt": a["published"],
+                        "source": {"name": "Stub GNews", "url": "https://gnews.example.com"},
+                    }
+                    for a in items
+                ],
+            }
+        return {
+            "status": "success",
+            "totalResults": len(items),
+            "results": [
+                {
+                    "title": a["title"],
+                    "description": a["description"],
+                    "link": a["url"],
+                    "image_url": a["image"],
+                    "pubDate": a["published"].replace("T", " ").rstrip("Z"),
+                    "source_id": "stub_newsdata",
+                }
+                for a in items
+            ],
+        }
+
+
+def start_stubs(deepl_latency=None, seed=None, **options):
+    """4つのスタブサーバーを起動して {名前: StubServer} を返す"""
+    stubs = {}
+    for i, name in enumerate(PATHS):
+        kwargs = dict(options)
+        if name == "deepl" and deepl_latency is not None:
+            kwargs["latency"] = deepl_latency
+        stubs[name] = StubServer(
+            name, seed=None if seed is None else seed + i, **kwargs
+        ).start()
+    return stubs
+
+
+def stub_environ(stubs):
+    """サービスモジュールをスタブに向けるための環境変数を返す"""
+    return {BASE_URL_ENV[name]: stub.base_url for name, stub in stubs.items()}
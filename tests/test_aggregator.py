@@ -0,0 +1,107 @@
+import asyncio
+
+from app.models import Article
+from app.services import aggregator
+from app.services.article_index import ArticleIndex
+from app.services.translation_memory import TranslationMemory
+from app.utils.pool import BoundedPool
+
+
+def test_hedge_that_returns_nothing_does_not_drop_the_primary(monkeypatch):
+    monkeypatch.setattr(aggregator, "HEDGE_AFTER_SECONDS", 0.01)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            # 遅いが記事を返す1本目
+            await asyncio.sleep(0.05)
+            return ["article"]
+        # 予算切れなどですぐに空で返る2本目
+        return []
+
+    assert asyncio.run(aggregator._hedged("newsapi", fetch)) == ["article"]
+    assert len(calls) == 2
+
+
+def test_no_hedge_when_it_would_be_rejected(monkeypatch):
+    monkeypatch.setattr(aggregator, "HEDGE_AFTER_SECONDS", 0.01)
+    monkeypatch.setattr(aggregator, "_can_hedge", lambda name: False)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.03)
+        return ["article"]
+
+    assert asyncio.run(aggregator._hedged("newsapi", fetch)) == ["article"]
+    assert len(calls) == 1
+
+
+def _slow(result, seconds, log=None):
+    async def fetch():
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append("cancelled")
+            raise
+        return result
+    return fetch
+
+
+def test_deadline_returns_partial_results_and_drops_late_providers(monkeypatch):
+    monkeypatch.setattr(aggregator, "DEADLINE_SECONDS", 0.05)
+
+    async def main():
+        gathered = await aggregator._gather_until_deadline(
+            [("en", _slow(["fast"], 0)()), ("ja", _slow(["late"], 1)())]
+        )
+        streamed = [
+            item async for item in aggregator._iter_provider_results(
+                [("en", _slow(["fast"], 0)()), ("ja", _slow(["late"], 1)())]
+            )
+        ]
+        return gathered, streamed
+
+    gathered, streamed = asyncio.run(asyncio.wait_for(main(), 0.5))
+    assert gathered == [("en", ["fast"]), ("ja", [])]
+    assert streamed == [("en", ["fast"])]
+
+
+def test_late_provider_call_is_cancelled_and_frees_its_pool_slot(monkeypatch):
+    monkeypatch.setattr(aggregator, "DEADLINE_SECONDS", 0.05)
+    monkeypatch.setattr(aggregator, "provider_pool", BoundedPool("test_provider", concurrency=1, max_queue=0))
+    log = []
+
+    def call(key):
+        return aggregator._provider_flight.do(
+            key, lambda: aggregator._pooled("newsapi", _slow(["late"], 1, log))
+        )
+
+    async def main():
+        assert await aggregator._gather_until_deadline([("en", call(("late", 1)))]) == [("en", [])]
+        await asyncio.sleep(0.01)
+        # 締め切りの直後に上流の呼び出しも止まり、枠が空く
+        assert log == ["cancelled"]
+        assert aggregator.provider_pool.status()["active"] == 0
+        assert ("late", 1) not in aggregator._provider_flight
+
+    asyncio.run(main())
+
+
+def test_translate_articles_finds_ids_served_by_another_process(tmp_path, monkeypatch):
+    index = ArticleIndex(path=str(tmp_path / "articles.sqlite3"))
+    article = Article(title="Apple news", description="", url="https://a.com/1", language="en")
+    index.add_many([article])
+
+    async def fake_deepl(texts, target_lang):
+        return [f"訳:{t}" for t in texts]
+
+    monkeypatch.setattr(aggregator, "article_index", ArticleIndex(path=index.path))
+    monkeypatch.setattr(aggregator, "translation_memory", TranslationMemory(path=str(tmp_path / "tm.sqlite3")))
+    monkeypatch.setattr(aggregator, "translate_many_async", fake_deepl)
+    assert aggregator.lazy_articles.get(article.id) is None
+
+    translated = aggregator.translate_articles([article.id, "unknown"], "ja")
+    assert [a.text("ja") for a in translated] == [("訳:Apple news", "")]
@@ -0,0 +1,38 @@
+import sqlite3
+
+from app.models import Article
+from app.services.article_index import ArticleIndex
+
+
+def test_sqlite_rows_beyond_max_docs_or_retention_are_pruned(tmp_path):
+    index = ArticleIndex(path=str(tmp_path / "articles.sqlite3"), max_docs=3)
+    index.add_many([Article(title=f"Apple {i}", url=f"https://a.com/{i}", language="en") for i in range(5)])
+
+    conn = index._connect()
+    assert conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] == 3
+
+    # 保存期間を過ぎた記事は件数に関係なく削除される
+    conn.execute("UPDATE articles SET added_at = 0 WHERE doc_id = (SELECT MIN(doc_id) FROM articles)")
+    conn.commit()
+    reloaded = ArticleIndex(path=index.path, max_docs=3)
+    reloaded.load()
+
+    assert conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] == 2
+    assert len(reloaded) == 2
+
+
+def test_get_many_finds_articles_by_id_in_an_older_db(tmp_path):
+    path = str(tmp_path / "articles.sqlite3")
+    # article_id 列のない古い形式のDB
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE articles (doc_id TEXT PRIMARY KEY, lang TEXT NOT NULL, data TEXT NOT NULL, added_at REAL NOT NULL)")
+    conn.commit()
+    conn.close()
+
+    article = Article(title="Apple", url="https://a.com/1", language="en")
+    ArticleIndex(path=path).add_many([article])
+
+    # 別のインスタンス（他のワーカー・再起動後）からも記事IDで引ける
+    found = ArticleIndex(path=path).get_many([article.id, "unknown"])
+    assert list(found) == [article.id]
+    assert found[article.id].url == "https://a.com/1"
@@ -0,0 +1,49 @@
+import time
+
+from app.utils.cache import LRUCache
+
+
+def test_lru_eviction_by_entries():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" が最も古く使われたエントリになる
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_eviction_by_bytes():
+    cache = LRUCache(max_entries=None, max_bytes=100, sizeof=lambda v: len(v))
+    cache.set("a", "x" * 60)
+    cache.set("b", "y" * 60)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "y" * 60
+    assert cache.stats()["bytes"] == 60
+
+
+def test_ttl_expiry():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_hit_and_miss_counters():
+    cache = LRUCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from app.utils import circuit_breaker
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def _breaker(monkeypatch):
+    now = SimpleNamespace(value=100.0)
+    monkeypatch.setattr(circuit_breaker, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return CircuitBreaker("test", failure_rate=0.5, window=10, min_calls=4, open_seconds=30), now
+
+
+def test_opens_after_failures_and_closes_after_a_successful_probe(monkeypatch):
+    breaker, now = _breaker(monkeypatch)
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    # 呼び出し数が min_calls に届くまでは開かない
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now.value += 30
+    # open_seconds が過ぎたら試しの呼び出しを1本だけ通す
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow() and not breaker.is_closed()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.error_rate() == 0.0
+
+
+def test_failed_probe_reopens_and_stalled_probe_is_retried(monkeypatch):
+    breaker, now = _breaker(monkeypatch)
+    for _ in range(4):
+        breaker.record_failure()
+    now.value += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+
+    now.value += 30
+    assert breaker.allow()
+    # 試しの呼び出しの結果が記録されないまま open_seconds が過ぎたら、もう1本通す
+    now.value += 29
+    assert not breaker.allow()
+    now.value += 1
+    assert breaker.allow()
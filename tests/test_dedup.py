@@ -0,0 +1,55 @@
+from app.models import Article
+from app.services.dedup import ArticleClusterer, canonicalize_url
+
+
+def _cluster(articles):
+    """届いた順に clusterer に入れ、代表記事のリストを返す（集約処理と同じ使い方）"""
+    clusterer = ArticleClusterer()
+    for article in articles:
+        clusterer.add(article)
+    return clusterer.articles
+
+
+def test_canonicalize_url_ignores_tracking_and_mobile_variants():
+    canonical = canonicalize_url("https://www.example.com/news/story/?id=3")
+    assert canonicalize_url("https://amp.example.com/news/story/amp/?id=3&utm_source=x") == canonical
+    assert canonicalize_url("http://m.example.com/news/story?fbclid=abc&id=3#top") == canonical
+
+
+def test_cluster_collapses_syndicated_copies():
+    articles = [
+        Article(title="Apple unveils new iPhone with faster chip - Reuters", url="https://a.com/1", source="A"),
+        Article(title="Apple unveils new iPhone with faster chip | The Verge", url="https://b.com/2", source="B",
+                image="https://b.com/img.jpg"),
+        Article(title="Tesla stock rises after earnings", url="https://c.com/3", source="C"),
+    ]
+
+    clustered = _cluster(articles)
+
+    assert [a.url for a in clustered] == ["https://a.com/1", "https://c.com/3"]
+    assert clustered[0].alternates == [("https://b.com/2", "B")]
+    assert clustered[0].image == "https://b.com/img.jpg"
+    # 元の記事（他の検索と共有される）は書き換えない
+    assert articles[0].alternates is None
+    assert articles[0].image == ""
+
+
+def test_short_japanese_titles_about_different_products_are_kept():
+    articles = [
+        Article(title="アップル 新型iPhoneを発表", url="https://a.jp/1", source="A"),
+        Article(title="アップル 新型iPadを発表", url="https://b.jp/2", source="B"),
+        Article(title="アップル、新型iPhoneを発表 - 日経", url="https://c.jp/3", source="C"),
+    ]
+
+    clustered = _cluster(articles)
+
+    assert [a.url for a in clustered] == ["https://a.jp/1", "https://b.jp/2"]
+
+
+def test_titles_that_differ_only_in_word_order_are_kept():
+    articles = [
+        Article(title="Apple sues Samsung over patents", url="https://a.com/1", source="A"),
+        Article(title="Samsung sues Apple over patents", url="https://b.com/2", source="B"),
+    ]
+
+    assert [a.url for a in _cluster(articles)] == ["https://a.com/1", "https://b.com/2"]
@@ -0,0 +1,15 @@
+from urllib.parse import urlencode
+
+from app.services.deepl import AUTH_KEY, MAX_REQUEST_BYTES, _chunk_texts
+
+# DeepL が受け付けるリクエスト本文の上限
+DEEPL_BODY_LIMIT = 128 * 1024
+
+
+def test_chunks_of_long_japanese_texts_fit_the_encoded_body_limit():
+    texts = ["アップルが新型の製品を発表しました。" * 200 for _ in range(40)]
+    chunks = list(_chunk_texts(texts))
+    assert sum(len(chunk) for chunk in chunks) == len(texts)
+    for chunk in chunks:
+        body = urlencode({"auth_key": AUTH_KEY, "text": chunk, "target_lang": "JA"}, doseq=True)
+        assert len(body) <= MAX_REQUEST_BYTES < DEEPL_BODY_LIMIT
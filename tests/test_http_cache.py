@@ -0,0 +1,27 @@
+import gzip
+import json
+
+from flask import Flask
+
+from app.utils.http_cache import json_response
+
+
+def test_json_response_returns_304_for_matching_etag_and_gzips_large_bodies():
+    app = Flask(__name__)
+    payload = [{"title": f"Article {i}", "description": "x" * 100} for i in range(20)]
+
+    @app.route("/feed")
+    def feed():
+        return json_response(payload, cache_control="public, max-age=60")
+
+    client = app.test_client()
+    first = client.get("/feed", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["Cache-Control"] == "public, max-age=60"
+    assert json.loads(gzip.decompress(first.data)) == payload
+
+    second = client.get("/feed", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
@@ -0,0 +1,29 @@
+import json
+from datetime import datetime, timezone
+
+from app.utils.json_codec import dumps, encode
+
+
+class _ProtoTimestamp:
+    """protobuf の Timestamp と同じく、UTC の naive datetime を返す"""
+
+    def ToDatetime(self):
+        return datetime(2024, 1, 2, 3, 4, 5)
+
+
+def test_dumps_encodes_datetimes_and_timestamps_as_iso_strings():
+    body = dumps({
+        "timestamp": datetime(2024, 1, 1, 9, 30, tzinfo=timezone.utc),
+        "written_at": _ProtoTimestamp(),
+        "title": "日本語",
+    })
+    assert json.loads(body) == {
+        "timestamp": "2024-01-01T09:30:00+00:00",
+        "written_at": "2024-01-02T03:04:05+00:00",
+        "title": "日本語",
+    }
+
+
+def test_encoded_json_etag_depends_only_on_content():
+    assert encode({"a": 1, "b": 2}).etag == encode({"b": 2, "a": 1}).etag
+    assert encode({"a": 1}).etag != encode({"a": 2}).etag
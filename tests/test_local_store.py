@@ -0,0 +1,75 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.local_store import LocalStore
+from app.services.posts import list_posts
+from app.services.storage import LocalPosts, LocalUsers
+
+
+def _open(tmp_path, **kwargs):
+    return LocalStore(directory=str(tmp_path / "store"), legacy_dir=str(tmp_path / "data"), **kwargs).open()
+
+
+def test_imports_legacy_json_and_pages_newest_first(tmp_path):
+    (tmp_path / "data").mkdir()
+    legacy = [
+        {"id": i, "title": f"t{i}", "timestamp": f"2024-01-0{i}T10:00:00", "type": "user_post"}
+        for i in range(1, 6)
+    ]
+    (tmp_path / "data" / "posts.json").write_text(json.dumps(legacy))
+    (tmp_path / "data" / "users.json").write_text(json.dumps([{"id": "u1", "email": "a@b"}]))
+
+    store = _open(tmp_path)
+    posts = LocalPosts(store)
+    page, cursor = list_posts(posts, limit=2)
+    assert [p["id"] for p in page] == ["5", "4"]
+    assert page[0]["timestamp"] == datetime(2024, 1, 5, 10, tzinfo=timezone.utc)
+
+    page, cursor = list_posts(posts, limit=2, cursor=cursor)
+    assert [p["id"] for p in page] == ["3", "2"]
+    page, cursor = list_posts(posts, limit=2, cursor=cursor)
+    assert [p["id"] for p in page] == ["1"] and cursor is None
+
+    assert LocalUsers(store).get("u1") == {"email": "a@b"}
+    assert [r.id for r in posts.newer_than(datetime(2024, 1, 4, 10), 10)] == ["5"]
+
+
+def test_log_and_snapshot_survive_restart(tmp_path):
+    store = _open(tmp_path, snapshot_every=3)
+    posts, users = LocalPosts(store), LocalUsers(store)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    ids = []
+    for i in range(5):
+        doc_id, _ = posts.add({"title": f"t{i}"})
+        # 並び順を決めるため、タイムスタンプを書き換えて保存し直す
+        store.merge("posts", doc_id, {"timestamp": base + timedelta(minutes=i)})
+        ids.append(doc_id)
+    users.create("u1", {"email": "a@b"})
+    users.update("u1", {"icon": "x.png"})
+
+    # 閉じずに開き直す（スナップショットの後のログを再生する）。プロセスが落ちたときと同じくロックだけ外す
+    store._release_lock()
+    reopened = _open(tmp_path)
+    assert [r.id for r in reopened.newest_posts(10)] == list(reversed(ids))
+    user = LocalUsers(reopened).get("u1")
+    assert user["icon"] == "x.png" and isinstance(user["created_at"], datetime)
+
+
+def test_second_open_of_the_same_directory_fails(tmp_path):
+    store = _open(tmp_path)
+    with pytest.raises(RuntimeError):
+        _open(tmp_path)
+    store.close()
+    _open(tmp_path).close()
+
+
+def test_watch_newest_is_called_on_writes(tmp_path):
+    store = _open(tmp_path)
+    seen = []
+    remove = LocalPosts(store).watch_newest(10, lambda docs, changes, read_time: seen.append(len(docs)))
+    LocalPosts(store).add({"title": "a"})
+    remove()
+    LocalPosts(store).add({"title": "b"})
+    assert seen == [0, 1]
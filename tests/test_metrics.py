@@ -0,0 +1,30 @@
+from app.utils.metrics import Registry
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("provider", "outcome"))
+    latency = registry.histogram("latency_seconds", "Latency.", ("provider",), buckets=(0.1, 1.0))
+
+    requests.inc(provider="gnews", outcome="success")
+    requests.inc(provider="gnews", outcome="success")
+    latency.observe(0.05, provider="gnews")
+    latency.observe(0.5, provider="gnews")
+    latency.observe(3.0, provider="gnews")
+
+    text = registry.render()
+    assert 'requests_total{provider="gnews",outcome="success"} 2' in text
+    assert 'latency_seconds_bucket{provider="gnews",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{provider="gnews",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{provider="gnews",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{provider="gnews"} 3' in text
+    assert 0.1 <= latency.quantile(0.5, provider="gnews") <= 1.0
+
+
+def test_collected_counters_render_as_counter_type():
+    registry = Registry()
+    registry.counter("cache_hits_total", "Cache hits.", ("cache",), function=lambda: {("search",): 3})
+
+    text = registry.render()
+    assert "# TYPE cache_hits_total counter" in text
+    assert 'cache_hits_total{cache="search"} 3' in text
@@ -0,0 +1,35 @@
+from app.models import Article
+
+
+def test_article_serializes_to_existing_json_shape():
+    article = Article(
+        title="Apple unveils new iPhone",
+        description="Faster chip",
+        url="https://www.example.com/story",
+        image="https://www.example.com/img.jpg",
+        published_at="2024-05-01 10:00:00",
+        source="Example",
+        language="en",
+    )
+
+    untranslated = article.to_dict("ja")
+    assert untranslated["title_ja"] == "Apple unveils new iPhone"
+    assert untranslated["translated"] is False
+    assert untranslated["publishedAt"] == "2024-05-01T10:00:00Z"
+
+    article.set_translation("ja", "アップルが新型iPhoneを発表", "より高速なチップ")
+    restored = Article.from_record(article.to_record())
+    assert restored.to_dict("ja") == {
+        "id": article.id,
+        "title_en": "Apple unveils new iPhone",
+        "title_ja": "アップルが新型iPhoneを発表",
+        "description_en": "Faster chip",
+        "description_ja": "より高速なチップ",
+        "url": "https://www.example.com/story",
+        "urlToImage": "https://www.example.com/img.jpg",
+        "publishedAt": "2024-05-01T10:00:00Z",
+        "source": "Example",
+        "alternates": [],
+        "lang": "ja",
+        "translated": True,
+    }
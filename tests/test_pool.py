@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app import create_app
+from app.services import aggregator, result_cache, search
+from app.services.article_index import ArticleIndex
+from app.utils.pool import BoundedPool, Overloaded
+
+
+def test_pool_limits_concurrency_and_rejects_when_queue_is_full():
+    pool = BoundedPool("test", concurrency=2, max_queue=1, retry_after=3)
+    running = []
+    peak = []
+
+    async def work():
+        async with pool.slot():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+            return "ok"
+
+    async def main():
+        return await asyncio.gather(*(work() for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    rejected = [r for r in results if isinstance(r, Overloaded)]
+    assert results.count("ok") == 3
+    assert len(rejected) == 1 and rejected[0].retry_after == 3
+    assert max(peak) == 2
+    assert pool.status()["active"] == 0 and pool.status()["rejected"] == 1
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    pool = BoundedPool("test", concurrency=1, max_queue=4)
+
+    async def main():
+        await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        pool.release()
+        assert pool.status()["active"] == 0 and pool.status()["queued"] == 0
+
+    asyncio.run(main())
+
+
+def test_app_returns_503_with_retry_after_when_the_search_pool_is_full(tmp_path, monkeypatch):
+    monkeypatch.setenv("PREFETCH_ENABLED", "0")
+    monkeypatch.setenv("POST_FEED_ENABLED", "0")
+    monkeypatch.setenv("STORAGE_BACKEND", "firestore")
+    app = create_app()
+    # ローカルのインデックスにもキャッシュにもなく、検索の枠も待ち行列も埋まっている
+    monkeypatch.setattr(search, "article_index", ArticleIndex(path=str(tmp_path / "articles.sqlite3")))
+    monkeypatch.setattr(aggregator, "search_pool", BoundedPool("test_search", concurrency=0, max_queue=0, retry_after=7))
+    result_cache.result_cache.clear()
+
+    client = app.test_client()
+    for url in ("/api/update?lang=en", "/api/search?q=Apple&lang=en"):
+        response = client.get(url)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
+        assert response.get_json()["retry_after"] == 7
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.post_feed import PostFeed
+
+
+class _Snapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.update_time = data["timestamp"]
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+def _snapshots(count):
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    snapshots = [
+        _Snapshot(f"p{i}", {"title": f"t{i}", "timestamp": base + timedelta(minutes=i), "user_email": "a@b"})
+        for i in range(count)
+    ]
+    return list(reversed(snapshots))
+
+
+def test_pages_are_served_from_memory_until_the_window_ends():
+    feed = PostFeed(size=4)
+    assert feed.page(2) is None
+
+    # 4件ちょうどなので、さらに古い投稿が Firestore にあるかもしれない
+    feed._on_snapshot(_snapshots(4), [], None)
+    posts, cursor = feed.page(2)
+    assert [p["id"] for p in posts] == ["p3", "p2"]
+    assert posts[0]["author_email"] == "a@b" and posts[0]["type"] == "user_post"
+
+    posts, cursor = feed.page(2, cursor)
+    assert [p["id"] for p in posts] == ["p1", "p0"]
+    assert cursor is not None
+    assert feed.page(2, cursor) is None
+
+
+def test_complete_feed_ends_without_cursor_and_upsert_shows_new_posts():
+    feed = PostFeed(size=10)
+    feed._on_snapshot(_snapshots(3), [], None)
+    posts, cursor = feed.page(5)
+    assert [p["id"] for p in posts] == ["p2", "p1", "p0"] and cursor is None
+
+    before = feed.first_page_json(5)
+    feed.upsert("new", {"title": "n", "timestamp": datetime(2024, 2, 1, tzinfo=timezone.utc)})
+    assert feed.first_page_json(5).etag != before.etag
+    assert feed.page(1)[0][0]["id"] == "new"
@@ -0,0 +1,62 @@
+import io
+import json
+import threading
+
+from app.services.post_import import import_posts, iter_records, validate_post
+
+
+class _FakePosts:
+    """バッチ書き込みを記録する保存先の代わり。fail_on 番目のバッチで失敗する"""
+
+    def __init__(self, fail_on=None):
+        self.docs = {}
+        self.batches = 0
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def put_many(self, items):
+        with self._lock:
+            self.batches += 1
+            if self.batches == self.fail_on:
+                raise RuntimeError("commit failed")
+            self.docs.update(items)
+
+
+def _posts(count):
+    return [{"title": f"t{i}", "timestamp": f"2024-01-01T00:00:{i % 60:02d}"} for i in range(count)]
+
+
+def test_reads_json_array_across_chunks_and_ndjson():
+    posts = _posts(3000)
+    assert list(iter_records(io.StringIO(json.dumps(posts)))) == posts
+
+    ndjson = "\n".join(json.dumps(p) for p in posts[:3]) + "\n{broken\n"
+    records = list(iter_records(io.StringIO(ndjson)))
+    assert records[:3] == posts[:3] and isinstance(records[3], ValueError)
+
+
+def test_invalid_posts_are_reported_and_ids_are_stable():
+    doc_id, post = validate_post({"title": "a", "timestamp": "2024-01-01T00:00:00"})
+    assert validate_post({"title": "a", "timestamp": "2024-01-01T00:00:00"})[0] == doc_id
+    assert post["timestamp"].tzinfo is not None and post["description"] == ""
+    # timestamp のない投稿も、検証し直して同じ id になる
+    assert validate_post({"title": "a"})[0] == validate_post({"title": "a"})[0]
+
+    fake = _FakePosts()
+    lines = [json.dumps({"title": "ok", "id": "p1"}), json.dumps({"title": ""}), json.dumps({"title": "x", "id": "a/b"})]
+    result = import_posts(fake, io.StringIO("\n".join(lines)))
+    assert result["imported"] == 1 and result["invalid"] == 2 and result["committed"] == 3
+    assert [e["record"] for e in result["errors"]] == [2, 3]
+    assert list(fake.docs) == ["p1"]
+
+
+def test_failed_batch_can_be_resumed_from_committed():
+    data = json.dumps(_posts(1000))
+    fake = _FakePosts(fail_on=3)
+    result = import_posts(fake, io.StringIO(data), batch_size=100, parallel=1)
+    assert "error" in result and result["committed"] == 200
+
+    resumed = _FakePosts()
+    result = import_posts(resumed, io.StringIO(data), skip=result["committed"], batch_size=100, parallel=4)
+    assert "error" not in result and result["imported"] == 800 and result["committed"] == 1000
+    assert len(set(fake.docs) | set(resumed.docs)) == 1000
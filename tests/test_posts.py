@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.posts import MAX_PAGE_SIZE, PAGE_SIZE, decode_cursor, encode_cursor, parse_limit
+
+
+def test_cursor_round_trips_timestamp_and_id():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(timestamp, "abc123")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, "abc123")
+
+
+def test_invalid_cursor_and_limit_raise_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        parse_limit("0")
+    assert parse_limit(None) == PAGE_SIZE
+    assert parse_limit("100000") == MAX_PAGE_SIZE
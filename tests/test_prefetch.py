@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.models import Article
+from app.services import prefetch, result_cache
+from app.services.result_cache import make_key
+from app.utils.rate_limit import get_limiter
+
+
+def test_default_interval_keeps_prefetch_within_the_non_reserved_quota():
+    interval = prefetch.interval_seconds(queries=1)
+    for name, calls in prefetch.PROVIDER_CALLS_PER_SEARCH.items():
+        daily = get_limiter(name, prefetch.PROVIDER_API_KEYS[name]).daily_requests
+        if daily:
+            assert 24 * 60 * 60 / interval * calls <= daily * (1 - prefetch.RESERVE_FRACTION)
+
+
+def test_prefetch_is_skipped_when_a_provider_is_down_to_its_reserve():
+    limiter = get_limiter("gnews", prefetch.PROVIDER_API_KEYS["gnews"])
+    saved = limiter._requests_today
+    try:
+        limiter._requests_today = 0
+        assert prefetch._budget_reserved() is None
+        limiter._requests_today = limiter.daily_requests // 2
+        assert prefetch._budget_reserved() == "gnews"
+    finally:
+        limiter._requests_today = saved
+
+
+def test_prefetch_warms_the_lazy_key_the_web_client_reads(monkeypatch):
+    keys = []
+
+    async def fake_refresh(query, page_size, lang, lazy=False):
+        keys.append(make_key(query, page_size, lang, lazy))
+        return []
+
+    monkeypatch.setattr(prefetch, "refresh_async", fake_refresh)
+    asyncio.run(prefetch.refresh_feed("Apple", "ja"))
+
+    assert keys == [make_key("Apple", prefetch.PAGE_SIZE, "ja", lazy=True)]
+
+
+def test_reads_of_a_prefetched_feed_do_not_refresh_upstream(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    calls = []
+    articles = [Article(title="Apple", url="https://a.com/1", language="ja")]
+
+    async def loader(query, page_size, lang, lazy):
+        calls.append(lazy)
+        return articles
+
+    monkeypatch.setattr(result_cache, "time", SimpleNamespace(time=lambda: now.value))
+    monkeypatch.setattr(result_cache, "get_translated_articles_async", loader)
+    monkeypatch.setattr(result_cache, "_owned_fresh_seconds", {})
+    monkeypatch.setattr(prefetch, "_tasks", [])
+    monkeypatch.setattr(prefetch, "_budget_reserved", lambda: None)
+    result_cache.result_cache.clear()
+
+    async def main():
+        interval = await prefetch._start([("Apple", "ja")])
+        while not calls:
+            await asyncio.sleep(0)
+        # 通常の FRESH_SECONDS を過ぎても、次の先読みまでは上流を呼ばない
+        now.value += result_cache.FRESH_SECONDS * 10
+        for _ in range(3):
+            assert await result_cache.get_articles_async("Apple", 10, "ja", lazy=True) == articles
+            await asyncio.sleep(0)
+        assert len(calls) == 1
+        # 先読みが止まっていれば、それ以降は通常どおり裏で更新する
+        now.value += interval + prefetch.JITTER_SECONDS
+        await result_cache.get_articles_async("Apple", 10, "ja", lazy=True)
+        while len(calls) < 2:
+            await asyncio.sleep(0)
+        for task in prefetch._tasks:
+            task.cancel()
+
+    asyncio.run(asyncio.wait_for(main(), 1))
+    assert calls == [True, True]
@@ -0,0 +1,96 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import gnews, newsapi, newsdata
+from app.utils import rate_limit
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.metrics import upstream_skipped
+from app.utils.rate_limit import ProviderLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(monotonic=100.0, day=date(2024, 1, 1))
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: now.monotonic))
+    monkeypatch.setattr(rate_limit, "_today", lambda: now.day)
+    return now
+
+
+def test_burst_is_exhausted_and_refilled_over_time(clock):
+    limiter = ProviderLimiter("test", rate_per_sec=2, burst=3)
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+    clock.monotonic += 0.5
+    assert limiter.try_acquire() and not limiter.try_acquire()
+    # 長く空いてもトークンは burst までしかたまらない
+    clock.monotonic += 60
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_daily_quota_resets_on_the_next_day(clock):
+    limiter = ProviderLimiter("test", daily_requests=2, daily_chars=10)
+    assert limiter.try_acquire(chars=4) and limiter.try_acquire(chars=4)
+    assert not limiter.try_acquire()
+    assert not limiter.has_budget()
+
+    clock.day = date(2024, 1, 2)
+    assert limiter.has_budget()
+    assert not limiter.try_acquire(chars=11)
+    assert limiter.try_acquire(chars=10)
+
+
+def test_block_for_and_status(clock):
+    limiter = ProviderLimiter("test", key_id="k", rate_per_sec=1, burst=2, daily_requests=5)
+    limiter.try_acquire()
+    limiter.block_for(30)
+    assert not limiter.try_acquire()
+
+    assert limiter.status() == {
+        "name": "test",
+        "key_id": "k",
+        "tokens": 1.0,
+        "requests_today": 1,
+        "requests_remaining": 4,
+        "chars_today": 0,
+        "chars_remaining": None,
+        "blocked_for": 30.0,
+    }
+    clock.monotonic += 30
+    assert limiter.try_acquire()
+
+
+def test_all_limiters_lists_shared_limiters_without_the_key():
+    limiter = rate_limit.get_limiter("newsapi", "secret-key")
+    assert rate_limit.get_limiter("newsapi", "secret-key") is limiter
+
+    status = next(s for s in rate_limit.all_limiters() if s["key_id"] == limiter.key_id)
+    assert status["name"] == "newsapi"
+    assert "secret" not in status["key_id"]
+
+
+@pytest.mark.parametrize(
+    "module, fetch, provider",
+    [
+        (newsapi, newsapi.fetch_full_articles_async, "newsapi"),
+        (gnews, gnews.fetch_full_articles_gnews_async, "gnews"),
+        (newsdata, newsdata.fetch_full_articles_newsdata_async, "newsdata"),
+    ],
+)
+def test_fetchers_skip_without_sending_when_the_budget_is_exhausted(monkeypatch, module, fetch, provider):
+    exhausted = ProviderLimiter(provider, daily_requests=1)
+    exhausted.try_acquire()
+    monkeypatch.setattr(module, "API_KEY", "test-key")
+    monkeypatch.setattr(module, "get_breaker", lambda name: CircuitBreaker(name))
+    monkeypatch.setattr(module, "get_limiter", lambda name, key=None: exhausted)
+
+    def no_request(*args, **kwargs):
+        raise AssertionError("request must not be sent")
+
+    monkeypatch.setattr(module, "get_async_client", no_request)
+    before = upstream_skipped.value(provider=provider, reason="budget_exhausted")
+
+    assert asyncio.run(fetch("Apple", page_size=5)) == []
+    assert upstream_skipped.value(provider=provider, reason="budget_exhausted") == before + 1
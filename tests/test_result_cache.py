@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import result_cache
+
+
+class _Loader:
+    """呼び出し回数を数える取得処理の代わり。results を順に返す（例外なら送出する）"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.gate = None
+
+    async def __call__(self, query, page_size, lang, lazy):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        result = self.results[min(self.calls, len(self.results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(result_cache, "time", SimpleNamespace(time=lambda: now.value))
+    monkeypatch.setattr(result_cache, "FRESH_SECONDS", 60)
+    result_cache.result_cache.clear()
+    return now
+
+
+def _use(monkeypatch, loader):
+    monkeypatch.setattr(result_cache, "get_translated_articles_async", loader)
+
+
+async def _settle():
+    """裏の更新タスクが終わるまで待つ"""
+    while result_cache._background_tasks:
+        await asyncio.sleep(0)
+
+
+def test_fresh_hit_is_served_without_reloading(clock, monkeypatch):
+    loader = _Loader(["a"], ["b"])
+    _use(monkeypatch, loader)
+
+    async def run():
+        first = await result_cache.get_articles_async("Apple", 10, "ja")
+        clock.value += 59
+        second = await result_cache.get_articles_async(" apple ", 10, "ja")
+        await _settle()
+        return first, second
+
+    assert asyncio.run(run()) == (["a"], ["a"])
+    assert loader.calls == 1
+
+
+def test_stale_hit_is_served_while_one_refresh_runs(clock, monkeypatch):
+    loader = _Loader(["old"], ["new"])
+    _use(monkeypatch, loader)
+
+    async def run():
+        await result_cache.get_articles_async("Apple", 10, "ja")
+        clock.value += 61
+        loader.gate = asyncio.Event()
+        # 古い結果はすぐに返り、同時に来た読み込みでも更新は1本だけ
+        stale = await asyncio.gather(*(result_cache.get_articles_async("Apple", 10, "ja") for _ in range(5)))
+        assert loader.calls == 2
+        loader.gate.set()
+        await _settle()
+        return stale, await result_cache.get_articles_async("Apple", 10, "ja")
+
+    stale, refreshed = asyncio.run(run())
+    assert stale == [["old"]] * 5
+    assert refreshed == ["new"]
+    assert loader.calls == 2
+
+
+def test_failed_or_empty_refresh_keeps_last_good_result(clock, monkeypatch):
+    loader = _Loader(["good"], RuntimeError("provider down"), [])
+    _use(monkeypatch, loader)
+
+    async def run():
+        await result_cache.get_articles_async("Apple", 10, "ja")
+        served = []
+        for _ in range(2):
+            clock.value += 61
+            served.append(await result_cache.get_articles_async("Apple", 10, "ja"))
+            await _settle()
+        return served
+
+    assert asyncio.run(run()) == [["good"], ["good"]]
+    assert result_cache.result_cache.get(result_cache.make_key("Apple", 10, "ja"))["articles"] == ["good"]
+    assert loader.calls == 3
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.runtime import get_loop, iter_sync, run_sync
+
+
+def test_run_sync_runs_on_the_resident_loop_and_reraises():
+    async def work():
+        await asyncio.sleep(0)
+        return threading.current_thread().name, asyncio.get_running_loop()
+
+    async def fail():
+        raise ValueError("boom")
+
+    assert run_sync(work()) == ("aggregator-loop", get_loop())
+    assert get_loop() is get_loop()
+    with pytest.raises(ValueError, match="boom"):
+        run_sync(fail())
+
+
+def test_iter_sync_yields_in_order_and_closes_when_the_consumer_stops():
+    closed = []
+
+    async def numbers():
+        try:
+            for i in range(5):
+                await asyncio.sleep(0)
+                yield i
+        finally:
+            closed.append(True)
+
+    assert list(iter_sync(numbers())) == [0, 1, 2, 3, 4]
+    assert closed == [True]
+
+    # 途中でやめた場合（クライアントの切断など）もジェネレータの後始末が走る
+    items = iter_sync(numbers())
+    assert [next(items), next(items)] == [0, 1]
+    items.close()
+    assert closed == [True, True]
+
+
+def test_iter_sync_reraises_errors_from_the_generator():
+    async def broken():
+        yield 1
+        raise RuntimeError("provider failed")
+
+    items = iter_sync(broken())
+    assert next(items) == 1
+    with pytest.raises(RuntimeError, match="provider failed"):
+        next(items)
@@ -0,0 +1,72 @@
+import asyncio
+
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", work) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["result"] * 10
+    assert len(calls) == 1
+    assert len(flight) == 0
+
+
+def test_do_many_only_runs_keys_not_in_flight():
+    flight = SingleFlight()
+    batches = []
+
+    async def translate(keys):
+        batches.append(list(keys))
+        await asyncio.sleep(0.01)
+        return [k.upper() for k in keys]
+
+    async def main():
+        return await asyncio.gather(
+            flight.do_many(["a", "b"], translate),
+            flight.do_many(["b", "c"], translate),
+        )
+
+    first, second = asyncio.run(main())
+    assert first == {"a": "A", "b": "B"}
+    assert second == {"b": "B", "c": "C"}
+    assert batches == [["a", "b"], ["c"]]
+
+
+def test_cancel_abandoned_stops_work_only_when_no_caller_is_waiting():
+    flight = SingleFlight(cancel_abandoned=True)
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return "result"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        # 他に待っている呼び出しがあれば処理は続く
+        first.cancel()
+        assert await second == "result"
+        assert not cancelled
+
+        third = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        third.cancel()
+        await asyncio.sleep(0.01)
+        assert cancelled == [1]
+        assert len(flight) == 0
+
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from flask import Flask
+
+from app.models import Article
+from app.routes.main import main_bp
+from app.services import aggregator, result_cache, search
+from app.services.article_index import ArticleIndex
+from app.utils.pool import BoundedPool
+
+
+def _provider(*titles, error=None):
+    async def fetch(query, page_size, language=None):
+        if error is not None:
+            raise error
+        return [Article(title=title, url=f"https://example.com/{title}") for title in titles]
+    return fetch
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # 記事はローカルのファイルに書かず、結果キャッシュも空から始める
+    index = ArticleIndex(path=str(tmp_path / "articles.sqlite3"))
+    monkeypatch.setattr(aggregator, "article_index", index)
+    monkeypatch.setattr(search, "article_index", index)
+    monkeypatch.setattr(aggregator, "fetch_full_articles_newsdata_async", _provider())
+    monkeypatch.setattr(aggregator, "fetch_full_articles_gnews_async", _provider())
+    result_cache.result_cache.clear()
+    app = Flask(__name__)
+    app.register_blueprint(main_bp)
+    yield app.test_client()
+    result_cache.result_cache.clear()
+
+
+def _events(response):
+    """SSE の本文を [(イベント名, データ), ...] にする"""
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.parametrize("url", ["/api/update/stream?lang=en&lazy=1", "/api/search/stream?q=Apple&lang=en&lazy=1"])
+def test_stream_sends_one_articles_event_per_provider_batch(client, monkeypatch, url):
+    monkeypatch.setattr(aggregator, "fetch_full_articles_async", _provider("Apple one", "Apple two"))
+    monkeypatch.setattr(aggregator, "fetch_full_articles_newsdata_async", _provider("Apple three"))
+
+    response = client.get(url)
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    events = _events(response)
+    names = [name for name, _ in events]
+    # NewsAPI と NewsData.io の2バッチ（NewsData.io の ja は en と同じ記事なので送らない）
+    assert names.count("articles") == 2
+    assert names[-1] == "done" and "error" not in names
+    titles = sorted(a["title_en"] for name, data in events if name == "articles" for a in data)
+    assert titles == ["Apple one", "Apple three", "Apple two"]
+    assert events[-1][1] == {"count": 3}
+
+
+def test_failing_provider_is_dropped_without_breaking_the_stream(client, monkeypatch):
+    monkeypatch.setattr(aggregator, "fetch_full_articles_async", _provider(error=RuntimeError("boom")))
+    monkeypatch.setattr(aggregator, "fetch_full_articles_gnews_async", _provider("Apple news"))
+
+    events = _events(client.get("/api/update/stream?lang=en&lazy=1"))
+    assert [name for name, _ in events] == ["articles", "done"]
+
+
+def test_error_during_the_stream_becomes_an_error_event(client, monkeypatch):
+    monkeypatch.setattr(aggregator, "fetch_full_articles_async", _provider("Apple news"))
+    # 検索の枠も待ち行列もないので、ストリームの途中で Overloaded になる
+    monkeypatch.setattr(aggregator, "search_pool", BoundedPool("test_search", concurrency=0, max_queue=0, retry_after=7))
+
+    events = _events(client.get("/api/update/stream?lang=en&lazy=1"))
+    assert [name for name, _ in events] == ["error", "done"]
+    assert events[0][1]["retry_after"] == 7
+    assert events[1][1] == {"count": 0}
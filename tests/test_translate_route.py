@@ -0,0 +1,26 @@
+from flask import Flask
+
+from app.routes import main
+from app.routes.main import main_bp
+
+
+def _client():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(main_bp)
+    return app.test_client()
+
+
+def test_translate_texts_requires_login_and_is_capped(monkeypatch):
+    monkeypatch.setattr(main, "translate_texts", lambda texts, lang: list(texts))
+    client = _client()
+
+    assert client.post("/api/translate", json={"texts": ["hello"]}).status_code == 401
+
+    with client.session_transaction() as session:
+        session["user_id"] = "u1"
+    assert client.post("/api/translate", json={"texts": ["hello"]}).get_json() == {"translations": ["hello"]}
+    too_many = ["a"] * (main.TRANSLATE_MAX_ITEMS + 1)
+    assert client.post("/api/translate", json={"texts": too_many}).status_code == 413
+    too_long = ["a" * (main.TRANSLATE_MAX_CHARS + 1)]
+    assert client.post("/api/translate", json={"texts": too_long}).status_code == 413
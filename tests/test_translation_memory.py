@@ -0,0 +1,88 @@
+import time
+
+from app.services import aggregator
+from app.services.translation_memory import TranslationMemory, make_key
+
+
+def _memory(tmp_path, **kwargs):
+    return TranslationMemory(path=str(tmp_path / "tm.sqlite3"), **kwargs)
+
+
+def _hits(memory, text, lang="JA"):
+    return memory._connect().execute(
+        "SELECT hits FROM translations WHERE key = ?", (make_key(text, lang),)
+    ).fetchone()[0]
+
+
+def test_put_get_and_hits_are_written_on_flush(tmp_path):
+    memory = _memory(tmp_path)
+    memory.put_many({"Hello  world": "こんにちは世界", "empty": ""}, "JA")
+
+    # 空白の違いは同じキーになり、空の訳文は保存しない
+    reader = _memory(tmp_path)
+    assert reader.get_many(["Hello world", "empty", "other"], "ja") == {"Hello world": "こんにちは世界"}
+    assert memory.count() == 1
+
+    # 使用回数はためておき、flush でまとめて書き込む
+    assert _hits(memory, "Hello world") == 0
+    reader.flush_usage()
+    assert _hits(memory, "Hello world") == 1
+
+
+def test_two_connections_share_one_wal_file(tmp_path):
+    writer, reader = _memory(tmp_path), _memory(tmp_path)
+    assert writer._connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    assert reader.get_many(["a"], "ja") == {}
+    writer.put_many({"a": "あ"}, "ja")
+    assert reader.get_many(["a"], "ja") == {"a": "あ"}
+
+
+def test_warm_start_loads_most_used_entries_from_an_existing_file(tmp_path):
+    memory = _memory(tmp_path)
+    memory.put_many({"a": "あ", "b": "い", "c": "う"}, "ja")
+    # プロセス内のLRUではなくDBから読んだ分が使用回数になる
+    reader = _memory(tmp_path)
+    reader.get_many(["c"], "ja")
+    reader.flush_usage()
+
+    restarted = _memory(tmp_path, memory_entries=1)
+    assert restarted.warm_start() == 1
+    assert restarted.memory.get(make_key("c", "ja")) == "う"
+
+
+def test_compact_removes_old_and_least_used_entries(tmp_path):
+    memory = _memory(tmp_path)
+    memory.put_many({"old": "古", "a": "あ", "b": "い"}, "ja")
+    memory._connect().execute(
+        "UPDATE translations SET last_used = ? WHERE key = ?",
+        (time.time() - 100 * 24 * 60 * 60, make_key("old", "ja")),
+    )
+    memory._connect().commit()
+    reader = _memory(tmp_path)
+    reader.get_many(["a"], "ja")
+    reader.flush_usage()
+
+    assert memory.compact(max_age_days=90, max_entries=1) == 2
+    assert _memory(tmp_path).get_many(["old", "a", "b"], "ja") == {"a": "あ"}
+
+
+def test_aggregator_uses_memory_before_deepl(tmp_path, monkeypatch):
+    memory = _memory(tmp_path)
+    memory.put_many({"cached": "キャッシュ済み"}, "JA")
+    sent = []
+
+    async def fake_deepl(texts, target_lang):
+        sent.extend(texts)
+        return [f"訳:{t}" for t in texts]
+
+    monkeypatch.setattr(aggregator, "translation_memory", memory)
+    monkeypatch.setattr(aggregator, "translate_many_async", fake_deepl)
+    from_memory = aggregator.translation_texts.value(source="memory")
+
+    assert aggregator.translate_texts(["cached", "new"], "JA") == ["キャッシュ済み", "訳:new"]
+    assert sent == ["new"]
+    assert aggregator.translation_texts.value(source="memory") == from_memory + 1
+    # DeepLの訳文は翻訳メモリに保存され、次はDeepLに送らない
+    assert aggregator.translate_texts(["new"], "JA") == ["訳:new"]
+    assert sent == ["new"]
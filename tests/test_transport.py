@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import transport
+from app.services.transport import _InstrumentedTransport, get_async_client, get_session
+from app.utils.metrics import upstream_latency, upstream_requests
+
+
+def _handler(request):
+    path = request.url.path
+    if path == "/timeout":
+        raise httpx.ReadTimeout("slow", request=request)
+    if path == "/down":
+        raise httpx.ConnectError("refused", request=request)
+    status = {"/ok": 200, "/limited": 429, "/bad": 400, "/broken": 503}[path]
+    return httpx.Response(status, json={})
+
+
+def test_sessions_are_shared_per_host():
+    session = get_session("https://shared.example.com/a", provider="test")
+    assert get_session("https://shared.example.com/b?x=1") is session
+    assert get_session("https://other.example.com/a") is not session
+
+
+def test_async_clients_are_shared_per_loop_and_host():
+    async def clients():
+        first = get_async_client("https://shared.example.com/a")
+        assert get_async_client("https://shared.example.com/b") is first
+        assert get_async_client("https://other.example.com/a") is not first
+        await first.aclose()
+        # 閉じたクライアントは作り直す
+        assert get_async_client("https://shared.example.com/a") is not first
+        return first
+
+    # AsyncClient はループをまたいで使えないので、ループごとに別になる
+    assert asyncio.run(clients()) is not asyncio.run(clients())
+
+
+def test_instrumented_transport_records_latency_and_outcomes():
+    provider = "test_transport"
+    before = upstream_requests.values()
+
+    async def main():
+        client = httpx.AsyncClient(transport=_InstrumentedTransport(httpx.MockTransport(_handler), provider))
+        async with client:
+            for path in ("/ok", "/ok", "/limited", "/bad", "/broken"):
+                await client.get(f"https://api.example.com{path}")
+            for path in ("/timeout", "/down"):
+                with pytest.raises(httpx.HTTPError):
+                    await client.get(f"https://api.example.com{path}")
+
+    asyncio.run(main())
+    counts = {
+        outcome: value - before.get((p, outcome), 0)
+        for (p, outcome), value in upstream_requests.values().items()
+        if p == provider
+    }
+    assert counts == {
+        "success": 2, "rate_limited": 1, "client_error": 1, "server_error": 1, "timeout": 1, "error": 1,
+    }
+    assert upstream_latency.snapshot(provider=provider)[0] == 7
+
+
+def test_async_client_labels_metrics_with_the_host(monkeypatch):
+    monkeypatch.setattr(transport.httpx, "AsyncHTTPTransport", lambda **kwargs: httpx.MockTransport(_handler))
+    count = upstream_latency.snapshot(provider="mocked.example.com")[0]
+
+    async def main():
+        client = get_async_client("https://mocked.example.com/ok")
+        response = await client.get("https://mocked.example.com/ok")
+        await client.aclose()
+        return response.status_code
+
+    assert asyncio.run(main()) == 200
+    assert upstream_latency.snapshot(provider="mocked.example.com")[0] == count + 1
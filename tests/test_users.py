@@ -0,0 +1,44 @@
+from flask import Flask, session
+
+from app.services.users import get_user, invalidate_user, remember_roles, session_is_superuser
+
+
+class _FakeUsers:
+    """読み込み回数を数えるユーザーの保存先の代わり"""
+
+    def __init__(self, users):
+        self.users = users
+        self.reads = 0
+
+    def get(self, uid):
+        self.reads += 1
+        data = self.users.get(uid)
+        return dict(data) if data is not None else None
+
+
+def test_get_user_is_cached_until_invalidated():
+    db = _FakeUsers({"cache-u1": {"icon": "a.png"}})
+    assert get_user(db, "cache-u1") == {"icon": "a.png"}
+    assert get_user(db, "cache-u1") == {"icon": "a.png"}
+    assert get_user(db, "cache-missing") is None
+    assert get_user(db, "cache-missing") is None
+    assert db.reads == 2
+
+    db.users["cache-u1"] = {"icon": "b.png"}
+    invalidate_user("cache-u1")
+    assert get_user(db, "cache-u1") == {"icon": "b.png"}
+
+
+def test_roles_in_session_skip_firestore():
+    db = _FakeUsers({"role-u1": {"is_superuser": True}})
+    app = Flask(__name__)
+    app.secret_key = "test"
+    with app.test_request_context():
+        remember_roles({"is_superuser": True})
+        assert session_is_superuser(db, "role-u1") is True
+        assert db.reads == 0
+
+        # 保存した権限が古ければユーザー情報を見直す
+        session["roles_checked_at"] = 0
+        assert session_is_superuser(db, "role-u1") is True
+        assert db.reads == 1